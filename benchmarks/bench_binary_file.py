@@ -0,0 +1,52 @@
+"""Benchmark the write throughput and file size of the json and binary log file formats.
+
+Run with: python -m benchmarks.bench_binary_file
+"""
+
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from structlog import reset_defaults
+
+import mh_structlog
+
+
+EVENTS = 100_000
+
+
+def bench(log_file_format: str, directory: Path) -> tuple[float, int]:
+    """Return the number of events per second and the resulting file size, when logging to the file only."""
+    reset_defaults()
+    log_file = directory / f"logs.{log_file_format}"
+    mh_structlog.setup(
+        log_format="json",
+        log_file=log_file,
+        log_file_format=log_file_format,  # ty:ignore[invalid-argument-type]
+        testing_mode=True,
+    )
+    # The 'file' logger writes to the log file only, not to stdout.
+    logger = mh_structlog.get_logger("file")
+
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        logger.info("request handled", method="GET", path="/api/items", status=200, latency_ms=i % 100, user_id=i)
+    elapsed = time.perf_counter() - start
+
+    for handler in logging.getLogger("file").handlers:
+        handler.flush()
+    return EVENTS / elapsed, log_file.stat().st_size
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for log_file_format in ["json", "binary"]:
+            events_per_second, size = bench(log_file_format, Path(directory))
+            print(  # noqa: T201
+                f"{log_file_format:<8} {events_per_second:>10.0f} events/s  {size / EVENTS:>6.1f} bytes/event  {size / 1e6:>6.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
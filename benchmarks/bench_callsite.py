@@ -0,0 +1,42 @@
+"""Benchmark the per-event cost of adding the source location, with structlog's adder and the cached one.
+
+Run with: python -m benchmarks.bench_callsite
+"""
+
+import timeit
+
+import structlog
+from structlog.processors import CallsiteParameter
+
+from mh_structlog.processors import CallsiteLocationAdder
+
+
+NUMBER = 100_000
+ADDERS = {
+    "none": None,
+    "CallsiteParameterAdder": structlog.processors.CallsiteParameterAdder(
+        parameters={CallsiteParameter.PATHNAME, CallsiteParameter.LINENO, CallsiteParameter.FUNC_NAME}
+    ),
+    "CallsiteLocationAdder(compact=False)": CallsiteLocationAdder(compact=False),
+    "CallsiteLocationAdder()": CallsiteLocationAdder(),
+}
+
+
+def drop(_, __, event_dict: dict) -> str:  # noqa: ANN001, ARG001
+    return ""
+
+
+def application_code(logger: structlog.typing.BindableLogger) -> None:
+    logger.info("request handled", status=200)
+
+
+def main() -> None:
+    for name, adder in ADDERS.items():
+        processors = [drop] if adder is None else [adder, drop]
+        logger = structlog.wrap_logger(structlog.ReturnLogger(), processors=processors)
+        seconds = min(timeit.repeat(lambda: application_code(logger), number=NUMBER, repeat=5))  # noqa: B023
+        print(f"{name:>40}: {seconds / NUMBER * 1e6:6.2f} us/event")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
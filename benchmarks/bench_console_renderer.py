@@ -0,0 +1,67 @@
+"""Benchmark console output with structlog's ConsoleRenderer (as setup() configures it) and the LightConsoleRenderer.
+
+Both the renderers on their own and the whole logging pipeline are timed.
+
+Run with: python -m benchmarks.bench_console_renderer
+"""
+
+import io
+import timeit
+from contextlib import redirect_stdout
+
+import structlog
+from structlog.dev import RichTracebackFormatter
+
+from mh_structlog import get_logger, setup
+from mh_structlog.console import LightConsoleRenderer
+
+
+NUMBER = 20_000
+# The renderers with the options setup() gives them, and the matching setup() arguments.
+RENDERERS = {
+    "ConsoleRenderer": (
+        structlog.dev.ConsoleRenderer(
+            colors=True,
+            pad_event_to=80,
+            sort_keys=True,
+            event_key="message",
+            exception_formatter=RichTracebackFormatter(width=None, show_locals=True, locals_hide_dunder=True),
+        ),
+        None,
+    ),
+    "LightConsoleRenderer": (LightConsoleRenderer(), {"active": True}),
+}
+
+
+def event_dict() -> dict:
+    return {
+        "timestamp": "2026-01-01T12:00:00.000Z",
+        "level": "info",
+        "message": "request handled",
+        "logger": "myapp.views",
+        "method": "GET",
+        "path": "/orders",
+        "status": 200,
+        "latency_ms": 12,
+    }
+
+
+def application_code() -> None:
+    get_logger("myapp.views").info("request handled", method="GET", path="/orders", status=200, latency_ms=12)
+
+
+def main() -> None:
+    baseline = min(timeit.repeat(event_dict, number=NUMBER, repeat=5))
+    for name, (renderer, light_console_config) in RENDERERS.items():
+        rendering = min(timeit.repeat(lambda: renderer(None, "info", event_dict()), number=NUMBER, repeat=5))  # noqa: B023
+        with redirect_stdout(io.StringIO()):
+            setup(log_format="console", testing_mode=True, light_console_config=light_console_config)
+            pipeline = min(timeit.repeat(application_code, number=NUMBER, repeat=5))
+        print(  # noqa: T201
+            f"{name:>22}: {(rendering - baseline) / NUMBER * 1e6:6.2f} us/event rendering, "
+            f"{pipeline / NUMBER * 1e6:6.2f} us/event end to end"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Benchmark the per-event cost of the json processor chain for an undeclared event and for a declared one.
+
+Run with: python -m benchmarks.bench_event_schemas
+"""
+
+import io
+import timeit
+from contextlib import redirect_stdout
+
+from mh_structlog import declare_event, get_logger, setup
+from mh_structlog.schemas import clear_event_schemas
+
+
+NUMBER = 50_000
+
+
+def application_code() -> None:
+    get_logger("myapp.access").info(
+        "request", method="GET", path="/orders", status=200, latency_ms=12.5, request_user_id=5
+    )
+
+
+def main() -> None:
+    with redirect_stdout(io.StringIO()):
+        setup(log_format="json", testing_mode=True, validate_event_schemas=False)
+        results = {"undeclared": min(timeit.repeat(application_code, number=NUMBER, repeat=5))}
+        declare_event("request", method=str, path=str, status=int, latency_ms=float, request_user_id=int | None)
+        results["declared"] = min(timeit.repeat(application_code, number=NUMBER, repeat=5))
+        clear_event_schemas()
+
+    for name, seconds in results.items():
+        print(f"{name:>12}: {seconds / NUMBER * 1e6:6.2f} us/event")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure the import time of mh_structlog (and a setup() call) with python -X importtime.
+
+Run with: python benchmarks/bench_import_time.py [log_format] [--budget-ms N]
+
+It reports the total time, and the time spent in the modules of mh_structlog itself. Most of the total is structlog
+(which imports Rich itself, when it is installed). With --budget-ms, it exits with an error when the own modules take
+longer than the budget; the tests also check that optional modules are not imported by setup().
+"""
+
+import argparse
+import statistics
+import subprocess  # noqa: S404
+import sys
+
+
+RUNS = 7
+
+
+def measure(log_format: str) -> tuple[float, float, dict[str, float]]:
+    """Return the total import time, the time of the own modules and the self time per own module, in ms."""
+    code = f"import mh_structlog; mh_structlog.setup(log_format={log_format!r})"
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    total = 0.0
+    own: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if name.strip() == "mh_structlog":
+            total = int(cumulative_us) / 1000
+        if name.strip().startswith("mh_structlog"):
+            own[name.strip()] = int(self_us) / 1000
+    return total, sum(own.values()), own
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log_format", nargs="?", default="aws_json")
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [measure(args.log_format) for _ in range(RUNS)]
+    total = statistics.median(run[0] for run in runs)
+    own = statistics.median(run[1] for run in runs)
+    print(f"import mh_structlog + setup(log_format={args.log_format!r}), median of {RUNS} runs")  # noqa: T201
+    print(f"{'total':>40} {total:8.1f} ms")  # noqa: T201
+    print(f"{'mh_structlog modules':>40} {own:8.1f} ms")  # noqa: T201
+    for name, ms in sorted(runs[-1][2].items(), key=lambda item: -item[1]):
+        print(f"{name:>40} {ms:8.1f} ms")  # noqa: T201
+
+    if args.budget_ms is not None and own > args.budget_ms:
+        sys.exit(f"the mh_structlog modules took {own:.1f} ms to import, more than the budget of {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
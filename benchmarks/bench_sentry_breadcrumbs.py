@@ -0,0 +1,52 @@
+"""Benchmark the per-event cost of recording Sentry breadcrumbs for INFO events, eagerly and lazily.
+
+Run with: python -m benchmarks.bench_sentry_breadcrumbs
+"""
+
+import timeit
+
+import sentry_sdk
+from sentry_sdk.transport import Transport
+
+from mh_structlog.sentry import SentryProcessor
+
+
+NUMBER = 100_000
+
+
+class DiscardingTransport(Transport):
+    def capture_envelope(self, envelope) -> None:  # noqa: ANN001
+        pass
+
+
+def event_dict() -> dict:
+    return {
+        "event": "request handled",
+        "level": "info",
+        "logger": "myapp.views",
+        "timestamp": "2026-01-01T12:00:00.000Z",
+        "method": "GET",
+        "path": "/orders",
+        "status": 200,
+        "latency_ms": 12,
+    }
+
+
+def main() -> None:
+    sentry_sdk.init(
+        dsn="https://public@sentry.example.com/1", transport=DiscardingTransport(), default_integrations=False
+    )
+    for lazy in (False, True):
+        processor = SentryProcessor(lazy_breadcrumbs=lazy)
+        with sentry_sdk.isolation_scope():
+            baseline = min(timeit.repeat(event_dict, number=NUMBER, repeat=5))
+            seconds = min(timeit.repeat(lambda: processor(None, "info", event_dict()), number=NUMBER, repeat=5))  # noqa: B023
+            capture = min(timeit.repeat(lambda: sentry_sdk.capture_message("failed"), number=100, repeat=5))
+        print(  # noqa: T201
+            f"lazy_breadcrumbs={lazy!s:>5}: {(seconds - baseline) / NUMBER * 1e6:6.2f} us/INFO event, "
+            f"{capture / 100 * 1e6:8.2f} us/captured event"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark the per-event cost of static fields, added as regular fields versus pre-serialized and spliced in.
+
+Run with: python benchmarks/bench_static_fields.py
+"""
+
+import timeit
+
+from mh_structlog.processors import FieldsAdder, render_orjson
+
+
+STATIC_FIELDS = {
+    "service": "my-service",
+    "env": "production",
+    "version": "1.2.3",
+    "region": "eu-west-1",
+    **{f"static_field_{i}": f"static-value-{i}" for i in range(12)},
+    "deployment": {"cluster": "prod-1", "zone": "eu-west-1a", "labels": {"team": "platform", "tier": "backend"}},
+}
+
+
+def make_event() -> dict:
+    return {
+        "message": "request handled",
+        "level": "info",
+        "logger": "my.module",
+        "timestamp": "2025-12-11T12:01:02.123Z",
+        "status": 200,
+        "latency_ms": 12,
+    }
+
+
+def bench(adder: FieldsAdder, number: int = 200_000) -> float:
+    """Return the time per event in microseconds, for adding the static fields and rendering the event."""
+
+    def run() -> str:
+        return render_orjson(None, "info", adder(None, "info", make_event()))
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    regular = FieldsAdder(STATIC_FIELDS)
+    pre_serialized = FieldsAdder(STATIC_FIELDS, pre_serialize=True)
+
+    regular_us = bench(regular)
+    pre_serialized_us = bench(pre_serialized)
+    print(f"{len(STATIC_FIELDS)} static fields")  # noqa: T201
+    print(f"regular fields:  {regular_us:.2f} us/event")  # noqa: T201
+    print(f"pre-serialized:  {pre_serialized_us:.2f} us/event")  # noqa: T201
+    print(f"saving:          {regular_us - pre_serialized_us:.2f} us/event")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Benchmark the throughput of logging from many threads, with the regular and the per-thread buffered stdout handler.
+
+Run with: python -m benchmarks.bench_thread_buffering
+
+The gain depends on the interpreter: with the GIL, threads mostly wait on the GIL instead of on the handler lock. On a
+free-threaded build (e.g. python3.13t), the per-thread buffers remove the contention on the handler and stream locks.
+"""
+
+import sys
+import sysconfig
+
+from mh_structlog.loadtest import run_loadtest
+
+
+EVENTS = 100_000
+THREAD_COUNTS = [1, 4, 16, 64]
+SINKS = {"StreamHandler": {}, "ThreadBufferedStreamHandler": {"stdout_buffer_config": {}}}
+
+
+def main() -> None:
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"python {sys.version.split()[0]}{' (free-threaded)' if free_threaded else ''}")  # noqa: T201
+    print(f"{'threads':>8} " + " ".join(f"{name:>30}" for name in SINKS))  # noqa: T201
+    for threads in THREAD_COUNTS:
+        rates = []
+        for options in SINKS.values():
+            result = run_loadtest({"log_format": "json", **options}, events=EVENTS, concurrency=threads, sink="pipe")
+            rates.append(f"{result.events_per_second:>21,.0f} events/s")
+        print(f"{threads:>8} " + " ".join(rates))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
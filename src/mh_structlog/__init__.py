@@ -3,7 +3,11 @@ from __future__ import annotations
 from logging import CRITICAL, DEBUG, ERROR, FATAL, INFO, WARN, WARNING
 
 from .config import filter_named_logger, setup
-from .processors import FieldDropper, FieldRenamer, FieldsAdder
+from .context import bind_contextvars, clear_contextvars, unbind_contextvars
+from .processors import FieldDropper, FieldRenamer, FieldsAdder, Redactor
+from .reconfigure import add_handler, remove_handler, set_log_format, set_logger_level, snapshot_config
+from .schemas import declare_event
+from .timing import timed
 from .utils import get_logger, getLogger
 
 
@@ -18,8 +22,19 @@ __all__ = [
     "FieldDropper",
     "FieldRenamer",
     "FieldsAdder",
+    "Redactor",
+    "add_handler",
+    "bind_contextvars",
+    "clear_contextvars",
+    "declare_event",
     "filter_named_logger",
     "getLogger",
     "get_logger",
+    "remove_handler",
+    "set_log_format",
+    "set_logger_level",
     "setup",
+    "snapshot_config",
+    "timed",
+    "unbind_contextvars",
 ]
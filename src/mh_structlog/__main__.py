@@ -0,0 +1,7 @@
+import sys
+
+from mh_structlog.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
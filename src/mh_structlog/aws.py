@@ -1,8 +1,14 @@
+import functools
+import logging
 import os
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, TextIO
 
-import structlog
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
+from . import context, metrics
+
 
 is_cold_start = True
 
@@ -22,12 +28,12 @@ def bind_lambda_context(lambda_context: LambdaContext | None = None) -> None:
     global is_cold_start  # noqa: PLW0603
 
     if lambda_context and getattr(lambda_context, 'function_name', None):
-        structlog.contextvars.clear_contextvars()
+        context.clear_contextvars()
 
         if os.getenv('AWS_LAMBDA_INITIALIZATION_TYPE', '') == "provisioned-concurrency":
             is_cold_start = False
 
-        structlog.contextvars.bind_contextvars(
+        context.bind_contextvars(
             function_name=lambda_context.function_name,
             function_memory_size=lambda_context.memory_limit_in_mb,
             function_arn=lambda_context.invoked_function_arn,
@@ -37,3 +43,108 @@ def bind_lambda_context(lambda_context: LambdaContext | None = None) -> None:
 
         # After the first invocation of an environment, set cold_start to False for further invocations
         is_cold_start = False
+
+
+class _InvocationBuffer:
+    """Stands in for the stream of the stdout handler during an invocation, collecting the rendered lines."""
+
+    def __init__(self, stream: TextIO, lambda_context: LambdaContext | None, max_size: int, min_remaining_ms: int):  # noqa: D107
+        self.stream = stream
+        self.lambda_context = lambda_context
+        self.max_size = max_size
+        self.min_remaining_ms = min_remaining_ms
+        self.parts: list[str] = []
+        self.size = 0
+        self.write_through = False
+
+    def write(self, text: str) -> None:
+        if self.write_through:
+            self.stream.write(text)
+            return
+        self.parts.append(text)
+        self.size += len(text)
+
+    def flush(self) -> None:
+        """Called by the handler after every line: only write out the buffer when it is time to."""
+        if self.write_through:
+            self.stream.flush()
+        elif self.size >= self.max_size:
+            self.drain()
+        elif (
+            self.lambda_context is not None
+            and self.lambda_context.get_remaining_time_in_millis() < self.min_remaining_ms
+        ):
+            # Close to the timeout, the invocation might be killed before the buffer is written; stop buffering.
+            self.drain()
+            self.write_through = True
+
+    def drain(self) -> None:
+        """Write out everything that is buffered, in one write."""
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts.clear()
+            self.size = 0
+        self.stream.flush()
+
+
+def _swap_stream(handler: logging.StreamHandler, stream: TextIO) -> TextIO:
+    with handler.lock:
+        previous = handler.stream
+        handler.stream = stream
+    return previous
+
+
+@contextmanager
+def buffered_output(
+    lambda_context: LambdaContext | None = None, max_buffer_size: int = 256 * 1024, min_remaining_time_ms: int = 1000
+) -> Iterator[None]:
+    """Buffer the lines written to stdout by the logging setup, and write them in one go at the end of the block.
+
+    The buffer is written out earlier when it holds max_buffer_size characters, and from the moment the remaining time
+    of the invocation drops below min_remaining_time_ms, lines are written immediately again. Without setup(), or
+    when stdout is not written by a stream handler (e.g. when capturing logs in tests), nothing is buffered.
+
+    Yields:
+        Nothing; the block runs with buffered output.
+    """
+    handler = logging._handlers.get('mh_structlog_stdout')  # noqa: SLF001
+    if not isinstance(handler, logging.StreamHandler):
+        yield
+        return
+
+    handler.flush()
+    buffer = _InvocationBuffer(handler.stream, lambda_context, max_buffer_size, min_remaining_time_ms)
+    _swap_stream(handler, buffer)  # ty:ignore[invalid-argument-type]
+    try:
+        yield
+    finally:
+        # Handlers which write from a background thread first hand over what they still hold.
+        handler.flush()
+        _swap_stream(handler, buffer.stream)
+        buffer.drain()
+
+
+def buffered_lambda_handler(
+    handler: Callable | None = None, *, max_buffer_size: int = 256 * 1024, min_remaining_time_ms: int = 1000
+) -> Callable:
+    """Decorate a Lambda handler to bind the Lambda context and buffer the log output of each invocation.
+
+    The log lines of an invocation are written to stdout in a single write when the handler returns or raises, see
+    buffered_output(). The metrics aggregated from the events (see setup(metrics_config=...)) are flushed at the end of
+    every invocation, since the environment may be frozen or stopped before the next flush interval. Use it as `@buffered_lambda_handler` or with arguments, e.g.
+    `@buffered_lambda_handler(max_buffer_size=64 * 1024)`.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Any, lambda_context: LambdaContext) -> Any:
+            bind_lambda_context(lambda_context)
+            with buffered_output(lambda_context, max_buffer_size, min_remaining_time_ms):
+                try:
+                    return handler(event, lambda_context)
+                finally:
+                    metrics.flush_metrics()
+
+        return wrapper
+
+    return decorator if handler is None else decorator(handler)
@@ -0,0 +1,174 @@
+"""Compact binary log file format.
+
+A binary log file is a sequence of length-prefixed records. Each record starts with a header of 5 bytes: the length of
+the body (unsigned 32 bit, little endian) and the record kind (1 byte). The kinds are:
+
+- HEADER: marks the start of a new session of a writer; resets the shape table. Body: MAGIC + format version.
+- SHAPE: defines the next shape id. Body: json array of [keys, positions of interned fields, interned values].
+- EVENT: an event of a known shape. Body: shape id (unsigned 32 bit, little endian) + json array of the values which
+  are not interned in the shape.
+- MAP: an event which is not shaped (e.g. when the shape table is full). Body: json object of the whole event.
+
+A shape is the ordered set of keys of an event, together with the values of the fields which repeat over many events
+(the logger name and the level). These are written once per file instead of once per event. Values are encoded with
+orjson, exactly like the json log format, so converting a binary file back produces the same json lines.
+
+The files are about half the size of json log files, at the cost of a somewhat lower write throughput (about 5% in
+benchmarks/bench_binary_file.py), since every event is shaped before it is encoded.
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, BinaryIO
+
+import orjson
+
+from .processors import expand_static_fields
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from structlog.typing import EventDict
+
+
+MAGIC = b'MHSL'
+VERSION = 1
+
+HEADER = 0
+SHAPE = 1
+EVENT = 2
+MAP = 3
+
+_FRAME = struct.Struct('<IB')
+_SHAPE_ID = struct.Struct('<I')
+
+# Fields whose values are interned in the shape of an event.
+INTERNED_FIELDS = ('logger', 'level', 'severity')
+MAX_SHAPES = 65_536
+
+
+def _frame(kind: int, body: bytes) -> bytes:
+    return _FRAME.pack(len(body), kind) + body
+
+
+class BinaryRenderer:
+    """Render event dicts to binary records, to be used as the last processor of a ProcessorFormatter.
+
+    Shape definitions are written inline, right before the first event using them. Since the logging handlers write
+    strings, the bytes are returned decoded as latin-1 (which maps every byte to one character), to be encoded back
+    by the BinaryFileHandler.
+    """
+
+    def __init__(self):  # noqa: D107
+        self._shapes: dict[tuple, tuple[int, tuple[int, ...]]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> str:  # noqa: D102, ARG002
+        expand_static_fields(None, None, event_dict)
+        with self._lock:
+            return self._render(event_dict).decode('latin-1')
+
+    def _render(self, event_dict: EventDict) -> bytes:
+        prefix = b''
+        if not self._started:
+            prefix = _frame(HEADER, MAGIC + bytes([VERSION]))
+            self._started = True
+
+        keys = tuple(event_dict)
+        interned = tuple(event_dict.get(field) for field in INTERNED_FIELDS)
+        try:
+            shape = self._shapes.get((keys, interned))
+        except TypeError:
+            # Unhashable values for the interned fields
+            return prefix + _frame(MAP, orjson.dumps(event_dict, default=repr))
+
+        if shape is None:
+            if len(self._shapes) >= MAX_SHAPES:
+                return prefix + _frame(MAP, orjson.dumps(event_dict, default=repr))
+            positions = tuple(i for i, key in enumerate(keys) if key in INTERNED_FIELDS)
+            shape = self._shapes[keys, interned] = (len(self._shapes), positions)
+            definition = [keys, positions, [event_dict[keys[i]] for i in positions]]
+            prefix += _frame(SHAPE, orjson.dumps(definition, default=repr))
+
+        shape_id, positions = shape
+        values = list(event_dict.values())
+        for i in reversed(positions):
+            del values[i]
+
+        return prefix + _frame(EVENT, _SHAPE_ID.pack(shape_id) + orjson.dumps(values, default=repr))
+
+
+def _iter_frames(stream: BinaryIO, follow: bool, poll_interval: float) -> Iterator[tuple[int, bytes]]:
+    """Read the (kind, body) records from the stream.
+
+    Yields:
+        The kind and body of each record.
+    """
+    buffer = b''
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            if not follow:
+                if buffer:
+                    raise ValueError('Binary log file ends with an incomplete record.')
+                return
+            time.sleep(poll_interval)
+            continue
+        buffer += chunk
+
+        offset = 0
+        while len(buffer) - offset >= _FRAME.size:
+            length, kind = _FRAME.unpack_from(buffer, offset)
+            end = offset + _FRAME.size + length
+            if end > len(buffer):
+                # Incomplete record; wait for the rest of it.
+                break
+            yield kind, buffer[offset + _FRAME.size : end]
+            offset = end
+        buffer = buffer[offset:]
+
+
+def iter_records(stream: BinaryIO, follow: bool = False, poll_interval: float = 0.2) -> Iterator[dict]:
+    """Read the events of a binary log file, as dicts.
+
+    With follow, keep waiting for new records at the end of the file (like `tail -f`), instead of stopping.
+
+    Yields:
+        The event dicts, with their keys in the original order.
+    """
+    shapes: list[tuple[list[str], list[int], list]] = []
+
+    for kind, body in _iter_frames(stream, follow, poll_interval):
+        if kind == EVENT:
+            keys, positions, interned = shapes[_SHAPE_ID.unpack_from(body)[0]]
+            values = orjson.loads(body[_SHAPE_ID.size :])
+            for position, value in zip(positions, interned, strict=True):
+                values.insert(position, value)
+            yield dict(zip(keys, values, strict=True))
+        elif kind == SHAPE:
+            keys, positions, interned = orjson.loads(body)
+            shapes.append((keys, positions, interned))
+        elif kind == MAP:
+            yield orjson.loads(body)
+        elif kind == HEADER:
+            if body[: len(MAGIC)] != MAGIC:
+                raise ValueError('Not a binary log file.')
+            shapes = []
+        else:
+            raise ValueError(f'Unknown record kind {kind} in binary log file.')
+
+
+def convert_to_json(stream: BinaryIO, output: BinaryIO, follow: bool = False) -> int:
+    """Write the events of a binary log file as json lines, like the json log file format. Returns the event count."""
+    count = 0
+    for event_dict in iter_records(stream, follow=follow):
+        output.write(orjson.dumps(event_dict) + b'\n')
+        if follow:
+            output.flush()
+        count += 1
+    return count
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import sys
+from pathlib import Path
+
+from . import binary, config, loadtest, query
+
+
+def _convert(args: argparse.Namespace) -> int:
+    output = sys.stdout.buffer if args.output in {None, '-'} else Path(args.output).open('wb')  # noqa: SIM115
+    try:
+        with Path(args.file).open('rb') as stream:
+            binary.convert_to_json(stream, output, follow=args.follow)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        else:
+            output.flush()
+    return 0
+
+
+def _query(args: argparse.Namespace) -> int:
+    where = {}
+    for condition in args.where:
+        key, sep, value = condition.partition('=')
+        if not sep:
+            raise SystemExit(f'Invalid --where condition {condition!r}, expected key=value.')
+        where[key] = value
+
+    if args.rebuild_index:
+        query.build_index(args.file)
+
+    output = sys.stdout.buffer
+    try:
+        for line in query.query(
+            args.file,
+            since=args.since,
+            until=args.until,
+            level=args.level,
+            logger=args.logger,
+            where=where,
+            store_index=not args.no_store_index,
+        ):
+            output.write(line + b'\n')
+    except ValueError as e:
+        raise SystemExit(str(e)) from e
+    except BrokenPipeError:
+        # e.g. piped into `head`
+        return 0
+    output.flush()
+    return 0
+
+
+def _setup_option_value(value: str) -> object:
+    """Parse the value of a setup() option given on the command line: as json when possible, else as a string."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _loadtest(args: argparse.Namespace) -> int:
+    setup_options = {
+        name: getattr(args, name)
+        for name in inspect.signature(config.setup).parameters
+        if getattr(args, name, None) is not None
+    }
+    try:
+        result = loadtest.run_loadtest(
+            setup_options,
+            events=args.events,
+            concurrency=args.concurrency,
+            mode=args.mode,
+            sink=args.sink,
+            warmup=args.warmup,
+            seed=args.seed,
+        )
+    except (ValueError, config.StructlogLoggingConfigExceptionError) as e:
+        raise SystemExit(str(e)) from e
+
+    if args.json:
+        print(json.dumps({**result._asdict(), 'events_per_second': result.events_per_second}))  # noqa: T201
+    else:
+        print(result.format())  # noqa: T201
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the `python -m mh_structlog` command."""
+    parser = argparse.ArgumentParser(prog='python -m mh_structlog', description='Tools for mh_structlog log files.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser(
+        'convert', help='Convert a binary log file (log_file_format="binary") to json lines, like the json log format.'
+    )
+    convert.add_argument('file', help='The binary log file.')
+    convert.add_argument('-o', '--output', help='The file to write the json lines to (default: stdout).')
+    convert.add_argument(
+        '-f', '--follow', action='store_true', help='Keep streaming new records as they are written, like `tail -f`.'
+    )
+    convert.set_defaults(func=_convert)
+
+    query_parser = subparsers.add_parser(
+        'query', help='Print the lines of a json log file (log_file_format="json") matching all given filters.'
+    )
+    query_parser.add_argument('file', help='The json log file.')
+    query_parser.add_argument('--since', help='Only events at or after this ISO timestamp (e.g. 2025-01-31T12:00Z).')
+    query_parser.add_argument('--until', help='Only events before this ISO timestamp.')
+    query_parser.add_argument('--level', help='Only events with at least this level (e.g. warning).')
+    query_parser.add_argument('--logger', help='Only events of this logger or its children.')
+    query_parser.add_argument(
+        '-w',
+        '--where',
+        action='append',
+        default=[],
+        metavar='KEY=VALUE',
+        help='Only events where the field has this value; can be given multiple times.',
+    )
+    query_parser.add_argument(
+        '--rebuild-index', action='store_true', help='Rebuild the index of the log file from scratch first.'
+    )
+    query_parser.add_argument(
+        '--no-store-index',
+        action='store_true',
+        help='Do not store the index entries for the part of the log file which was not indexed yet.',
+    )
+    query_parser.set_defaults(func=_query)
+
+    loadtest_parser = subparsers.add_parser(
+        'loadtest',
+        help='Measure the throughput and latency of the logging pipeline, configured with the given setup() options.',
+        description='Besides the options below, every argument of setup() can be given as an option, e.g. '
+        '--log-format json --include-source-location true --sentry-config \'{"active": false}\'. '
+        'Values are parsed as json when possible.',
+    )
+    loadtest_parser.add_argument('--events', type=int, default=100_000, help='Total number of events to log.')
+    loadtest_parser.add_argument('-c', '--concurrency', type=int, default=1, help='Number of workers.')
+    loadtest_parser.add_argument('--mode', choices=loadtest.MODES, default='threads', help='How the workers run.')
+    loadtest_parser.add_argument(
+        '--sink', choices=loadtest.SINKS, default='null', help='Discard stdout (null) or write it to an OS pipe (pipe).'
+    )
+    loadtest_parser.add_argument('--warmup', type=int, default=1_000, help='Events per worker before measuring.')
+    loadtest_parser.add_argument('--seed', type=int, default=0, help='Seed for the random event mix.')
+    loadtest_parser.add_argument('--json', action='store_true', help='Print the result as json.')
+    setup_options = loadtest_parser.add_argument_group('setup() options')
+    for name in inspect.signature(config.setup).parameters:
+        if name != 'testing_mode':
+            setup_options.add_argument(f'--{name.replace("_", "-")}', dest=name, type=_setup_option_value)
+    loadtest_parser.set_defaults(func=_loadtest)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entrypoint of the `python -m mh_structlog` command."""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
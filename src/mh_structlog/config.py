@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import contextvars
 import logging  # noqa: I001
 import logging.config
 import os
@@ -8,53 +9,87 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Literal
 
 import structlog
-from structlog.dev import RichTracebackFormatter
-from structlog.processors import CallsiteParameter
 
-from . import processors
+from . import context, formatters, processors, schemas, timing
 
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, MutableSequence
 
 
 SELECTED_LOG_FORMAT = 'console'
+# The formatters setup() can build, for the log formats of stdout and the log file.
+BUILTIN_FORMATTERS = ("mh_structlog_plain", "mh_structlog_colored", "mh_structlog_json")
+# The handlers and formatters of routes are named with this prefix and the name of the route.
+ROUTE_PREFIX = "mh_structlog_route_"
+# The arguments of the last setup() call, used by mh_structlog.reconfigure to rebuild parts of the configuration.
+LAST_SETUP_ARGUMENTS: dict | None = None
+
+# Whether the request log summary processor is in the structlog chain; set when a summary middleware is created.
+_request_log_summary_requested = False
+
+# When set, setup() keeps the existing handlers and only gives them new formatters, instead of running dictConfig.
+_replace_formatters_only: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    'mh_structlog_replace_formatters_only', default=False
+)
 
 
 class StructlogLoggingConfigExceptionError(Exception):
     """Exception to raise if the config is not correct."""
 
 
-def setup(  # noqa: PLR0912, PLR0915, C901
+def setup(  # noqa: PLR0912, PLR0913, PLR0914, PLR0915, PLR0917, C901
     log_format: Literal["console", "json", "gcp_json", "aws_json"] | None = None,
     logging_configs: list[dict] | None = None,
-    include_source_location: bool = False,  # noqa: FBT001, FBT002
+    include_source_location: bool | Literal["location"] = False,  # noqa: FBT001, FBT002
     global_filter_level: int | None = None,
     log_file: str | Path | None = None,
-    log_file_format: Literal["console", "json"] | None = None,
+    log_file_format: Literal["console", "json", "binary"] | None = None,
+    log_file_index: bool = False,  # noqa: FBT001, FBT002
     testing_mode: bool = False,  # noqa: FBT001, FBT002
     max_frames: int = 100,
     sentry_config: dict | None = None,
     additional_processors: list | None = None,  # noqa: FBT001, FBT002
     timestamp_ms_precision: bool | None = True,
     dump_objects_as_dict: bool | None = True,
+    profile_processors: bool | dict = False,  # noqa: FBT001, FBT002
+    stdout_spill_config: dict | None = None,
+    field_size_limits: dict | None = None,
+    redaction_config: dict | None = None,
+    pre_serialize_contextvars: bool = False,  # noqa: FBT001, FBT002
+    otlp_config: dict | None = None,
+    stdout_buffer_config: dict | None = None,
+    capture: MutableSequence | None = None,
+    routes: list[dict] | None = None,
+    metrics_config: dict | None = None,
+    validate_event_schemas: bool | None = None,
+    light_console_config: dict | None = None,
+    request_log_summary: bool = False,  # noqa: FBT001, FBT002
 ) -> None:
     """This method configures structlog and the standard library logging module."""
-    global SELECTED_LOG_FORMAT  # noqa: PLW0603
+    global SELECTED_LOG_FORMAT, LAST_SETUP_ARGUMENTS  # noqa: PLW0603
+    arguments = dict(locals())
+    replace_formatters_only = _replace_formatters_only.get()
 
     # Unless we are in testing mode, don't configure logging if it was already configured.
     # During testing, we need te flexibility to configure logging multiple times.
-    if structlog.is_configured() and not testing_mode:
+    if structlog.is_configured() and not testing_mode and not replace_formatters_only:
         from logging import getLogger  # noqa: PLC0415
 
         getLogger('mh_structlog').warning('logging was already configured, so I return and do nothing.')
         return
+    LAST_SETUP_ARGUMENTS = arguments
 
     shared_processors: list[Callable] = [
         structlog.stdlib.add_logger_name,  # add the logger name
         structlog.stdlib.add_log_level,  # add the log level as textual representation
-        structlog.processors.TimeStamper(fmt="iso", utc=True),  # add a timestamp
-        structlog.contextvars.merge_contextvars,  # add variables and bound data from global context
+        processors.add_timestamp,  # add a timestamp
+        # add variables and bound data from global context (from a cached snapshot)
+        context.merge_contextvars_pre_serialized if pre_serialize_contextvars else context.merge_contextvars,
+        # Expand logged event records, and check declared events (by default only in testing mode).
+        schemas.EventSchemaProcessor(
+            validate=testing_mode if validate_event_schemas is None else validate_event_schemas
+        ),
     ]
 
     if timestamp_ms_precision:
@@ -78,12 +113,28 @@ def setup(  # noqa: PLR0912, PLR0915, C901
                 log_format = "aws_json"
     if log_format not in {"console", "json", "gcp_json", "aws_json"}:
         raise StructlogLoggingConfigExceptionError("Unknown logging format requested.")
+    # Capturing replaces the stdout handler, which routes replace as well.
+    if capture is not None and routes:
+        raise StructlogLoggingConfigExceptionError("capture can not be combined with routes.")
+
+    # Render console output with the lightweight renderer, instead of structlog's ConsoleRenderer.
+    if light_console_config is not None and not light_console_config.get('active', True):
+        light_console_config = None
+
+    # Profile with profile_processors=True, or a dict with 'active' and the arguments of enable_profiling.
+    if isinstance(profile_processors, dict) and not profile_processors.get('active', True):
+        profile_processors = False
 
     SELECTED_LOG_FORMAT = log_format
 
     if dump_objects_as_dict and log_format in {"json", "gcp_json", "aws_json"}:
         shared_processors.append(processors.ObjectToDictTransformer())
 
+    # Scrub secrets from the rendered events (see below) and from what is sent to Sentry.
+    redactor = None
+    if redaction_config is not None and redaction_config.get('active', True):
+        redactor = processors.Redactor(**_options(redaction_config))
+
     if sentry_config and sentry_config.get('active', True):
         try:
             from . import sentry  # noqa: PLC0415
@@ -98,7 +149,7 @@ def setup(  # noqa: PLR0912, PLR0915, C901
         #
         # When you specify ignore_loggers manually, it is not ignored anymore, so you should add it yourself (when wanted).
         sentry_config.setdefault('ignore_loggers', ['mh_structlog.django.access'])
-        shared_processors.append(sentry.SentryProcessor(**sentry_config))
+        shared_processors.append(sentry.SentryProcessor(**{'redactor': redactor, **sentry_config}))
     else:
         # In case logging statements add sentry_skip, but Sentry isn't configured at all, we do not want to output that key.
         shared_processors.append(processors.FieldDropper(['sentry_skip']))
@@ -113,8 +164,11 @@ def setup(  # noqa: PLR0912, PLR0915, C901
 
     if include_source_location:
         shared_processors.append(
-            structlog.processors.CallsiteParameterAdder(
-                parameters={CallsiteParameter.PATHNAME, CallsiteParameter.LINENO, CallsiteParameter.FUNC_NAME}
+            processors.CallsiteLocationAdder(
+                # A single 'location' field, or the separate pathname, lineno and func_name fields.
+                compact=include_source_location == 'location',
+                # The timing wrappers add a frame between structlog and the application code.
+                additional_ignores=['mh_structlog.profiling'] if profile_processors else None,
             )
         )
 
@@ -148,17 +202,59 @@ def setup(  # noqa: PLR0912, PLR0915, C901
             )
         wrapper_class = structlog.make_filtering_bound_logger(global_filter_level)
 
+    # Spans of timed() below the global filter level would not be logged, so they are not measured either.
+    timing.set_global_filter_level(global_filter_level)
+
+    structlog_processors = [
+        *shared_processors,
+        structlog.stdlib.filter_by_level,  # filter based on the stdlib logging config
+        structlog.stdlib.PositionalArgumentsFormatter(),  # Allow string formatting with positional arguments in log calls
+        structlog.processors.StackInfoRenderer(
+            additional_ignores=['mh_structlog']
+        ),  # when you create a log and specify stack_info=True, add a stacktrace to the log
+        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+    ]
+
+    # Count and measure events in process, logged as aggregates on every flush (in EMF for aws_json).
+    if metrics_config is not None and metrics_config.get('active', True):
+        from . import metrics  # noqa: PLC0415
+
+        metrics_options = {'emf': log_format == 'aws_json', **_options(metrics_config)}
+        # When only the log format changes, the aggregates collected so far are kept.
+        aggregator = metrics.get_metrics_aggregator() if replace_formatters_only else None
+        if aggregator is None:
+            aggregator = metrics.enable_metrics(metrics.MetricsAggregator(**metrics_options))
+        else:
+            aggregator.set_emf(metrics_options['emf'])
+        structlog_processors.insert(-1, aggregator)
+    elif 'mh_structlog.metrics' in sys.modules:
+        # Aggregated by an earlier setup(): its stale aggregates would otherwise still be flushed.
+        sys.modules['mh_structlog.metrics'].disable_metrics()
+
+    # Fold the events of a request into its summary, only while one is active (see mh_structlog.django). After the
+    # metrics, so the events folded into it are aggregated as well.
+    if request_log_summary or _request_log_summary_requested:
+        structlog_processors.insert(-1, processors.aggregate_into_request_log_summary)
+
+    # When profiling, every processor gets wrapped in a timer. Without it, the chains are used as-is.
+    profiler = None
+    if profile_processors:
+        from . import profiling  # noqa: PLC0415
+
+        # When only the log format changes, the timings collected so far are kept.
+        profiler = profiling.get_profiler() if replace_formatters_only else None
+        if profiler is None:
+            profiling_options = profile_processors if isinstance(profile_processors, dict) else {}
+            profiler = profiling.enable_profiling(**_options(profiling_options))
+    elif 'mh_structlog.profiling' in sys.modules:
+        # Profiled by an earlier setup(): its profiler would otherwise still report at exit.
+        sys.modules['mh_structlog.profiling'].disable_profiling()
+    if profiler is not None:
+        structlog_processors = profiler.wrap_chain('structlog', structlog_processors)
+
     # Structlog configuration
     structlog.configure(
-        processors=[
-            *shared_processors,
-            structlog.stdlib.filter_by_level,  # filter based on the stdlib logging config
-            structlog.stdlib.PositionalArgumentsFormatter(),  # Allow string formatting with positional arguments in log calls
-            structlog.processors.StackInfoRenderer(
-                additional_ignores=['mh_structlog']
-            ),  # when you create a log and specify stack_info=True, add a stacktrace to the log
-            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
-        ],
+        processors=structlog_processors,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=wrapper_class,
         cache_logger_on_first_use=not testing_mode,  # https://www.structlog.org/en/stable/testing.html#testing
@@ -168,59 +264,7 @@ def setup(  # noqa: PLR0912, PLR0915, C901
     stdlib_logging_config = {
         "version": 1,
         "disable_existing_loggers": False,
-        "formatters": {
-            "mh_structlog_plain": {
-                "()": structlog.stdlib.ProcessorFormatter,
-                "processors": [
-                    processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
-                    structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
-                    structlog.processors.EventRenamer("message"),
-                    structlog.dev.ConsoleRenderer(
-                        colors=False,
-                        force_colors=False,
-                        pad_event_to=80,
-                        sort_keys=True,
-                        event_key="message",
-                        exception_formatter=RichTracebackFormatter(
-                            width=None, max_frames=max_frames, show_locals=True, locals_hide_dunder=True
-                        ),
-                    ),
-                ],
-                "foreign_pre_chain": shared_processors,
-            },
-            "mh_structlog_colored": {
-                "()": structlog.stdlib.ProcessorFormatter,
-                "processors": [
-                    processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
-                    structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
-                    structlog.processors.EventRenamer("message"),
-                    structlog.dev.ConsoleRenderer(
-                        colors=True,
-                        pad_event_to=80,
-                        sort_keys=True,
-                        event_key="message",
-                        exception_formatter=RichTracebackFormatter(
-                            width=None, max_frames=max_frames, show_locals=True, locals_hide_dunder=True
-                        ),
-                    ),
-                ],
-                "foreign_pre_chain": shared_processors,
-            },
-            "mh_structlog_json": {
-                "()": structlog.stdlib.ProcessorFormatter,
-                "processors": [
-                    processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
-                    structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
-                    structlog.processors.EventRenamer("message"),
-                    processors.FieldRenamer(
-                        log_format == 'gcp_json', 'level', 'severity'
-                    ),  # rename the level field for GCP
-                    processors.FieldTransformer(log_format == 'aws_json', 'level', lambda v: v.upper()),
-                    processors.render_orjson,
-                ],
-                "foreign_pre_chain": shared_processors,
-            },
-        },
+        "formatters": {},
         "filters": {},
         "handlers": {
             "mh_structlog_stdout": {
@@ -244,26 +288,74 @@ def setup(  # noqa: PLR0912, PLR0915, C901
         },
     }
 
+    # Only the formatters which are used get built; e.g. json output does not need the console renderers.
+    def use_formatter(name: str) -> None:
+        if name not in stdlib_logging_config['formatters'] and name in BUILTIN_FORMATTERS:
+            stdlib_logging_config['formatters'][name] = _builtin_formatter(
+                name, shared_processors, log_format, max_frames, light_console_config
+            )
+
+    use_formatter(selected_formatter)
+    for lc in logging_configs or []:
+        for v in lc.get("handlers", {}).values():
+            use_formatter(v.get("formatter") or _default_handler_formatter(v, selected_formatter))
+
+    # Never block the logging threads on a stalled stdout consumer; spill to a local file instead.
+    if stdout_spill_config is not None and stdout_spill_config.get('active', True):
+        stdlib_logging_config['handlers']['mh_structlog_stdout'].update(
+            {"class": "mh_structlog.handlers.SpillingStreamHandler", **_options(stdout_spill_config)}
+        )
+
+    # Let each thread format into its own buffer, merged into stdout by a single flusher; no shared lock when logging.
+    if stdout_buffer_config is not None and stdout_buffer_config.get('active', True):
+        if stdout_spill_config is not None and stdout_spill_config.get('active', True):
+            raise StructlogLoggingConfigExceptionError(
+                "stdout_spill_config and stdout_buffer_config can not be used together."
+            )
+        stdlib_logging_config['handlers']['mh_structlog_stdout'].update(
+            {"class": "mh_structlog.handlers.ThreadBufferedStreamHandler", **_options(stdout_buffer_config)}
+        )
+
     # Add a handler to output to a file
     if log_file:
         # Select formatter
         if log_file_format is None:
             log_file_format = "console" if sys.stdout.isatty() else "json"
-        if log_file_format not in {"console", "json"}:
+        if log_file_format not in {"console", "json", "binary"}:
             raise StructlogLoggingConfigExceptionError("Unknown logging format requested.")
 
+        file_handler_class = "logging.FileHandler"
         if log_file_format == "console":
             selected_file_formatter = "mh_structlog_plain"
         elif log_file_format == "json":
             selected_file_formatter = "mh_structlog_json"
+        elif log_file_format == "binary":
+            selected_file_formatter = "mh_structlog_binary"
+            file_handler_class = "mh_structlog.handlers.BinaryFileHandler"
+            from . import binary  # noqa: PLC0415
+
+            # Same chain as the json formatter, with a binary renderer; converting the file gives the same json lines.
+            json_formatter = _builtin_formatter("mh_structlog_json", shared_processors, log_format, max_frames)
+            stdlib_logging_config['formatters']['mh_structlog_binary'] = {
+                **json_formatter,
+                "processors": [*json_formatter['processors'][:-1], binary.BinaryRenderer()],
+            }
+
+        if log_file_index:
+            if log_file_format != "json":
+                raise StructlogLoggingConfigExceptionError(
+                    "log_file_index is only supported for the json log file format."
+                )
+            file_handler_class = "mh_structlog.handlers.IndexedFileHandler"
 
         log_file = Path(log_file)
         log_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Add a handler with file output to the root logger
+        use_formatter(selected_file_formatter)
         stdlib_logging_config['handlers']['mh_structlog_file'] = {
             "level": "DEBUG" if global_filter_level is None else logging.getLevelName(global_filter_level),
-            "class": "logging.FileHandler",
+            "class": file_handler_class,
             "formatter": selected_file_formatter,
             'filename': str(log_file.resolve()),
         }
@@ -275,6 +367,80 @@ def setup(  # noqa: PLR0912, PLR0915, C901
             "propagate": False,
         }
 
+    # Export to an OpenTelemetry collector, next to stdout (and the file).
+    otlp_active = bool(otlp_config) and otlp_config.get('active', True)
+    if otlp_active:
+        from . import otlp  # noqa: PLC0415
+
+        stdlib_logging_config['formatters']['mh_structlog_otlp'] = {
+            "()": formatters.RenderOnceProcessorFormatter,
+            "processors": [
+                processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
+                structlog.processors.EventRenamer("message"),
+                structlog.processors.format_exc_info,  # when the exceptions are not structured already (console output)
+                otlp.OTLPRenderer(),
+            ],
+            "foreign_pre_chain": shared_processors,
+        }
+        stdlib_logging_config['handlers']['mh_structlog_otlp'] = {
+            "level": "DEBUG" if global_filter_level is None else logging.getLevelName(global_filter_level),
+            "class": "mh_structlog.handlers.OTLPHandler",
+            "formatter": "mh_structlog_otlp",
+            **_options(otlp_config),
+        }
+        stdlib_logging_config['loggers']['']['handlers'].append('mh_structlog_otlp')
+
+    # Route the events to outputs by level and logger name, instead of sending all of them to stdout.
+    default_handlers = ["mh_structlog_stdout"]
+    if routes:
+        default_handlers = _configure_routes(
+            stdlib_logging_config, routes, shared_processors, log_format, max_frames, light_console_config
+        )
+        root_logger_config = stdlib_logging_config['loggers']['']
+        stdout_index = root_logger_config['handlers'].index("mh_structlog_stdout")
+        root_logger_config['handlers'][stdout_index : stdout_index + 1] = default_handlers
+        if not log_file and not otlp_active:
+            # Events below the level of every route are dropped before they are processed at all.
+            min_route_level = min(_level(route.get('level', logging.NOTSET)) for route in routes)
+            root_level = logging._nameToLevel[root_logger_config['level']]  # noqa: SLF001
+            root_logger_config['level'] = logging.getLevelName(max(root_level, min_route_level))
+
+    # Scrub secrets right before rendering, so also the fields added by the other processors (the exception,
+    # the call site) and the 'extra' of stdlib log records are covered.
+    if redactor is not None:
+        for formatter_config in stdlib_logging_config['formatters'].values():
+            formatter_config['processors'].insert(-1, redactor)
+
+    # Cap oversized values after the scrubbing: a secret cut in half could slip past the value patterns of the redactor.
+    if field_size_limits is not None and field_size_limits.get('active', True):
+        field_size_guard = processors.FieldSizeGuard(**_options(field_size_limits))
+        for formatter_config in stdlib_logging_config['formatters'].values():
+            formatter_config['processors'].insert(-1, field_size_guard)
+
+    # Capture the processed event dicts in memory instead of rendering them to stdout (for test suites).
+    if capture is not None:
+        from . import testing  # noqa: PLC0415
+
+        stdlib_logging_config['formatters']['mh_structlog_capture'] = {
+            **stdlib_logging_config['formatters'][selected_formatter],
+            "processors": [
+                *stdlib_logging_config['formatters'][selected_formatter]['processors'][:-1],
+                testing.CaptureRenderer(capture),
+            ],
+        }
+        stdlib_logging_config['handlers']['mh_structlog_stdout'] = {
+            "level": stdlib_logging_config['handlers']['mh_structlog_stdout']['level'],
+            "class": "mh_structlog.testing.CaptureHandler",
+            "formatter": "mh_structlog_capture",
+        }
+
+    if profiler is not None:
+        foreign_pre_chain = profiler.wrap_chain('foreign_pre_chain', shared_processors)
+        for formatter_name, formatter_config in stdlib_logging_config['formatters'].items():
+            formatter_config['processors'] = profiler.wrap_chain(formatter_name, formatter_config['processors'])
+            formatter_config['foreign_pre_chain'] = foreign_pre_chain
+
     # Merge in additional logging configs that were passed in by the caller.
     if logging_configs:
         for lc in logging_configs:
@@ -285,9 +451,11 @@ def setup(  # noqa: PLR0912, PLR0915, C901
                     )
                 # Add our handler if none was specified explicitly
                 if "handlers" not in v:
-                    v["handlers"] = ["mh_structlog_stdout"]
+                    v["handlers"] = list(default_handlers)
                     if log_file:
                         v['handlers'].append('mh_structlog_file')
+                    if otlp_active:
+                        v['handlers'].append('mh_structlog_otlp')
                 if "level" not in v:
                     v["level"] = "DEBUG" if global_filter_level is None else logging.getLevelName(global_filter_level)
                     v["propagate"] = False
@@ -295,14 +463,15 @@ def setup(  # noqa: PLR0912, PLR0915, C901
             for k, v in lc.get("handlers", {}).items():
                 # Set the formatter to ours if none was specified explicitly
                 if "formatter" not in v:
-                    # If we are logging to a file and we do not do json format, use the non-colored formatter
-                    if "file" in v["class"].lower() and selected_formatter == "mh_structlog_colored":
-                        v["formatter"] = "mh_structlog_plain"
-                    else:
-                        v["formatter"] = selected_formatter
+                    v["formatter"] = _default_handler_formatter(v, selected_formatter)
                 stdlib_logging_config["handlers"][k] = v
             for k, v in lc.get("formatters", {}).items():
-                if k in {"mh_structlog_plain", "mh_structlog_colored", "mh_structlog_json"}:
+                if k in {
+                    *BUILTIN_FORMATTERS,
+                    "mh_structlog_binary",
+                    "mh_structlog_otlp",
+                    "mh_structlog_capture",
+                } or k.startswith(ROUTE_PREFIX):
                     raise StructlogLoggingConfigExceptionError(
                         f"It is not allowed to specify a formatter with the name {k}, since structlog configures that one."
                     )
@@ -310,7 +479,201 @@ def setup(  # noqa: PLR0912, PLR0915, C901
             for k, v in lc.get("filters", {}).items():
                 stdlib_logging_config["filters"][k] = v
 
-    logging.config.dictConfig(stdlib_logging_config)
+    if replace_formatters_only:
+        _replace_formatters(stdlib_logging_config)
+    else:
+        logging.config.dictConfig(stdlib_logging_config)
+
+
+def _default_handler_formatter(handler_config: dict, selected_formatter: str) -> str:
+    """Return the formatter for a handler passed in logging_configs without one."""
+    # If we are logging to a file and we do not do json format, use the non-colored formatter
+    if "file" in handler_config["class"].lower() and selected_formatter == "mh_structlog_colored":
+        return "mh_structlog_plain"
+    return selected_formatter
+
+
+def _builtin_formatter(
+    name: str,
+    shared_processors: list[Callable],
+    log_format: str,
+    max_frames: int,
+    light_console_config: dict | None = None,
+) -> dict:
+    """Return the dictConfig definition of one of the BUILTIN_FORMATTERS."""
+    if name == "mh_structlog_json":
+        return {
+            "()": formatters.RenderOnceProcessorFormatter,
+            "processors": [
+                processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
+                structlog.processors.EventRenamer("message"),
+                processors.FieldRenamer(
+                    log_format == 'gcp_json', 'level', 'severity'
+                ),  # rename the level field for GCP
+                processors.FieldTransformer(log_format == 'aws_json', 'level', lambda v: v.upper()),
+                processors.render_orjson,
+            ],
+            "foreign_pre_chain": shared_processors,
+        }
+
+    if light_console_config is not None:
+        from . import console  # noqa: PLC0415
+
+        renderer = console.LightConsoleRenderer(
+            **{'colors': name == "mh_structlog_colored", 'max_frames': max_frames, **_options(light_console_config)}
+        )
+    else:
+        from structlog.dev import RichTracebackFormatter  # noqa: PLC0415
+
+        renderer = structlog.dev.ConsoleRenderer(
+            colors=name == "mh_structlog_colored",
+            force_colors=False,
+            pad_event_to=80,
+            sort_keys=True,
+            event_key="message",
+            exception_formatter=RichTracebackFormatter(
+                width=None, max_frames=max_frames, show_locals=True, locals_hide_dunder=True
+            ),
+        )
+
+    return {
+        "()": formatters.RenderOnceProcessorFormatter,
+        "processors": [
+            processors.add_flattened_extra,  # extract the content of 'extra' and add it as entries in the event dict
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,  # remove some fields used by structlogs internal logic
+            processors.expand_static_fields,  # the console renderer cannot splice in pre-serialized fields
+            structlog.processors.EventRenamer("message"),
+            renderer,
+        ],
+        "foreign_pre_chain": shared_processors,
+    }
+
+
+def _options(option_config: dict) -> dict:
+    """Return the arguments in an option dict, without its 'active' switch."""
+    return {k: v for k, v in option_config.items() if k != 'active'}
+
+
+def _level(level: int | str) -> int:
+    levelno = logging._nameToLevel.get(level.upper()) if isinstance(level, str) else level  # noqa: SLF001
+    if levelno is None:
+        raise StructlogLoggingConfigExceptionError(f"Unknown level {level} in a route.")
+    return levelno
+
+
+def _configure_routes(  # noqa: PLR0913, PLR0917
+    stdlib_logging_config: dict,
+    routes: list[dict],
+    shared_processors: list[Callable],
+    log_format: str,
+    max_frames: int,
+    light_console_config: dict | None = None,
+) -> list[str]:
+    """Add a handler and formatter per route to the logging config; return the names of the handlers."""
+    from . import routing  # noqa: PLC0415
+
+    route_keys = {
+        'name',
+        'level',
+        'max_level',
+        'loggers',
+        'continue',
+        'log_format',
+        'processors',
+        'handler',
+        'sample_rate',
+        'async',
+        'queue_size',
+    }
+    rules = []
+    handler_names = []
+    router = routing.Router(rules)
+    for route in routes:
+        if unknown := set(route) - route_keys:
+            raise StructlogLoggingConfigExceptionError(f"Unknown keys in a route: {', '.join(sorted(unknown))}.")
+        if 'name' not in route:
+            raise StructlogLoggingConfigExceptionError("Every route needs a name.")
+        name = ROUTE_PREFIX + route['name']
+        if name in handler_names:
+            raise StructlogLoggingConfigExceptionError(f"There are multiple routes with the name {route['name']}.")
+        rules.append(
+            routing.Route(
+                name=name,
+                level=_level(route.get('level', logging.NOTSET)),
+                max_level=_level(route['max_level']) if route.get('max_level') is not None else None,
+                loggers=tuple(route.get('loggers', ())),
+                continue_=route.get('continue', False),
+            )
+        )
+
+        # The processor tail and renderer of the route.
+        route_format = route.get('log_format', log_format)
+        if route_format == "console":
+            formatter = _builtin_formatter(
+                "mh_structlog_colored", shared_processors, log_format, max_frames, light_console_config
+            )
+        elif route_format == "plain":
+            formatter = _builtin_formatter(
+                "mh_structlog_plain", shared_processors, log_format, max_frames, light_console_config
+            )
+        elif route_format in {"json", "gcp_json", "aws_json"}:
+            formatter = _builtin_formatter("mh_structlog_json", shared_processors, route_format, max_frames)
+        else:
+            raise StructlogLoggingConfigExceptionError(f"Unknown log format {route_format} in a route.")
+        formatter['processors'][-1:-1] = route.get('processors', [])
+        stdlib_logging_config['formatters'][name] = formatter
+
+        # The sink of the route, written from a background thread when async.
+        handler = dict(route.get('handler', {"class": "logging.StreamHandler", "stream": "ext://sys.stdout"}))
+        if route.get('async', False):
+            handler = {
+                "class": "mh_structlog.handlers.AsyncHandler",
+                "handler": handler,
+                **({"queue_size": route['queue_size']} if 'queue_size' in route else {}),
+            }
+        stdlib_logging_config['filters'][name] = {
+            "()": routing.RouteFilter,
+            "router": router,
+            "route_name": name,
+            "sample_rate": route.get('sample_rate', 1.0),
+        }
+        stdlib_logging_config['handlers'][name] = {**handler, "formatter": name, "filters": [name]}
+        handler_names.append(name)
+
+    return handler_names
+
+
+def _replace_formatters(stdlib_logging_config: dict) -> None:
+    """Give the configured handlers the formatters of a new config, keeping the handlers themselves (and their state)."""
+    configurator = logging.config.DictConfigurator(stdlib_logging_config)
+    formatters_config = configurator.config['formatters']
+    built: dict[str, logging.Formatter] = {}
+    for handler_name, handler_config in stdlib_logging_config['handlers'].items():
+        handler = logging._handlers.get(handler_name)  # noqa: SLF001
+        formatter_name = handler_config.get('formatter')
+        if handler is None or formatter_name is None:
+            continue
+        if formatter_name not in built:
+            # One instance per formatter name, shared by its handlers, like dictConfig does.
+            built[formatter_name] = configurator.configure_formatter(formatters_config[formatter_name])
+        handler.setFormatter(built[formatter_name])
+
+
+def enable_request_log_summaries() -> None:
+    """Add the processor which folds events into the active request log summary to the configured structlog chain.
+
+    Called by the request summary middleware, also for the later setup() calls. Without it (or
+    setup(request_log_summary=True)), the events are not handed to a summary started with start_request_log_summary().
+    """
+    global _request_log_summary_requested  # noqa: PLW0603
+
+    _request_log_summary_requested = True
+    # The configured list itself, which also loggers cached on first use process with.
+    chain = structlog.get_config()['processors']
+    if not any(getattr(p, 'processor', p) is processors.aggregate_into_request_log_summary for p in chain):
+        # Before wrap_for_formatter, which comes last.
+        chain.insert(len(chain) - 1, processors.aggregate_into_request_log_summary)
 
 
 def filter_named_logger(logger_name: str, level: int) -> dict:
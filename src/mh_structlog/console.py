@@ -0,0 +1,123 @@
+"""A lightweight console renderer, for high-volume terminal and CI output.
+
+structlog's ConsoleRenderer styles every part of a line separately, sorts the keys and formats exceptions with Rich.
+LightConsoleRenderer renders the same kind of line with precomputed level prefixes, keeps the keys in the order they
+were logged (unless sort_keys is set) and formats exceptions with the traceback module.
+
+    2026-01-01T12:00:00.000Z [info     ] request handled [myapp.views] method=GET status=200
+"""
+
+from __future__ import annotations
+
+import sys
+import traceback
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from structlog.typing import EventDict
+
+
+RESET = '\033[0m'
+BRIGHT = '\033[1m'
+DIM = '\033[2m'
+RED = '\033[31m'
+GREEN = '\033[32m'
+YELLOW = '\033[33m'
+BLUE = '\033[34m'
+MAGENTA = '\033[35m'
+CYAN = '\033[36m'
+
+LEVEL_COLORS = {
+    'critical': RED + BRIGHT,
+    'exception': RED,
+    'error': RED,
+    'warn': YELLOW,
+    'warning': YELLOW,
+    'info': GREEN,
+    'debug': GREEN,
+    'notset': '',
+}
+
+
+def _exc_info(value: Any) -> tuple | None:
+    """Turn the exc_info of an event into an exception tuple, like the logging module does."""
+    if isinstance(value, BaseException):
+        return (type(value), value, value.__traceback__)
+    if isinstance(value, tuple):
+        return value if value[0] is not None else None
+    if value:
+        exc_info = sys.exc_info()
+        return exc_info if exc_info[0] is not None else None
+    return None
+
+
+class LightConsoleRenderer:
+    """Render an event dict as a single (optionally colored) console line, followed by its stack and exception."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        colors: bool = True,  # noqa: FBT001, FBT002
+        sort_keys: bool = False,  # noqa: FBT001, FBT002
+        pad_event_to: int = 0,
+        event_key: str = 'message',
+        max_frames: int = 100,
+    ):
+        """Precompute the styling of the parts of a line."""
+        self.colors = colors
+        self.sort_keys = sort_keys
+        self.pad_event_to = pad_event_to
+        self.event_key = event_key
+        self.max_frames = max_frames
+
+        self._level_prefixes = {level: self._level_prefix(level) for level in LEVEL_COLORS}
+        if colors:
+            self._timestamp = DIM + '{}' + RESET + ' '
+            self._event = BRIGHT + '{}' + RESET
+            self._logger = ' [' + BLUE + BRIGHT + '{}' + RESET + ']'
+            self._key_value = CYAN + '{}' + RESET + '=' + MAGENTA + '{}' + RESET
+        else:
+            self._timestamp = '{} '
+            self._event = '{}'
+            self._logger = ' [{}]'
+            self._key_value = '{}={}'
+
+    def _level_prefix(self, level: str) -> str:
+        prefix = f'[{level:<9}] '
+        return LEVEL_COLORS.get(level, '') + prefix + RESET if self.colors else prefix
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> str:  # noqa: D102, ARG002
+        timestamp = event_dict.pop('timestamp', None)
+        level = event_dict.pop('level', None)
+        event = event_dict.pop(self.event_key, None)
+        logger_name = event_dict.pop('logger', None)
+        stack = event_dict.pop('stack', None)
+        exception = event_dict.pop('exception', None) if isinstance(event_dict.get('exception'), str) else None
+        exc_info = _exc_info(event_dict.pop('exc_info', None))
+
+        parts = []
+        if timestamp is not None:
+            parts.append(self._timestamp.format(timestamp))
+        if level is not None:
+            prefix = self._level_prefixes.get(level)
+            if prefix is None:
+                prefix = self._level_prefixes[level] = self._level_prefix(str(level))
+            parts.append(prefix)
+        event = '' if event is None else str(event)
+        parts.append(self._event.format(event.ljust(self.pad_event_to) if event_dict else event))
+        if logger_name is not None:
+            parts.append(self._logger.format(logger_name))
+
+        items = sorted(event_dict.items()) if self.sort_keys else event_dict.items()
+        key_value = self._key_value.format
+        fields = ' '.join([key_value(key, value if type(value) is str else repr(value)) for key, value in items])
+        if fields:
+            parts.append(' ' + fields)
+
+        if stack is not None:
+            parts.append('\n' + stack)
+        if exception is not None:
+            parts.append('\n' + exception)
+        if exc_info is not None:
+            parts.append('\n' + ''.join(traceback.format_exception(*exc_info, limit=-self.max_frames)).rstrip('\n'))
+        return ''.join(parts)
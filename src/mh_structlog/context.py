@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import contextvars
+import operator
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from .processors import StaticFields, attach_static_fields
+
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from structlog.typing import EventDict
+
+
+# structlog keeps one ContextVar per bound key in this registry, which only ever grows.
+_CONTEXT_VARS: dict[str, contextvars.ContextVar] = structlog.contextvars._CONTEXT_VARS  # noqa: SLF001
+_KEY_PREFIX_LEN = structlog.contextvars.STRUCTLOG_KEY_PREFIX_LEN
+
+# Per context (thread / asyncio task) snapshot of the bound contextvars:
+# (registry size, registry vars, key names, values of the vars, merged dict).
+_snapshot: contextvars.ContextVar[tuple | None] = contextvars.ContextVar(
+    'mh_structlog_contextvars_snapshot', default=None
+)
+_get_var = contextvars.ContextVar.get
+
+# Per context: (snapshot dict, StaticFields with its serialized form).
+_serialized: contextvars.ContextVar[tuple | None] = contextvars.ContextVar(
+    'mh_structlog_contextvars_serialized', default=None
+)
+
+
+def get_contextvars_snapshot() -> dict[str, Any]:
+    """Return the bound contextvars of the current context as a dict, which is only rebuilt when the context changed.
+
+    The returned dict is shared between calls, so it must not be modified.
+    """
+    snapshot = _snapshot.get()
+
+    if snapshot is None or snapshot[0] != len(_CONTEXT_VARS):
+        # New keys were bound somewhere since the snapshot was taken.
+        context_vars = tuple(_CONTEXT_VARS.values())
+        names = tuple(var.name[_KEY_PREFIX_LEN:] for var in context_vars)
+    else:
+        context_vars, names = snapshot[1], snapshot[2]
+
+    # Reading the vars is cheap; comparing by identity detects every bind/unbind/clear, also when they were done
+    # directly through structlog.contextvars.
+    values = tuple(map(_get_var, context_vars))
+    if snapshot is not None and snapshot[1] is context_vars and all(map(operator.is_, values, snapshot[3])):
+        return snapshot[4]
+
+    merged = {name: value for name, value in zip(names, values, strict=False) if value is not Ellipsis}
+    _snapshot.set((len(context_vars), context_vars, names, values, merged))
+    return merged
+
+
+def merge_contextvars(logger: Any, method_name: str, event_dict: EventDict) -> EventDict:  # noqa: ARG001
+    """Drop-in replacement for structlog.contextvars.merge_contextvars, merging from a cached snapshot.
+
+    Like the structlog processor, keys passed in the log call itself take precedence over the bound ones.
+    """
+    merged = get_contextvars_snapshot()
+    if event_dict.keys() & merged.keys():
+        for key, value in merged.items():
+            event_dict.setdefault(key, value)
+    else:
+        event_dict.update(merged)
+    return event_dict
+
+
+def merge_contextvars_pre_serialized(logger: Any, method_name: str, event_dict: EventDict) -> EventDict:  # noqa: ARG001
+    """Like merge_contextvars, but attach the bound contextvars as StaticFields, serialized once per snapshot.
+
+    render_orjson splices the serialized fields into each line, instead of encoding them again for every event.
+    Processors running before the renderer do not see the bound contextvars as regular fields.
+    """
+    merged = get_contextvars_snapshot()
+    if not merged:
+        return event_dict
+
+    serialized = _serialized.get()
+    if serialized is None or serialized[0] is not merged:
+        serialized = (merged, StaticFields(merged, override=False))
+        _serialized.set(serialized)
+
+    attach_static_fields(event_dict, serialized[1])
+    return event_dict
+
+
+def bind_contextvars(**kw: Any) -> Mapping[str, contextvars.Token]:
+    """Bind keys to the context-local context (see structlog.contextvars.bind_contextvars) and refresh the snapshot."""
+    tokens = structlog.contextvars.bind_contextvars(**kw)
+    get_contextvars_snapshot()
+    return tokens
+
+
+def unbind_contextvars(*keys: str) -> None:
+    """Remove keys from the context-local context (see structlog.contextvars.unbind_contextvars) and refresh the snapshot."""
+    structlog.contextvars.unbind_contextvars(*keys)
+    get_contextvars_snapshot()
+
+
+def clear_contextvars() -> None:
+    """Clear the context-local context (see structlog.contextvars.clear_contextvars) and refresh the snapshot."""
+    structlog.contextvars.clear_contextvars()
+    get_contextvars_snapshot()
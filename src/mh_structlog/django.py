@@ -1,32 +1,69 @@
 import time
+from collections.abc import Collection
+from typing import Any
 
 import structlog
 from asgiref.sync import iscoroutinefunction
+from django.conf import settings
 from django.http import HttpRequest, HttpResponse
 from django.http.response import HttpResponseRedirectBase
 from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import LazyObject, empty
 
 from mh_structlog import config  # noqa: PLC0415
+from mh_structlog.processors import RequestLogSummary, end_request_log_summary, start_request_log_summary
 
 
 logger = structlog.getLogger("mh_structlog.django.access")
 
 
-def get_fields_to_log(request: HttpRequest, response: HttpResponse, latency_ms: int) -> dict:
-    """Extracts fields to log from the request object."""
-
-    fields_to_log = {
-        'latency_ms': latency_ms,
-        'method': request.method,
-        'status': response.status_code,
-        'referrer': request.headers.get('Referer', ''),
-        'request_user_id': getattr(request.user, 'id', None) if hasattr(request, 'user') else None,
-    }
-
-    if isinstance(response, HttpResponseRedirectBase):
+# The fields of the access log; configure a subset with the MH_STRUCTLOG_ACCESS_LOG_FIELDS setting.
+ACCESS_LOG_FIELDS = ('latency_ms', 'method', 'status', 'referrer', 'request_user_id', 'redirect_url', 'httpRequest')
+
+
+def get_request_user_id(request: HttpRequest, resolve_user: bool = False) -> Any:  # noqa: FBT001, FBT002
+    """Return the id of the user of the request, without loading the user unless resolve_user is set.
+
+    The AuthenticationMiddleware of Django sets request.user to a lazy object, which loads the session and the user
+    (with database queries) when it is first used. Unless resolve_user is set, the id is only returned when something
+    else already did that during the request.
+    """
+    user = getattr(request, 'user', None)
+    if user is None:
+        return None
+    # Check the type itself; isinstance() would fall back to user.__class__, which resolves the lazy object.
+    if not resolve_user and issubclass(type(user), LazyObject):
+        if user._wrapped is empty:  # noqa: SLF001
+            return None
+        user = user._wrapped  # noqa: SLF001
+    return getattr(user, 'id', None)
+
+
+def get_fields_to_log(  # noqa: C901
+    request: HttpRequest,
+    response: HttpResponse,
+    latency_ms: int,
+    fields: Collection[str] = ACCESS_LOG_FIELDS,
+    resolve_user: bool = False,  # noqa: FBT001, FBT002
+) -> dict:
+    """Extracts fields to log from the request object; only the ones in fields are computed."""
+
+    fields_to_log = {}
+    if 'latency_ms' in fields:
+        fields_to_log['latency_ms'] = latency_ms
+    if 'method' in fields:
+        fields_to_log['method'] = request.method
+    if 'status' in fields:
+        fields_to_log['status'] = response.status_code
+    if 'referrer' in fields:
+        fields_to_log['referrer'] = request.headers.get('Referer', '')
+    if 'request_user_id' in fields:
+        fields_to_log['request_user_id'] = get_request_user_id(request, resolve_user)
+
+    if 'redirect_url' in fields and isinstance(response, HttpResponseRedirectBase):
         fields_to_log['redirect_url'] = response['Location']
 
-    if config.SELECTED_LOG_FORMAT == 'gcp_json':
+    if 'httpRequest' in fields and config.SELECTED_LOG_FORMAT == 'gcp_json':
         fields_to_log['httpRequest'] = {
             'requestMethod': request.method,
             'requestUrl': request.build_absolute_uri(),
@@ -39,52 +76,83 @@ def get_fields_to_log(request: HttpRequest, response: HttpResponse, latency_ms:
     return fields_to_log
 
 
-@sync_and_async_middleware
-def StructLogAccessLoggingMiddleware(get_response):  # noqa: N802
-    """Middleware that logs access requests with some extra fields as structured logs."""
+def _log_access(
+    request: HttpRequest,
+    response: HttpResponse,
+    start: float,
+    summary: RequestLogSummary | None,
+    fields: Collection[str],
+    resolve_user: bool,  # noqa: FBT001
+) -> tuple:
+    """Return the log method name, message and fields of the access log of a request."""
+    latency_ms = int(1000 * (time.time() - start))
+    fields_to_log = get_fields_to_log(request, response, latency_ms, fields, resolve_user)
+    if summary is not None:
+        # The fields of the access log itself win over the ones logged during the request.
+        fields_to_log = {**summary.summary_fields(), **fields_to_log}
+
+    # in case Sentry is enabled, prevent logging to it.
+    # The actual exception will be logged if necessary somewhere else, but the response access log to the client should not be on there.
+    if response.status_code >= 500:  # noqa: PLR2004
+        return 'error', request.get_full_path(), {'sentry_skip': True, **fields_to_log}
+    if response.status_code >= 400:  # noqa: PLR2004
+        return 'warning', request.get_full_path(), {'sentry_skip': True, **fields_to_log}
+    return 'info', request.get_full_path(), fields_to_log
+
+
+def _access_logging_middleware(get_response, summarize: bool):  # noqa: ANN001, ANN202, FBT001
+    fields = frozenset(getattr(settings, 'MH_STRUCTLOG_ACCESS_LOG_FIELDS', ACCESS_LOG_FIELDS))
+    resolve_user = getattr(settings, 'MH_STRUCTLOG_ACCESS_LOG_RESOLVE_USER', False)
 
     if iscoroutinefunction(get_response):
 
         async def middleware(request):
             start = time.time()
-            response = await get_response(request)
-            end = time.time()
-
-            latency_ms = int(1000 * (end - start))
-            fields_to_log = get_fields_to_log(request, response, latency_ms)
-
-            # in case Sentry is enabled, prevent logging to it.
-            # The actual exception will be logged if necessary somewhere else, but the response access log to the client should not be on there.
-
-            if response.status_code >= 500:  # noqa: PLR2004
-                await logger.aerror(request.get_full_path(), sentry_skip=True, **fields_to_log)
-            elif response.status_code >= 400:  # noqa: PLR2004
-                await logger.awarning(request.get_full_path(), sentry_skip=True, **fields_to_log)
-            else:
-                await logger.ainfo(request.get_full_path(), **fields_to_log)
-
+            summary = RequestLogSummary() if summarize else None
+            token = start_request_log_summary(summary) if summary is not None else None
+            try:
+                response = await get_response(request)
+            finally:
+                if token is not None:
+                    end_request_log_summary(token)
+
+            method_name, message, fields_to_log = _log_access(request, response, start, summary, fields, resolve_user)
+            await getattr(logger, 'a' + method_name)(message, **fields_to_log)
             return response
 
     else:
 
         def middleware(request):
             start = time.time()
-            response = get_response(request)
-            end = time.time()
+            summary = RequestLogSummary() if summarize else None
+            token = start_request_log_summary(summary) if summary is not None else None
+            try:
+                response = get_response(request)
+            finally:
+                if token is not None:
+                    end_request_log_summary(token)
+
+            method_name, message, fields_to_log = _log_access(request, response, start, summary, fields, resolve_user)
+            getattr(logger, method_name)(message, **fields_to_log)
+            return response
 
-            latency_ms = int(1000 * (end - start))
-            fields_to_log = get_fields_to_log(request, response, latency_ms)
+    return middleware
 
-            # in case Sentry is enabled, prevent logging to it.
-            # The actual exception will be logged if necessary somewhere else, but the response access log to the client should not be on there.
 
-            if response.status_code >= 500:  # noqa: PLR2004
-                logger.error(request.get_full_path(), sentry_skip=True, **fields_to_log)
-            elif response.status_code >= 400:  # noqa: PLR2004
-                logger.warning(request.get_full_path(), sentry_skip=True, **fields_to_log)
-            else:
-                logger.info(request.get_full_path(), **fields_to_log)
+@sync_and_async_middleware
+def StructLogAccessLoggingMiddleware(get_response):  # noqa: N802
+    """Middleware that logs access requests with some extra fields as structured logs."""
+    return _access_logging_middleware(get_response, summarize=False)
 
-            return response
 
-    return middleware
+@sync_and_async_middleware
+def StructLogRequestSummaryMiddleware(get_response):  # noqa: N802
+    """Access logging middleware which also folds the logs of the request into its access log.
+
+    Events below WARNING which are logged during the request are not emitted on their own; their fields are merged into
+    the access log, together with their messages (log_messages), the counts per level (log_counts) and the first error
+    (first_error). Events at WARNING and above are still emitted immediately.
+    """
+    # The structlog chain only hands events to a summary when asked to.
+    config.enable_request_log_summaries()
+    return _access_logging_middleware(get_response, summarize=True)
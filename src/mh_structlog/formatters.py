@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import structlog
+
+
+if TYPE_CHECKING:
+    import logging
+
+
+class RenderOnceProcessorFormatter(structlog.stdlib.ProcessorFormatter):
+    """A ProcessorFormatter which renders a log record only once, even when it is written by multiple handlers.
+
+    The logging module passes the same record to each handler in turn, on the same thread. Since dictConfig creates a
+    single formatter instance per configured formatter name, all handlers using that formatter (e.g. both stdout and
+    the log file with json output) then reuse the output rendered for the first handler.
+    """
+
+    def __init__(self, *args, **kwargs):  # noqa: D107
+        super().__init__(*args, **kwargs)
+        self._last = threading.local()
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa: D102
+        # Only a weak reference to the record is kept, so e.g. exception tracebacks are not kept alive by the cache.
+        # The attribute count guards against handler filters adding attributes to the record in between.
+        last = getattr(self._last, 'entry', None)
+        if last is not None and last[0]() is record and last[1] == len(record.__dict__):
+            return last[2]
+
+        formatted = super().format(record)
+        self._last.entry = (weakref.ref(record), len(record.__dict__), formatted)
+        return formatted
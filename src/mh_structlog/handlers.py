@@ -0,0 +1,646 @@
+from __future__ import annotations
+
+import codecs
+import collections
+import contextlib
+import contextvars
+import gzip
+import heapq
+import itertools
+import logging
+import logging.config
+import os
+import queue
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import TextIO
+
+from . import otlp, query
+
+
+class SpillingStreamHandler(logging.StreamHandler):
+    """A StreamHandler which never blocks the logging threads on writing to the stream.
+
+    Formatted lines are handed to a background writer thread through a bounded in-memory queue. When the queue is full,
+    because the consumer of the stream (e.g. the log agent reading the stdout pipe of a container) stalls, lines are
+    appended to a local spill file instead. Once the writer has caught up, the spill file is replayed to the stream,
+    so the order of the lines is preserved. When the spill file is full as well, lines are dropped and a single line
+    with the number of dropped events is written after the replay.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        spill_file: str | Path | None = None,
+        max_spill_bytes: int = 100 * 1024 * 1024,
+        queue_size: int = 10_000,
+        flush_timeout: float = 5.0,
+    ):
+        """Create the handler and start its writer thread.
+
+        Args:
+            stream: The stream to write to, stderr when not given (like the StreamHandler).
+            spill_file: Path of the spill file. A temporary file is created (and removed on close) when not given.
+            max_spill_bytes: Maximum size of the spill file; events which do not fit anymore are dropped.
+            queue_size: Number of lines to keep in memory before the writer is considered to be stalled.
+            flush_timeout: Maximum number of seconds flush() and close() wait for the writer to catch up.
+        """
+        super().__init__(stream)
+        self.max_spill_bytes = max_spill_bytes
+        self.flush_timeout = flush_timeout
+        self.dropped_events = 0  # Total over the lifetime of the handler
+        self.write_errors = 0
+        self._dropped_unreported = 0
+
+        self._owns_spill_file = spill_file is None
+        if spill_file is None:
+            fd, spill_file = tempfile.mkstemp(prefix='mh_structlog_spill_', suffix='.log')
+            os.close(fd)
+        self.spill_file = Path(spill_file)
+        self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+        self._spill_writer = self.spill_file.open('ab')
+        self._spill_reader = self.spill_file.open('rb')
+        self._spill_size = self._spill_writer.tell()
+        self._spill_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        # Guards the switch between queueing and spilling, and the spill file itself.
+        self._spill_lock = threading.Lock()
+        # Lines left behind in the spill file by a previous process are replayed first.
+        self._spilling = self._spill_size > 0
+
+        self._queue: queue.Queue[str] = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._writer = threading.Thread(target=self._run, name='mh_structlog_spill_writer', daemon=True)
+        self._writer.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue the formatted record for the writer thread, or spill it to disk when the writer is behind."""
+        try:
+            msg = self.format(record) + self.terminator
+            with self._spill_lock:
+                if not self._spilling:
+                    try:
+                        self._queue.put_nowait(msg)
+                    except queue.Full:
+                        # Backpressure: from now on, everything goes to the spill file until it has been replayed.
+                        self._spilling = True
+                    else:
+                        return
+                self._spill(msg)
+        except RecursionError:
+            raise
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+    def _spill(self, msg: str) -> None:
+        """Append a line to the spill file. Must be called with the spill lock held."""
+        data = msg.encode('utf-8')
+        if self._spill_size + len(data) > self.max_spill_bytes:
+            self.dropped_events += 1
+            self._dropped_unreported += 1
+            return
+        self._spill_writer.write(data)
+        self._spill_writer.flush()
+        self._spill_size += len(data)
+
+    def _run(self) -> None:
+        """Write queued lines to the stream, and replay the spill file whenever the queue runs empty."""
+        while True:
+            try:
+                msg = self._queue.get(timeout=0.05)
+            except queue.Empty:
+                if self._spilling:
+                    self._replay()
+                elif self._stopping.is_set():
+                    return
+                continue
+
+            try:
+                self._write(msg)
+            finally:
+                self._queue.task_done()
+
+            if self._spilling and self._queue.empty():
+                self._replay()
+
+    def _replay(self) -> None:
+        """Write the content of the spill file to the stream, then switch back to queueing."""
+        while True:
+            chunk = self._spill_reader.read(64 * 1024)
+            if chunk:
+                self._write(self._spill_decoder.decode(chunk))
+                continue
+
+            with self._spill_lock:
+                # Appends happen under the lock, so if there is still nothing to read we are fully caught up.
+                chunk = self._spill_reader.read(64 * 1024)
+                if not chunk:
+                    self._spill_writer.seek(0)
+                    self._spill_writer.truncate()
+                    self._spill_reader.seek(0)
+                    self._spill_size = 0
+                    self._spilling = False
+                    dropped, self._dropped_unreported = self._dropped_unreported, 0
+                    break
+            self._write(self._spill_decoder.decode(chunk))
+
+        if dropped:
+            self._write(self._format_dropped(dropped))
+
+    def _format_dropped(self, dropped: int) -> str:
+        """Format the line reporting how many events were dropped because the spill file was full."""
+        record = logging.LogRecord(
+            'mh_structlog', logging.WARNING, __file__, 0, 'log spill file overflowed, events were dropped', (), None
+        )
+        record.dropped_events = dropped
+        return self.format(record) + self.terminator
+
+    def _write(self, data: str) -> None:
+        """Write to the stream; only called from the writer thread, so only that thread can block on it."""
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:  # noqa: BLE001
+            # There is no record to pass to handleError here, and raising would kill the writer thread.
+            self.write_errors += 1
+
+    def _caught_up(self) -> bool:
+        return self._queue.unfinished_tasks == 0 and not self._spilling
+
+    def flush(self) -> None:
+        """Wait (bounded by flush_timeout) until the writer thread has written everything to the stream."""
+        deadline = time.monotonic() + self.flush_timeout
+        while not self._caught_up() and self._writer.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self) -> None:
+        """Flush what can be flushed within the timeout, stop the writer thread and clean up the spill file."""
+        self.flush()
+        self._stopping.set()
+        self._writer.join(timeout=self.flush_timeout)
+
+        # When the stream is still stalled, the writer thread keeps the spill file for as long as the process lives.
+        if not self._writer.is_alive():
+            with self._spill_lock:
+                self._spill_writer.close()
+                self._spill_reader.close()
+                if self._owns_spill_file:
+                    with contextlib.suppress(OSError):
+                        self.spill_file.unlink()
+
+        super().close()
+
+
+class BinaryFileHandler(logging.FileHandler):
+    """A FileHandler for the binary log file format.
+
+    The BinaryRenderer returns its bytes decoded as latin-1, so encoding them as latin-1 again (without newline
+    translation, and without a terminator) writes the exact bytes to the file.
+    """
+
+    terminator = ''
+
+    def __init__(self, filename: str | Path, mode: str = 'a', delay: bool = False):  # noqa: D107
+        super().__init__(filename, mode=mode, encoding='latin-1', delay=delay)
+
+    def _open(self) -> TextIO:
+        return Path(self.baseFilename).open(self.mode, encoding='latin-1', newline='')  # noqa: SIM115
+
+
+class IndexedFileHandler(logging.FileHandler):
+    """A FileHandler for the json log file format, which maintains the sparse index used by `mh_structlog query`.
+
+    The index is updated while writing, from the creation time and level of the log records, so it does not have to be
+    built when querying. A block is added to the index each time block_size bytes were written, and on close.
+    """
+
+    # The timestamp of an event is taken a bit before or after the creation of its record; widen the block bounds by
+    # this many seconds, so a block is never skipped for a timestamp at its edges.
+    timestamp_slack = 1.0
+
+    def __init__(  # noqa: D107
+        self,
+        filename: str | Path,
+        mode: str = 'a',
+        encoding: str = 'utf-8',
+        delay: bool = False,
+        block_size: int = query.DEFAULT_BLOCK_SIZE,
+    ):
+        self.block_size = block_size
+        self._builder: query.BlockBuilder | None = None
+        super().__init__(filename, mode=mode, encoding=encoding, delay=delay)
+
+    def _open(self) -> TextIO:
+        stream = super()._open()
+        if 'w' in self.mode:
+            query.index_path(self.baseFilename).unlink(missing_ok=True)
+        else:
+            # Index what was written before (e.g. by a previous process) first.
+            query.update_index(self.baseFilename, self.block_size)
+        self._builder = query.BlockBuilder(os.fstat(stream.fileno()).st_size, self.block_size)
+        return stream
+
+    def emit(self, record: logging.LogRecord) -> None:  # noqa: D102
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self.flush()
+
+            length = len(msg) if msg.isascii() else len(msg.encode(self.encoding or 'utf-8'))
+            entry = self._builder.add(length, record.created, query.level_bit(record.levelno))
+            if entry is not None:
+                self._store(entry)
+        except RecursionError:
+            raise
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+    def _store(self, entry: query.IndexEntry) -> None:
+        entry = entry._replace(min_ts=entry.min_ts - self.timestamp_slack, max_ts=entry.max_ts + self.timestamp_slack)
+        query.append_index_entries(self.baseFilename, [entry])
+
+    def close(self) -> None:  # noqa: D102
+        with self.lock:
+            if self.stream is not None and self._builder is not None and (entry := self._builder.flush()) is not None:
+                self.flush()
+                self._store(entry)
+            super().close()
+
+
+class OTLPHandler(logging.Handler):
+    """A handler which exports records to an OpenTelemetry collector over OTLP/HTTP, in batches.
+
+    Use it with a formatter ending in otlp.OTLPRenderer. Formatted records are queued for a background thread, which
+    sends them when a batch is full (by count or size) or flush_interval has passed since its first record. The queue
+    is bounded, so a collector which is down or slow never makes the memory grow: when the queue is full, records are
+    dropped, and a record with the number of dropped events is exported afterwards. Failed requests are retried with
+    exponential backoff for connection errors and the statuses which the OTLP specification marks as retryable.
+    """
+
+    RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        endpoint: str | None = None,
+        headers: dict[str, str] | None = None,
+        resource_attributes: dict | None = None,
+        max_batch_size: int = 512,
+        max_batch_bytes: int = 1024 * 1024,
+        flush_interval: float = 1.0,
+        queue_size: int = 10_000,
+        compression: str | None = 'gzip',
+        timeout: float = 10.0,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        flush_timeout: float = 5.0,
+    ):
+        """Create the handler and start its exporter thread.
+
+        Args:
+            endpoint: The OTLP/HTTP logs endpoint. Defaults to the OTEL_EXPORTER_OTLP_(LOGS_)ENDPOINT environment
+                variables, or a collector on localhost.
+            headers: Additional HTTP headers, e.g. for authentication.
+            resource_attributes: Attributes of the resource (service.name defaults to OTEL_SERVICE_NAME).
+            max_batch_size: Maximum number of records per export request.
+            max_batch_bytes: Maximum (uncompressed) size of the records in an export request.
+            flush_interval: Maximum number of seconds a record waits for its batch to fill up.
+            queue_size: Number of records to keep in memory; records which do not fit are dropped.
+            compression: 'gzip' or None.
+            timeout: Timeout in seconds of a single request.
+            max_retries: Number of retries of a failed request, before its batch is dropped.
+            retry_backoff: Seconds to wait before the first retry; doubles with every retry.
+            flush_timeout: Maximum number of seconds flush() and close() wait for the exporter to catch up.
+        """
+        super().__init__()
+        if compression not in {'gzip', None}:
+            raise ValueError(f'Unsupported compression {compression}.')
+        self.endpoint = endpoint or otlp.default_endpoint()
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        if compression == 'gzip':
+            self.headers['Content-Encoding'] = 'gzip'
+        self.compression = compression
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.flush_timeout = flush_timeout
+        self._envelope = otlp.request_envelope(resource_attributes)
+
+        self.exported_events = 0  # Totals over the lifetime of the handler
+        self.dropped_events = 0
+        self.failed_requests = 0
+        self._dropped_unreported = 0
+
+        self._queue: queue.Queue[bytes] = queue.Queue(maxsize=queue_size)
+        self._flush_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._exporter = threading.Thread(target=self._run, name='mh_structlog_otlp_exporter', daemon=True)
+        self._exporter.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue the formatted record for the exporter thread, or drop it when the queue is full."""
+        try:
+            self._queue.put_nowait(self.format(record).encode())
+        except queue.Full:
+            self.dropped_events += 1
+            self._dropped_unreported += 1
+        except RecursionError:
+            raise
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+    def _run(self) -> None:
+        """Collect batches from the queue and export them."""
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect_batch()
+            reports = []
+            if self._dropped_unreported:
+                dropped, self._dropped_unreported = self._dropped_unreported, 0
+                reports.append(self._format_dropped(dropped))
+
+            if batch or reports:
+                try:
+                    self._export(batch + reports)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            if self._queue.unfinished_tasks == 0:
+                self._flush_requested.clear()
+
+    def _collect_batch(self) -> list[bytes]:
+        """Take records from the queue until the batch is full, its interval has passed, or a flush is requested."""
+        batch: list[bytes] = []
+        size = 0
+        deadline = 0.0
+        while len(batch) < self.max_batch_size and size < self.max_batch_bytes:
+            urgent = self._flush_requested.is_set() or self._stopping.is_set()
+            # Whatever is queued already is added to the batch, up to its maximum size.
+            if batch and (urgent or time.monotonic() >= deadline) and self._queue.empty():
+                break
+            try:
+                msg = self._queue.get(timeout=0.05)
+            except queue.Empty:
+                if not batch and urgent:
+                    break
+                continue
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(msg)
+            size += len(msg)
+        return batch
+
+    def _format_dropped(self, dropped: int) -> bytes:
+        """Format the record reporting how many events were dropped because the queue was full."""
+        record = logging.LogRecord(
+            'mh_structlog', logging.WARNING, __file__, 0, 'otlp export queue overflowed, events were dropped', (), None
+        )
+        record.dropped_events = dropped
+        return self.format(record).encode()
+
+    def _export(self, batch: list[bytes]) -> None:
+        """Send a batch, retrying on failures which may be temporary."""
+        body = self._envelope[0] + b','.join(batch) + self._envelope[1]
+        if self.compression == 'gzip':
+            body = gzip.compress(body, compresslevel=6)
+
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * 2**attempt
+            try:
+                request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method='POST')  # noqa: S310
+                with urllib.request.urlopen(request, timeout=self.timeout):  # noqa: S310
+                    self.exported_events += len(batch)
+                    return
+            except urllib.error.HTTPError as e:
+                if e.code not in self.RETRYABLE_STATUSES:
+                    break
+                with contextlib.suppress(TypeError, ValueError):
+                    delay = max(delay, float(e.headers.get('Retry-After')))
+            except OSError:
+                # Connection errors and timeouts
+                pass
+            if attempt == self.max_retries or self._stopping.wait(min(delay, 30.0)):
+                break
+
+        self.failed_requests += 1
+        self.dropped_events += len(batch)
+
+    def flush(self) -> None:
+        """Export the queued records now, and wait (bounded by flush_timeout) until that is done."""
+        self._flush_requested.set()
+        deadline = time.monotonic() + self.flush_timeout
+        while self._queue.unfinished_tasks and self._exporter.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self) -> None:
+        """Export what can be exported within the flush timeout, and stop the exporter thread."""
+        self.flush()
+        self._stopping.set()
+        self._exporter.join(timeout=self.flush_timeout)
+        super().close()
+
+
+class ThreadBufferedStreamHandler(logging.StreamHandler):
+    """A StreamHandler without a shared lock on the logging call path, for workloads with many threads.
+
+    Each thread formats its records into its own buffer. A single flusher thread regularly collects the buffers, merges
+    the lines by the creation time of their records and writes them to the stream; it is the only thread writing to the
+    stream. A line is written once it is older than max_delay, so lines of records formatted at about the same time in
+    different threads still end up in order, and every line is written within max_delay + flush_interval seconds.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        flush_interval: float = 0.05,
+        max_delay: float = 0.05,
+        buffer_size: int = 10_000,
+        flush_timeout: float = 5.0,
+    ):
+        """Create the handler and start its flusher thread.
+
+        Args:
+            stream: The stream to write to, stderr when not given (like the StreamHandler).
+            flush_interval: Number of seconds between the rounds of the flusher.
+            max_delay: Number of seconds a line is held back, to be merged in order with the lines of other threads.
+            buffer_size: Maximum number of lines in the buffer of a thread; when it is full, the thread waits for the
+                flusher (backpressure) instead of growing the memory.
+            flush_timeout: Maximum number of seconds flush() and close() wait for the flusher to catch up.
+        """
+        super().__init__(stream)
+        self.flush_interval = flush_interval
+        self.max_delay = max_delay
+        self.buffer_size = buffer_size
+        self.flush_timeout = flush_timeout
+        self.write_errors = 0
+
+        self._local = threading.local()
+        # (thread, buffer) per thread that logged; only locked when a thread logs for the first time.
+        self._buffers: list[tuple[threading.Thread, collections.deque]] = []
+        self._registry_lock = threading.Lock()
+        # Lines taken from the buffers which are not written yet, as a heap of (created, thread index, sequence, line).
+        self._pending: list[tuple[float, int, int, str]] = []
+        # flush() requests a round which writes everything, and waits until the flusher finished that round.
+        self._flush_requested = threading.Event()
+        self._flush_condition = threading.Condition()
+        self._requested_round = 0
+        self._flushed_round = 0
+        self._stopping = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name='mh_structlog_thread_buffer_flusher', daemon=True)
+        self._flusher.start()
+
+    def handle(self, record: logging.LogRecord) -> logging.LogRecord | bool:
+        """Filter and emit the record, without taking the handler lock."""
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def _buffer(self) -> tuple[collections.deque, int, itertools.count]:
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer: collections.deque = collections.deque()
+            with self._registry_lock:
+                index = len(self._buffers)
+                self._buffers.append((threading.current_thread(), buffer))
+            self._local.buffer = (buffer, index, itertools.count())
+            return self._local.buffer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Format the record and append it to the buffer of the current thread."""
+        try:
+            msg = self.format(record) + self.terminator
+            buffer, index, sequence = self._buffer()
+            while len(buffer) >= self.buffer_size and self._flusher.is_alive():
+                time.sleep(0.001)
+            buffer.append((record.created, index, next(sequence), msg))
+        except RecursionError:
+            raise
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+    def _run(self) -> None:
+        while True:
+            self._flush_requested.wait(self.flush_interval)
+            with self._flush_condition:
+                self._flush_requested.clear()
+                requested_round = self._requested_round
+            stopping = self._stopping.is_set()
+            flush_all = stopping or requested_round > self._flushed_round
+
+            self._collect()
+            self._write_pending(float('inf') if flush_all else time.time() - self.max_delay)
+
+            with self._flush_condition:
+                self._flushed_round = requested_round
+                self._flush_condition.notify_all()
+            if stopping:
+                return
+
+    def _collect(self) -> None:
+        """Move the lines from the buffers of the threads to the pending heap."""
+        for thread, buffer in list(self._buffers):
+            # Only this thread pops; appends by the logging threads are atomic and need no lock.
+            for _ in range(len(buffer)):
+                heapq.heappush(self._pending, buffer.popleft())
+            if not thread.is_alive() and not buffer:
+                with self._registry_lock:
+                    self._buffers.remove((thread, buffer))
+
+    def _write_pending(self, watermark: float) -> None:
+        """Write the pending lines of records created before the watermark, in order."""
+        lines = []
+        while self._pending and self._pending[0][0] <= watermark:
+            lines.append(heapq.heappop(self._pending)[3])
+        if not lines:
+            return
+        try:
+            self.stream.write(''.join(lines))
+            self.stream.flush()
+        except Exception:  # noqa: BLE001
+            # There is no record to pass to handleError here, and raising would kill the flusher thread.
+            self.write_errors += 1
+
+    def flush(self) -> None:
+        """Write everything buffered so far, waiting (bounded by flush_timeout) for the flusher to do so."""
+        with self._flush_condition:
+            self._requested_round += 1
+            requested_round = self._requested_round
+            self._flush_requested.set()
+            self._flush_condition.wait_for(
+                lambda: self._flushed_round >= requested_round or not self._flusher.is_alive(), self.flush_timeout
+            )
+
+    def close(self) -> None:
+        """Write everything buffered so far, and stop the flusher thread."""
+        self._stopping.set()
+        self._flush_requested.set()
+        self._flusher.join(timeout=self.flush_timeout)
+        super().close()
+
+
+class AsyncHandler(logging.Handler):
+    """A handler which hands records to another handler in a background thread, so also the formatting happens there.
+
+    The target is a handler, or the dictConfig definition of one (without a formatter; the formatter set on this handler
+    is passed on to it). The queue is bounded: when it is full, records are dropped and counted in dropped_events.
+    Records are handled in (a copy of) the context they were logged in, so the formatter sees the bound contextvars.
+    """
+
+    def __init__(self, handler: logging.Handler | dict, queue_size: int = 10_000, flush_timeout: float = 5.0):  # noqa: D107
+        super().__init__()
+        if isinstance(handler, dict):
+            configurator = logging.config.DictConfigurator({'version': 1, 'handlers': {'target': dict(handler)}})
+            handler = configurator.configure_handler(configurator.config['handlers']['target'])
+        self.target = handler
+        self.flush_timeout = flush_timeout
+        self.dropped_events = 0
+        self._queue: queue.Queue[tuple[logging.LogRecord, contextvars.Context] | None] = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name='mh_structlog_async_handler', daemon=True)
+        self._worker.start()
+
+    def setFormatter(self, fmt: logging.Formatter | None) -> None:  # noqa: D102, N802
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue the record for the background thread, or drop it when the queue is full."""
+        try:
+            self._queue.put_nowait((record, contextvars.copy_context()))
+        except queue.Full:
+            self.dropped_events += 1
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            record, context = item
+            try:
+                context.run(self.target.handle, record)
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait (bounded by flush_timeout) until the queued records are handled, and flush the target."""
+        deadline = time.monotonic() + self.flush_timeout
+        while self._queue.unfinished_tasks and self._worker.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.target.flush()
+
+    def close(self) -> None:
+        """Handle what can be handled within the flush timeout, stop the background thread and close the target."""
+        self.flush()
+        with contextlib.suppress(queue.Full):
+            self._queue.put(None, timeout=self.flush_timeout)
+        self._worker.join(timeout=self.flush_timeout)
+        self.target.close()
+        super().close()
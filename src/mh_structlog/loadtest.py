@@ -0,0 +1,367 @@
+"""Load generator to measure the capacity of the logging pipeline, as configured with setup().
+
+Workers (threads, asyncio tasks or processes) log a realistic mix of events: structlog events with a few or many
+(nested) fields, filtered out debug events, exceptions with tracebacks and stdlib log records with extra, within
+simulated requests which each bind their own contextvars. The stdout of the pipeline goes to a sink which discards
+the output (null), or to a pipe which is drained by a separate thread (pipe), like a log agent reading a container.
+
+Everything runs locally; nothing is sent over the network.
+"""
+
+from __future__ import annotations
+
+import array
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple, TextIO
+
+import structlog
+
+from . import context
+from .config import setup
+from .utils import get_logger
+
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # ty:ignore[invalid-assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+MODES = ('threads', 'asyncio', 'processes')
+SINKS = ('null', 'pipe')
+
+# Number of events logged per simulated request, which binds its own contextvars.
+EVENTS_PER_REQUEST = 20
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LoadTestResult(NamedTuple):
+    """The outcome of a load test."""
+
+    mode: str
+    concurrency: int
+    events: int
+    elapsed: float
+    bytes_written: int
+    latencies_ns: dict[str, int]
+    peak_rss_bytes: int | None
+
+    @property
+    def events_per_second(self) -> float:
+        """Throughput over all workers."""
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def format(self) -> str:
+        """Return a human readable report."""
+        lines = [
+            f'{self.events} events from {self.concurrency} {self.mode} in {self.elapsed:.2f}s',
+            f'throughput      {self.events_per_second:>12,.0f} events/s',
+            f'output          {self.bytes_written / max(self.events, 1):>12,.1f} bytes/event',
+        ]
+        lines.extend(f'latency {name:<7} {value / 1000:>12,.1f} us' for name, value in self.latencies_ns.items())
+        if self.peak_rss_bytes is not None:
+            lines.append(f'peak RSS        {self.peak_rss_bytes / 1024 / 1024:>12,.1f} MB')
+        return '\n'.join(lines)
+
+
+class NullSink(io.TextIOBase):
+    """A text stream which discards everything written to it, only counting the size."""
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        self.bytes_written = 0
+
+    def writable(self) -> bool:  # noqa: D102
+        return True
+
+    def write(self, s: str) -> int:  # noqa: D102
+        self.bytes_written += len(s)
+        return len(s)
+
+
+class PipeSink:
+    """The write end of an OS pipe as a text stream, with a thread draining the read end."""
+
+    def __init__(self):  # noqa: D107
+        read_fd, write_fd = os.pipe()
+        self.stream: TextIO = open(write_fd, 'w', encoding='utf-8')  # noqa: PTH123, SIM115
+        self.bytes_written = 0
+        self._reader = open(read_fd, 'rb', buffering=0)  # noqa: PTH123, SIM115
+        self._thread = threading.Thread(target=self._drain, name='mh_structlog_loadtest_drain', daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        while chunk := self._reader.read(1024 * 1024):
+            self.bytes_written += len(chunk)
+        self._reader.close()
+
+    def close(self) -> None:
+        """Close the write end, and wait until everything was read."""
+        self.stream.close()
+        self._thread.join()
+
+
+@contextlib.contextmanager
+def _sink(kind: str) -> Iterator[NullSink | PipeSink]:
+    """Redirect stdout (which setup() configures as the output of the stdout handler) to a sink.
+
+    Yields:
+        The sink, which counts the bytes written to it.
+    """
+    if kind not in SINKS:
+        raise ValueError(f'Unknown sink {kind}, choose from {", ".join(SINKS)}.')
+    sink = NullSink() if kind == 'null' else PipeSink()
+    original = sys.stdout
+    sys.stdout = sink if isinstance(sink, NullSink) else sink.stream
+    try:
+        yield sink
+    finally:
+        sys.stdout = original
+        _close_handlers()
+        if isinstance(sink, PipeSink):
+            sink.close()
+
+
+def _close_handlers() -> None:
+    """Flush and detach all handlers configured by setup(), since they write to the sink which is about to go away."""
+    loggers = [logging.getLogger(), *(logging.getLogger(name) for name in list(logging.Logger.manager.loggerDict))]
+    for logger in loggers:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.flush()
+            handler.close()
+
+
+def _peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _fail(depth: int) -> None:
+    if depth:
+        _fail(depth - 1)
+    raise ValueError('could not process order')
+
+
+class EventMix:
+    """Log a weighted random mix of realistic events."""
+
+    WEIGHTS: dict[str, int] = {'request': 40, 'fields': 20, 'debug': 15, 'stdlib': 15, 'warning': 8, 'exception': 2}
+
+    def __init__(self, seed: int):  # noqa: D107
+        self.rng = random.Random(seed)  # noqa: S311
+        self.logger = get_logger('loadtest')
+        self.stdlib_logger = logging.getLogger('loadtest.stdlib')
+        self.kinds = self.rng.choices(list(self.WEIGHTS), weights=list(self.WEIGHTS.values()), k=4096)
+
+    def start_request(self) -> None:
+        """Bind the contextvars of a new simulated request."""
+        context.clear_contextvars()
+        context.bind_contextvars(
+            request_id=f'{self.rng.getrandbits(64):016x}', user_id=self.rng.randrange(100_000), route='/api/orders'
+        )
+
+    def log(self, i: int) -> None:
+        """Log the i-th event."""
+        kind = self.kinds[i % len(self.kinds)]
+        getattr(self, f'_log_{kind}')(i)
+
+    def _log_request(self, i: int) -> None:
+        self.logger.info('request handled', method='GET', path=f'/api/orders/{i}', status=200, duration_ms=i % 250)
+
+    def _log_fields(self, i: int) -> None:
+        self.logger.info(
+            'order processed',
+            order={'id': i, 'items': [{'sku': f'SKU-{n}', 'quantity': n, 'price': 9.95} for n in range(3)]},
+            total=29.85,
+            tags=['priority', 'web'],
+            customer={'id': i % 1000, 'country': 'NL', 'segment': 'retail'},
+        )
+
+    def _log_debug(self, i: int) -> None:
+        self.logger.debug('cache lookup', key=f'order:{i}', hit=i % 3 == 0)
+
+    def _log_stdlib(self, i: int) -> None:
+        self.stdlib_logger.info('job %s finished', i, extra={'job': 'sync', 'attempt': 1})
+
+    def _log_warning(self, i: int) -> None:
+        self.logger.warning('slow query', duration_ms=1200 + i % 100, query='SELECT * FROM orders WHERE id = %s')
+
+    def _log_exception(self, i: int) -> None:
+        try:
+            _fail(3)
+        except ValueError:
+            self.logger.exception('failed to process order', order_id=i)
+
+
+def _percentiles(latencies: array.array) -> dict[str, int]:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    result = {f'p{q:g}': ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)] for q in PERCENTILES}
+    result['max'] = ordered[-1]
+    return result
+
+
+def _run_events(mix: EventMix, start: int, count: int, latencies: array.array | None) -> None:
+    perf_counter_ns = time.perf_counter_ns
+    for i in range(start, start + count):
+        if i % EVENTS_PER_REQUEST == 0:
+            mix.start_request()
+        before = perf_counter_ns()
+        mix.log(i)
+        if latencies is not None:
+            latencies.append(perf_counter_ns() - before)
+
+
+def _run_threads(concurrency: int, events: int, warmup: int, seed: int) -> tuple[float, array.array]:
+    barrier = threading.Barrier(concurrency + 1)
+    results = [array.array('q') for _ in range(concurrency)]
+
+    def worker(index: int) -> None:
+        mix = EventMix(seed + index)
+        _run_events(mix, 0, warmup, None)
+        barrier.wait()
+        _run_events(mix, warmup, events, results[index])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = array.array('q')
+    for result in results:
+        latencies.extend(result)
+    return elapsed, latencies
+
+
+def _run_asyncio(concurrency: int, events: int, warmup: int, seed: int) -> tuple[float, array.array]:
+    latencies = array.array('q')
+
+    async def task(index: int, start: int, count: int, record: bool) -> None:
+        mix = EventMix(seed + index)
+        for request_start in range(start, start + count, EVENTS_PER_REQUEST):
+            _run_events(
+                mix,
+                request_start,
+                min(EVENTS_PER_REQUEST, start + count - request_start),
+                latencies if record else None,
+            )
+            # Interleave the requests of all tasks, like a server handling concurrent requests.
+            await asyncio.sleep(0)
+
+    async def main() -> float:
+        await asyncio.gather(*(task(i, 0, warmup, record=False) for i in range(concurrency)))
+        start = time.perf_counter()
+        await asyncio.gather(*(task(i, warmup, events, record=True) for i in range(concurrency)))
+        return time.perf_counter() - start
+
+    return asyncio.run(main()), latencies
+
+
+def _process_worker(
+    setup_options: dict[str, Any], sink: str, events: int, warmup: int, seed: int
+) -> tuple[float, bytes, int, int | None]:
+    """Run a single worker in a child process: configure logging there, and log the events."""
+    with _sink(sink) as output:
+        _configure(setup_options)
+        elapsed, latencies = _run_threads(1, events, warmup, seed)
+    return elapsed, latencies.tobytes(), output.bytes_written, _peak_rss_bytes()
+
+
+def _configure(setup_options: dict[str, Any]) -> None:
+    # The load test owns the configuration of this process.
+    structlog.reset_defaults()
+    setup(**setup_options)
+
+
+def run_loadtest(
+    setup_options: dict[str, Any] | None = None,
+    events: int = 100_000,
+    concurrency: int = 1,
+    mode: str = 'threads',
+    sink: str = 'null',
+    warmup: int = 1_000,
+    seed: int = 0,
+) -> LoadTestResult:
+    """Configure logging with setup(**setup_options), log events from concurrent workers, and measure the result.
+
+    Args:
+        setup_options: The arguments for setup().
+        events: The total number of events to log (divided over the workers), without the warmup.
+        concurrency: The number of workers.
+        mode: How the workers run: 'threads', 'asyncio' (tasks in one event loop) or 'processes'.
+        sink: Where stdout goes: 'null' (discarded) or 'pipe' (an OS pipe, drained by another thread).
+        warmup: The number of events each worker logs before the measurement starts.
+        seed: Seed for the random event mix, for reproducible runs.
+
+    Returns:
+        The throughput, the percentiles of the latency of a single log call and the peak RSS.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown mode {mode}, choose from {", ".join(MODES)}.')
+    if concurrency < 1:
+        raise ValueError('concurrency should be a positive integer.')
+    setup_options = setup_options or {}
+    per_worker = events // concurrency
+
+    if mode == 'processes':
+        return _run_processes(setup_options, per_worker, concurrency, sink, warmup, seed)
+
+    runner: Callable[[int, int, int, int], tuple[float, array.array]] = (
+        _run_threads if mode == 'threads' else _run_asyncio
+    )
+    with _sink(sink) as output:
+        _configure(setup_options)
+        elapsed, latencies = runner(concurrency, per_worker, warmup, seed)
+    return LoadTestResult(
+        mode, concurrency, len(latencies), elapsed, output.bytes_written, _percentiles(latencies), _peak_rss_bytes()
+    )
+
+
+def _run_processes(
+    setup_options: dict[str, Any], events: int, concurrency: int, sink: str, warmup: int, seed: int
+) -> LoadTestResult:
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=concurrency, mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        futures = [
+            executor.submit(_process_worker, setup_options, sink, events, warmup, seed + i) for i in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+
+    latencies = array.array('q')
+    for _, data, _, _ in results:
+        latencies.frombytes(data)
+    rss = [result[3] for result in results if result[3] is not None]
+    return LoadTestResult(
+        'processes',
+        concurrency,
+        len(latencies),
+        # The processes run in parallel; the slowest one determines the duration.
+        max(result[0] for result in results),
+        sum(result[2] for result in results),
+        _percentiles(latencies),
+        max(rss) if rss else None,
+    )
@@ -0,0 +1,333 @@
+"""Aggregate metrics from the fields of log events in process, and log them periodically as summary events.
+
+Configured with setup(metrics_config={...}):
+
+    setup(
+        metrics_config={
+            'loggers': ['mh_structlog.django.access'],
+            'counters': {'requests': None},  # count every event
+            'histograms': {'latency_ms': 'latency_ms'},  # the distribution of the values of a numeric field
+            'dimensions': ['method', 'status'],
+            'flush_interval_s': 60,
+        }
+    )
+
+Every combination of dimension values gets its own series. When the flush interval has passed (checked when an event
+comes in), at exit, and when flush_metrics() is called (e.g. at the end of a Lambda invocation), one event per series is
+logged by the 'mh_structlog.metrics' logger. With the aws_json log format, these events are in the CloudWatch Embedded
+Metric Format, so CloudWatch extracts the metrics from the log lines themselves.
+"""
+
+from __future__ import annotations
+
+import atexit
+import collections
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from structlog.typing import EventDict
+
+
+METRICS_LOGGER_NAME = 'mh_structlog.metrics'
+# The dimension values of the series in which the events are counted once max_series is reached.
+OVERFLOW_DIMENSION_VALUE = '__other__'
+# CloudWatch accepts at most this many values for a metric in an EMF event.
+EMF_MAX_VALUES = 100
+# The fields of the flushed events besides the dimensions and metrics, which neither can be named after.
+RESERVED_FIELDS = frozenset({'_aws', 'event', 'interval_s', 'level', 'logger', 'timestamp'})
+
+_aggregator: MetricsAggregator | None = None
+_atexit_registered = False
+
+
+def _bucket(value: float) -> float:
+    """Return the upper bound of the histogram bucket of a value; 4 buckets per power of two (at most 12.5% off)."""
+    if value <= 0:
+        return 0.0 if value == 0 else -_bucket(-value)
+    mantissa, exponent = math.frexp(value)
+    return math.ldexp(0.5 + (int((mantissa - 0.5) * 8) + 1) / 8, exponent)
+
+
+class Histogram:
+    """The distribution of the values of a field: exact count, sum, min and max, and bucketed values."""
+
+    __slots__ = ('buckets', 'count', 'max', 'min', 'sum')
+
+    def __init__(self):  # noqa: D107
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets: dict[float, int] = {}
+
+    def record(self, value: float) -> None:
+        """Add a single value."""
+        self.count += 1
+        self.sum += value
+        self.min = min(value, self.min)
+        self.max = max(value, self.max)
+        bucket = _bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        """Return an estimate (the bucket boundary, within min and max) of the q-th percentile, q between 0 and 100."""
+        threshold = self.count * q / 100
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= threshold:
+                return min(max(bucket, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Return the statistics of the histogram, as logged by a flush without EMF."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+    def samples(self, max_values: int = EMF_MAX_VALUES) -> list[float]:
+        """Return at most max_values bucket values, each repeated in proportion to the number of values in it."""
+        buckets = sorted(self.buckets.items())
+        if self.count <= max_values:
+            return [bucket for bucket, n in buckets for _ in range(n)]
+        # Largest remainder method: every bucket gets its share of max_values, rounded down, and the values left over
+        # go to the buckets with the largest rounding loss.
+        shares = [(bucket, n * max_values / self.count) for bucket, n in buckets]
+        counts = {bucket: int(share) for bucket, share in shares}
+        left = max_values - sum(counts.values())
+        for bucket, _share in sorted(shares, key=lambda item: item[1] - int(item[1]), reverse=True)[:left]:
+            counts[bucket] += 1
+        return [bucket for bucket, n in sorted(counts.items()) for _ in range(n)]
+
+
+class _Series:
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self, counter_names: Iterable[str], histogram_names: Iterable[str]):
+        self.counters = dict.fromkeys(counter_names, 0)
+        self.histograms = {name: Histogram() for name in histogram_names}
+
+
+class MetricsAggregator:
+    """A processor which aggregates counters and histograms from event fields, per combination of dimension values.
+
+    Args:
+        counters: Per metric name, the field an event must have to be counted (None to count every event).
+        histograms: Per metric name, the numeric field of which the values are aggregated.
+        dimensions: The fields of which the values identify a series.
+        loggers: Only aggregate the events of these loggers (and their children); all loggers by default.
+        flush_interval_s: Log the aggregates (and start over) at most this many seconds apart.
+        emf: Log the aggregates in the CloudWatch Embedded Metric Format.
+        namespace: The CloudWatch namespace of the metrics, with EMF.
+        units: Per histogram, its CloudWatch unit (e.g. 'Milliseconds'), with EMF.
+        drop_aggregated: Drop the events which were aggregated, instead of passing them on to be logged.
+        max_series: The number of series per flush interval, after which new dimension values are counted together.
+
+    Dimensions and metrics are fields of the same flushed events, so their names (and, with EMF, the <histogram>_count,
+    _sum and _max fields) must all be different; a ValueError is raised otherwise.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        counters: Mapping[str, str | None] | Iterable[str] = (),
+        histograms: Mapping[str, str] | Iterable[str] = (),
+        dimensions: Iterable[str] = (),
+        loggers: Iterable[str] | None = None,
+        flush_interval_s: float = 60,
+        emf: bool = False,  # noqa: FBT001, FBT002
+        namespace: str = 'mh_structlog',
+        units: Mapping[str, str] | None = None,
+        drop_aggregated: bool = False,  # noqa: FBT001, FBT002
+        max_series: int = 1000,
+    ):
+        # A list of field names is shorthand for metrics named after their field.
+        self.counters = dict(counters) if hasattr(counters, 'items') else {field: field for field in counters}
+        self.histograms = dict(histograms) if hasattr(histograms, 'items') else {field: field for field in histograms}
+        self.dimensions = tuple(dimensions)
+        self.loggers = None if loggers is None else tuple(loggers)
+        self.flush_interval_s = flush_interval_s
+        self.emf = emf
+        self.namespace = namespace
+        self.units = dict(units or {})
+        self.drop_aggregated = drop_aggregated
+        self.max_series = max_series
+        self._check_field_names(emf)
+
+        self._lock = threading.Lock()
+        self._series: dict[tuple, _Series] = {}
+        self._interval_start = time.monotonic()
+        # Whether the events of a logger are aggregated, per logger name.
+        self._logger_matches: dict[str | None, bool] = {METRICS_LOGGER_NAME: False}
+
+    def _check_field_names(self, emf: bool) -> None:  # noqa: FBT001
+        fields = [*self.dimensions, *self.counters, *self.histograms]
+        if emf:
+            fields.extend(f'{metric}_{suffix}' for metric in self.histograms for suffix in ('count', 'sum', 'max'))
+        clashing = {field for field, n in collections.Counter(fields).items() if n > 1} | RESERVED_FIELDS.intersection(
+            fields
+        )
+        if clashing:
+            raise ValueError(
+                f"The dimensions and metrics would be logged in the same fields: {', '.join(sorted(clashing))}; "
+                "give the metrics other names, e.g. counters={'requests': 'status'}."
+            )
+
+    def set_emf(self, emf: bool) -> None:  # noqa: FBT001
+        """Switch the format of the flushed events (e.g. when the log format changes), keeping the aggregates."""
+        self._check_field_names(emf)
+        self.emf = emf
+
+    def _matches(self, logger_name: str | None) -> bool:
+        matches = self._logger_matches.get(logger_name)
+        if matches is None:
+            matches = self.loggers is None or (
+                isinstance(logger_name, str)
+                and any(logger_name == prefix or logger_name.startswith(prefix + '.') for prefix in self.loggers)
+            )
+            if len(self._logger_matches) >= 10_000:  # noqa: PLR2004
+                self._logger_matches = {METRICS_LOGGER_NAME: False}
+            self._logger_matches[logger_name] = matches
+        return matches
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102, ARG002
+        if not self._matches(event_dict.get('logger')):
+            return event_dict
+
+        counted = [metric for metric, field in self.counters.items() if field is None or field in event_dict]
+        measured = [
+            (metric, value)
+            for metric, field in self.histograms.items()
+            if isinstance(value := event_dict.get(field), int | float) and not isinstance(value, bool)
+        ]
+        if counted or measured:
+            self._record(event_dict, counted, measured)
+
+        if time.monotonic() - self._interval_start >= self.flush_interval_s:
+            self.flush()
+
+        if self.drop_aggregated and (counted or measured):
+            raise structlog.DropEvent
+        return event_dict
+
+    def _record(self, event_dict: EventDict, counted: list[str], measured: list[tuple[str, float]]) -> None:
+        key = tuple(event_dict.get(dimension) for dimension in self.dimensions)
+        with self._lock:
+            try:
+                series = self._series.get(key)
+            except TypeError:
+                # Unhashable dimension values (e.g. a dict) are aggregated by their string representation.
+                key = tuple(map(str, key))
+                series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (OVERFLOW_DIMENSION_VALUE,) * len(self.dimensions)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(self.counters, self.histograms)
+            for metric in counted:
+                series.counters[metric] += 1
+            for metric, value in measured:
+                series.histograms[metric].record(value)
+
+    def flush(self) -> None:
+        """Log the aggregates collected since the previous flush, one event per series, and start over."""
+        with self._lock:
+            series, self._series = self._series, {}
+            interval_s = time.monotonic() - self._interval_start
+            self._interval_start = time.monotonic()
+
+        logger = structlog.get_logger(METRICS_LOGGER_NAME)
+        for key, aggregates in series.items():
+            dimensions = dict(zip(self.dimensions, key, strict=True))
+            if self.emf:
+                logger.info('metrics', **self._emf_fields(dimensions, aggregates))
+            else:
+                logger.info(
+                    'metrics',
+                    **dimensions,
+                    **aggregates.counters,
+                    **{metric: h.summary() for metric, h in aggregates.histograms.items() if h.count},
+                    interval_s=round(interval_s, 3),
+                )
+
+    def _emf_fields(self, dimensions: dict[str, Any], aggregates: _Series) -> dict[str, Any]:
+        """Return the fields of an event in the CloudWatch Embedded Metric Format."""
+        metrics: list[dict[str, str]] = []
+        values: dict[str, Any] = {}
+        for metric, count in aggregates.counters.items():
+            metrics.append({'Name': metric, 'Unit': 'Count'})
+            values[metric] = count
+        for metric, histogram in aggregates.histograms.items():
+            if not histogram.count:
+                continue
+            unit = self.units.get(metric, 'None')
+            # CloudWatch derives the percentiles from the (bucketed) values; the exact totals are separate metrics,
+            # since the values are capped at EMF_MAX_VALUES.
+            metrics.extend(
+                [
+                    {'Name': metric, 'Unit': unit},
+                    {'Name': f'{metric}_count', 'Unit': 'Count'},
+                    {'Name': f'{metric}_sum', 'Unit': unit},
+                    {'Name': f'{metric}_max', 'Unit': unit},
+                ]
+            )
+            values[metric] = histogram.samples()
+            values[f'{metric}_count'] = histogram.count
+            values[f'{metric}_sum'] = histogram.sum
+            values[f'{metric}_max'] = histogram.max
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [
+                    {'Namespace': self.namespace, 'Dimensions': [list(dimensions)], 'Metrics': metrics}
+                ],
+            },
+            # Dimension values have to be strings.
+            **{dimension: str(value) for dimension, value in dimensions.items()},
+            **values,
+        }
+
+
+def enable_metrics(aggregator: MetricsAggregator, flush_at_exit: bool = True) -> MetricsAggregator:  # noqa: FBT001, FBT002
+    """Make the aggregator the active one, which flush_metrics() flushes."""
+    global _aggregator, _atexit_registered  # noqa: PLW0603
+
+    _aggregator = aggregator
+
+    if flush_at_exit and not _atexit_registered:
+        atexit.register(flush_metrics)
+        _atexit_registered = True
+
+    return _aggregator
+
+
+def disable_metrics() -> None:
+    """Drop the active aggregator, so nothing is flushed for it; setup() does this when called without metrics."""
+    global _aggregator  # noqa: PLW0603
+
+    _aggregator = None
+
+
+def get_metrics_aggregator() -> MetricsAggregator | None:
+    """Return the active aggregator, or None when metrics were not configured in setup()."""
+    return _aggregator
+
+
+def flush_metrics() -> None:
+    """Log the aggregates of the active aggregator (if any) now, e.g. at the end of a Lambda invocation."""
+    if _aggregator is not None:
+        _aggregator.flush()
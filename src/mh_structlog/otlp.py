@@ -0,0 +1,169 @@
+"""Export logs to an OpenTelemetry collector, using OTLP/HTTP with the json encoding.
+
+The OTLPRenderer maps an event dict to an OTLP LogRecord, already encoded as json. The OTLPHandler (in
+mh_structlog.handlers) concatenates the encoded records of a batch into a single export request, so events are encoded
+only once, and sends it from a background thread.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from .processors import expand_static_fields
+
+
+if TYPE_CHECKING:
+    from structlog.typing import EventDict
+
+
+DEFAULT_ENDPOINT = 'http://localhost:4318/v1/logs'
+
+# https://opentelemetry.io/docs/specs/otel/logs/data-model/#field-severitynumber
+SEVERITY_NUMBERS = {
+    'notset': 0,
+    'debug': 5,
+    'info': 9,
+    'warning': 13,
+    'warn': 13,
+    'error': 17,
+    'exception': 17,
+    'critical': 21,
+    'fatal': 21,
+}
+
+# Fields mapped to the trace context of the record; the otel* names are the ones added by the logging instrumentation of
+# opentelemetry-python.
+TRACE_ID_FIELDS = ('trace_id', 'otelTraceID')
+SPAN_ID_FIELDS = ('span_id', 'otelSpanID')
+TRACE_FLAGS_FIELDS = ('trace_flags', 'otelTraceSampled')
+
+
+def default_endpoint() -> str:
+    """Return the endpoint from the standard OpenTelemetry environment variables, or the local collector."""
+    if endpoint := os.environ.get('OTEL_EXPORTER_OTLP_LOGS_ENDPOINT'):
+        return endpoint
+    if endpoint := os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT'):
+        return endpoint.rstrip('/') + '/v1/logs'
+    return DEFAULT_ENDPOINT
+
+
+def any_value(value: Any) -> dict:  # noqa: PLR0911
+    """Convert a value to an OTLP AnyValue."""
+    if isinstance(value, str):
+        return {'stringValue': value}
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # 64 bit integers are encoded as strings in OTLP/json.
+        return {'intValue': str(value)} if -(2**63) <= value < 2**63 else {'stringValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, dict):
+        return {'kvlistValue': {'values': attributes(value)}}
+    if isinstance(value, list | tuple | set | frozenset):
+        return {'arrayValue': {'values': [any_value(v) for v in value]}}
+    if value is None:
+        return {}
+    return {'stringValue': str(value)}
+
+
+def attributes(fields: dict) -> list[dict]:
+    """Convert a dict to a list of OTLP KeyValues."""
+    return [{'key': str(key), 'value': any_value(value)} for key, value in fields.items()]
+
+
+def _pop_first(event_dict: EventDict, keys: tuple[str, ...]) -> Any:
+    value = None
+    for key in keys:
+        found = event_dict.pop(key, None)
+        if value is None:
+            value = found
+    return value
+
+
+def _timestamp_ns(timestamp: Any) -> int | None:
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return int(parsed.timestamp()) * 1_000_000_000 + parsed.microsecond * 1000
+
+
+def _exception_attributes(exception: Any) -> dict:
+    """Map the exception field to the OpenTelemetry semantic conventions for exceptions."""
+    if isinstance(exception, str):
+        return {'exception.stacktrace': exception}
+    if isinstance(exception, list) and exception and isinstance(exception[-1], dict):
+        # structured tracebacks (dict_tracebacks), the last one is the exception that was raised
+        return {
+            'exception.type': exception[-1].get('exc_type'),
+            'exception.message': exception[-1].get('exc_value'),
+            'exception.stacktrace': orjson.dumps(exception, default=repr).decode(),
+        }
+    return {'exception.stacktrace': str(exception)}
+
+
+class OTLPRenderer:
+    """Render an event dict as an OTLP LogRecord in json, to be used as the last processor of a ProcessorFormatter.
+
+    The message becomes the body, the level the severity, the timestamp the time of the record and the trace fields the
+    trace context. All other fields become attributes.
+    """
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> str:  # noqa: D102, ARG002
+        expand_static_fields(None, None, event_dict)
+
+        level = str(event_dict.pop('level', '') or '').lower()
+        observed_ns = time.time_ns()
+        record: dict[str, Any] = {
+            'timeUnixNano': str(_timestamp_ns(event_dict.pop('timestamp', None)) or observed_ns),
+            'observedTimeUnixNano': str(observed_ns),
+            'severityNumber': SEVERITY_NUMBERS.get(level, 0),
+            'severityText': level.upper(),
+        }
+
+        message = event_dict.pop('message', event_dict.pop('event', None))
+        if message is not None:
+            record['body'] = any_value(message)
+
+        trace_id = _pop_first(event_dict, TRACE_ID_FIELDS)
+        span_id = _pop_first(event_dict, SPAN_ID_FIELDS)
+        trace_flags = _pop_first(event_dict, TRACE_FLAGS_FIELDS)
+        if trace_id:
+            record['traceId'] = f'{trace_id:032x}' if isinstance(trace_id, int) else str(trace_id)
+        if span_id:
+            record['spanId'] = f'{span_id:016x}' if isinstance(span_id, int) else str(span_id)
+        if trace_flags is not None:
+            record['flags'] = int(trace_flags)
+
+        if 'exception' in event_dict:
+            event_dict.update(_exception_attributes(event_dict.pop('exception')))
+
+        record['attributes'] = attributes(event_dict)
+        return orjson.dumps(record, default=str).decode()
+
+
+def request_envelope(resource_attributes: dict | None = None) -> tuple[bytes, bytes]:
+    """Return the bytes before and after the comma separated log records in an export request.
+
+    The resource gets the service.name from the OTEL_SERVICE_NAME environment variable by default.
+    """
+    resource = {'service.name': os.environ.get('OTEL_SERVICE_NAME', 'unknown_service'), **(resource_attributes or {})}
+    marker = '__mh_structlog_log_records__'
+    request = {
+        'resourceLogs': [
+            {
+                'resource': {'attributes': attributes(resource)},
+                'scopeLogs': [{'scope': {'name': 'mh_structlog'}, 'logRecords': [marker]}],
+            }
+        ]
+    }
+    prefix, suffix = orjson.dumps(request).split(orjson.dumps(marker))
+    return prefix, suffix
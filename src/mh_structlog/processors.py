@@ -1,17 +1,31 @@
+import contextvars
 import dataclasses
+import itertools
 import logging
-from collections.abc import Callable, Mapping
+import re
+import sys
+from collections.abc import Callable, Iterable, Mapping
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
 import orjson
 import structlog
 from structlog.processors import CallsiteParameter
 from structlog.typing import EventDict
 
+from .schemas import get_event_schema
+
 
 try:
-    from pydantic import BaseModel
+    # Private to structlog: the frame of the caller of an async log method, which processes the event in a thread pool.
+    from structlog._frames import _ASYNC_CALLING_STACK  # noqa: PLC2701
 except ImportError:
-    BaseModel = None  # ty:ignore[invalid-assignment]
+    _ASYNC_CALLING_STACK = None
+
+
+if TYPE_CHECKING:
+    from types import CodeType
+
 
 # Inspect a default logging library record so we can find out which keys on a LogRecord are 'extra' and not default ones.
 _LOG_RECORD_KEYS = set(logging.LogRecord("name", 0, "pathname", 0, "msg", (), None).__dict__.keys())
@@ -32,18 +46,167 @@ def add_flattened_extra(_, __, event_dict: dict) -> dict:  # noqa: ANN001
     return event_dict
 
 
-def _merge_pathname_lineno_function_to_location(logger: structlog.BoundLogger, name: str, event_dict: dict) -> dict:  # noqa: ARG001
-    """Add the source of the log as a single attribute."""
-    pathname = event_dict.pop(CallsiteParameter.PATHNAME.value, None)
-    lineno = event_dict.pop(CallsiteParameter.LINENO.value, None)
-    func_name = event_dict.pop(CallsiteParameter.FUNC_NAME.value, None)
-    event_dict["location"] = f"{pathname}:{lineno}({func_name})"
+class CallsiteLocationAdder:
+    """Add where the event was logged, like structlog's CallsiteParameterAdder, but cached per code object and line.
+
+    With compact set, it adds a single 'location' field ('pathname:lineno(func_name)'), else the 'pathname', 'lineno'
+    and 'func_name' fields. For each code object it is remembered whether it belongs to structlog (or to one of
+    additional_ignores), and the fields are formatted once per line, so an event only costs a short frame walk and a
+    few dict lookups. Both caches are cleared when they reach max_cached_keys entries, e.g. with code compiled at
+    runtime.
+    """
+
+    def __init__(  # noqa: D107
+        self, compact: bool = True, additional_ignores: list[str] | None = None, max_cached_keys: int = 10_000
+    ):
+        self.compact = compact
+        self.ignores = ('structlog', *(additional_ignores or ()))
+        self.max_cached_keys = max_cached_keys
+        self._ignored_codes: dict[CodeType, bool] = {}
+        self._fields: dict[tuple, dict] = {}
+
+    def __call__(self, logger: structlog.BoundLogger, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102, ARG002
+        record = event_dict.get('_record')
+        if record is not None and not event_dict.get('_from_structlog', False):
+            # Events from the stdlib logging module know where they were logged already.
+            key = (record.pathname, record.lineno, record.funcName)
+            fields = self._fields.get(key)
+            if fields is None:
+                fields = self._cache_fields(key, *key)
+        else:
+            # Async log methods run the processors in another thread, and pass the frame of the caller along.
+            frame = sys._getframe(1)  # noqa: SLF001
+            if _ASYNC_CALLING_STACK is not None:
+                frame = _ASYNC_CALLING_STACK.get(frame)
+            ignored_codes = self._ignored_codes
+            while frame.f_back is not None:
+                code = frame.f_code
+                ignored = ignored_codes.get(code)
+                if ignored is None:
+                    if len(ignored_codes) >= self.max_cached_keys:
+                        ignored_codes.clear()
+                    ignored = ignored_codes[code] = (frame.f_globals.get('__name__') or '?').startswith(self.ignores)
+                if not ignored:
+                    break
+                frame = frame.f_back
+            code = frame.f_code
+            fields = self._fields.get((code, frame.f_lineno))
+            if fields is None:
+                fields = self._cache_fields((code, frame.f_lineno), code.co_filename, frame.f_lineno, code.co_name)
+
+        event_dict.update(fields)
+        return event_dict
+
+    def _cache_fields(self, key: tuple, pathname: str, lineno: int, func_name: str) -> dict:
+        if len(self._fields) >= self.max_cached_keys:
+            self._fields.clear()
+        fields = self._fields[key] = self._format(pathname, lineno, func_name)
+        return fields
+
+    def _format(self, pathname: str, lineno: int, func_name: str) -> dict:
+        if self.compact:
+            return {'location': f"{pathname}:{lineno}({func_name})"}
+        return {
+            CallsiteParameter.PATHNAME.value: pathname,
+            CallsiteParameter.LINENO.value: lineno,
+            CallsiteParameter.FUNC_NAME.value: func_name,
+        }
+
+
+# Key under which pre-serialized StaticFields are attached to the event dict, to be spliced in by the renderer.
+STATIC_FIELDS_KEY = "_static_fields"
+
+
+class StaticFields:
+    """A set of fields which is the same on every event, serialized to json once.
+
+    Instead of adding the fields to each event dict, a reference to this object is attached under STATIC_FIELDS_KEY
+    and render_orjson splices the serialized fields into the rendered line. When the log call itself contains one of
+    the keys, the static value wins if override is set (like FieldsAdder), else the value of the log call wins (like
+    merge_contextvars).
+    """
+
+    __slots__ = ("_data", "keys", "override", "serialized", "splice")
+
+    def __init__(self, data: Mapping, override: bool = True):  # noqa: D107
+        self.override = override
+        self.data = data
+
+    @property
+    def data(self) -> dict:
+        """The static fields. Assign a new mapping to update them; this also refreshes the serialized form."""
+        return self._data
+
+    @data.setter
+    def data(self, data: Mapping) -> None:
+        self._data = dict(data)
+        self.keys = frozenset(self._data)
+        # The fields without the surrounding braces, and the tail to replace the closing brace of a rendered line with.
+        self.serialized = orjson.dumps(self._data, default=repr).decode()[1:-1]
+        self.splice = f",{self.serialized}}}" if self.serialized else "}"
+
+    def apply(self, event_dict: EventDict) -> None:
+        """Add the fields to the event dict as regular fields."""
+        if self.override:
+            event_dict.update(self._data)
+        else:
+            for key, value in self._data.items():
+                event_dict.setdefault(key, value)
+
+    def __repr__(self) -> str:
+        return f"StaticFields({self._data!r})"
+
+
+def attach_static_fields(event_dict: EventDict, static_fields: StaticFields) -> None:
+    """Attach pre-serialized static fields to the event dict, for the renderer to splice in."""
+    attached = event_dict.get(STATIC_FIELDS_KEY)
+    event_dict[STATIC_FIELDS_KEY] = (static_fields,) if attached is None else (*attached, static_fields)
+
+
+def expand_static_fields(_, __, event_dict: EventDict) -> EventDict:  # noqa: ANN001
+    """Turn attached pre-serialized static fields into regular fields, for renderers which cannot splice them in."""
+    for static_fields in event_dict.pop(STATIC_FIELDS_KEY, ()):
+        static_fields.apply(event_dict)
     return event_dict
 
 
 def render_orjson(logger: structlog.BoundLogger, name: str, event_dict: dict) -> str:  # noqa: ARG001
     """Render the event_dict as a json string using orjson."""
-    return orjson.dumps(event_dict, default=repr).decode()
+    attached = event_dict.pop(STATIC_FIELDS_KEY, None)
+    if attached is None:
+        return orjson.dumps(event_dict, default=repr).decode()
+
+    if len(attached) == 1 and event_dict and event_dict.keys().isdisjoint(attached[0].keys):
+        # Fast path: splice the pre-serialized fields in place of the closing brace.
+        return orjson.dumps(event_dict, default=repr).decode()[:-1] + attached[0].splice
+
+    return _render_orjson_with_static_fields(event_dict, attached)
+
+
+def _render_orjson_with_static_fields(event_dict: dict, attached: tuple[StaticFields, ...]) -> str:
+    """Render the event_dict with orjson, and splice the pre-serialized static fields into the result."""
+    if len(attached) > 1 and any(
+        not a.keys.isdisjoint(b.keys) for i, a in enumerate(attached) for b in attached[i + 1 :]
+    ):
+        # Static fields overriding each other; resolve them as regular fields.
+        for static_fields in attached:
+            static_fields.apply(event_dict)
+        return orjson.dumps(event_dict, default=repr).decode()
+
+    parts = []
+    for static_fields in attached:
+        overlap = event_dict.keys() & static_fields.keys
+        if not overlap:
+            parts.append(static_fields.serialized)
+        elif static_fields.override:
+            for key in overlap:
+                del event_dict[key]
+            parts.append(static_fields.serialized)
+        else:
+            static_fields.apply(event_dict)
+
+    parts.insert(0, orjson.dumps(event_dict, default=repr).decode()[1:-1])
+    return "{" + ",".join(part for part in parts if part) + "}"
 
 
 class FieldsAdder:
@@ -51,13 +214,30 @@ class FieldsAdder:
 
     E.g. you can configure it to add {"service": "my-service", "env": "production"} to each log at program startup,
     instead of having to configure them on every logger.
+
+    With pre_serialize, the fields are serialized once and spliced into each line by render_orjson, instead of being
+    added to the event dict. Processors running before the renderer (e.g. Sentry) then do not see them.
     """
 
-    def __init__(self, data: dict):  # noqa: D107
+    def __init__(self, data: dict, pre_serialize: bool = False):  # noqa: D107
+        self.pre_serialize = pre_serialize
         self.data = data
 
+    @property
+    def data(self) -> dict:
+        """The fields to add. Assign a new dict to update them."""
+        return self._data
+
+    @data.setter
+    def data(self, data: dict) -> None:
+        self._data = data
+        self._static_fields = StaticFields(data) if self.pre_serialize else None
+
     def __call__(self, logger: logging.Logger, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102,ARG001,ARG002
-        event_dict.update(self.data)
+        if self._static_fields is not None:
+            attach_static_fields(event_dict, self._static_fields)
+        else:
+            event_dict.update(self._data)
         return event_dict
 
 
@@ -95,8 +275,18 @@ class ObjectToDictTransformer:
         pass
 
     def __call__(self, logger: logging.Logger, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102,ARG001,ARG002
-        for key, value in list(event_dict.items()):
-            if BaseModel is not None and isinstance(value, BaseModel):
+        # pydantic is not imported for this: a pydantic model can only be logged once pydantic was imported anyway.
+        pydantic = sys.modules.get('pydantic')
+        base_model = None if pydantic is None else pydantic.BaseModel
+        # Declared events only need their fields which are not plain scalars to be looked at.
+        schema = get_event_schema(event_dict.get('event'))
+        items = (
+            list(event_dict.items())
+            if schema is None
+            else [(key, event_dict[key]) for key in event_dict.keys() - schema.scalar_fields]
+        )
+        for key, value in items:
+            if base_model is not None and isinstance(value, base_model):
                 event_dict[key] = value.model_dump()
             elif isinstance(value, Mapping):
                 event_dict[key] = dict(value)
@@ -135,8 +325,364 @@ class CapExceptionFrames:
         return event_dict
 
 
+def add_timestamp(_, __, event_dict: dict) -> dict:  # noqa: ANN001
+    """Add an ISO timestamp in UTC; for stdlib records the time they were created, which can be well before they are
+    formatted (e.g. by an async handler).
+    """
+    record = event_dict.get("_record")
+    now = (
+        datetime.fromtimestamp(record.created, tz=timezone.utc) if record is not None else datetime.now(tz=timezone.utc)
+    )
+    event_dict['timestamp'] = now.isoformat().replace('+00:00', 'Z')
+    return event_dict
+
+
 def cap_timestamp_to_ms_precision(_, __, event_dict: dict) -> dict:  # noqa: ANN001
     """Cap the timestamp to millisecond precision, dropping the microseconds part."""
     if ts := event_dict.get("timestamp"):
         event_dict['timestamp'] = ts[:-4] + 'Z'
     return event_dict
+
+
+class FieldSizeGuard:
+    """Limit the size of the values in the event dict before it gets rendered.
+
+    Strings, collections and nesting depth are capped per value, and the largest fields are replaced by a placeholder
+    when the (estimated) size of the whole event is still too big. Values within the limits are passed on as-is, and
+    collections are only walked up to the item limit; only containers in which something was truncated get rebuilt.
+    The paths of the truncated fields are listed under the 'truncated_fields' key. Pre-serialized StaticFields are
+    counted in the size of the event, but are never truncated.
+
+    setup() runs it after the Redactor, so that a secret is never cut in half before its value pattern had the chance
+    to match it.
+    """
+
+    # Never replace these fields as a whole when the event is too big.
+    protected_keys = frozenset({'event', 'message', 'level', 'severity', 'logger', 'timestamp'})
+
+    def __init__(
+        self,
+        max_string_length: int | None = 10_000,
+        max_collection_items: int | None = 100,
+        max_depth: int | None = 10,
+        max_event_bytes: int | None = 256 * 1024,
+        marker_key: str = 'truncated_fields',
+    ):
+        """Set the limits; pass None to disable a specific limit."""
+        self.max_string_length = max_string_length
+        self.max_collection_items = max_collection_items
+        self.max_depth = max_depth
+        self.max_event_bytes = max_event_bytes
+        self.marker_key = marker_key
+
+    def __call__(self, logger: logging.Logger, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102,ARG002
+        truncated: list[str] = []
+        sizes: dict[str, int] = {}
+        changed = {}
+        static_size = 0
+
+        for key, value in event_dict.items():
+            if key == STATIC_FIELDS_KEY:
+                # Spliced into the rendered line as-is, with a separating comma.
+                static_size = sum(len(static_fields.serialized) + 1 for static_fields in value)
+                continue
+            new_value, size = self._guard(value, 1, str(key), truncated)
+            if new_value is not value:
+                changed[key] = new_value
+            sizes[key] = size + len(str(key)) + 4
+
+        if changed:
+            event_dict.update(changed)
+
+        if self.max_event_bytes is not None:
+            self._cap_event_size(event_dict, sizes, sum(sizes.values()) + static_size, truncated)
+
+        if truncated:
+            event_dict[self.marker_key] = truncated
+
+        return event_dict
+
+    def _cap_event_size(self, event_dict: EventDict, sizes: dict[str, int], total: int, truncated: list[str]) -> None:
+        """Replace the largest fields by a placeholder, until the event is within max_event_bytes."""
+        if total <= self.max_event_bytes:
+            return
+        for key in sorted(sizes, key=sizes.__getitem__, reverse=True):
+            if key in self.protected_keys:
+                continue
+            event_dict[key] = placeholder = f'<truncated: ~{sizes[key]} bytes>'
+            truncated.append(str(key))
+            total -= sizes[key] - len(placeholder)
+            if total <= self.max_event_bytes:
+                break
+
+    def _guard(self, value: object, depth: int, path: str, truncated: list[str]) -> tuple[object, int]:  # noqa: C901, PLR0911, PLR0912
+        """Return the value (the same object when it is within the limits) and an estimate of its rendered size."""
+        if isinstance(value, str):
+            if self.max_string_length is not None and len(value) > self.max_string_length:
+                truncated.append(path)
+                return value[: self.max_string_length] + '...', self.max_string_length + 5
+            return value, len(value) + 2
+
+        if isinstance(value, (bytes, bytearray)):
+            if self.max_string_length is not None and len(value) > self.max_string_length:
+                truncated.append(path)
+                return value[: self.max_string_length] + b'...', self.max_string_length + 8
+            return value, len(value) + 5
+
+        if isinstance(value, (Mapping, list, tuple, set, frozenset)):
+            if self.max_depth is not None and depth > self.max_depth:
+                truncated.append(path)
+                placeholder = f'<truncated: {type(value).__name__} with {len(value)} items>'
+                return placeholder, len(placeholder) + 2
+
+            too_many = self.max_collection_items is not None and len(value) > self.max_collection_items
+            if too_many:
+                truncated.append(path)
+
+            size = 2
+            changed = {}
+            if isinstance(value, Mapping):
+                items = itertools.islice(value.items(), self.max_collection_items) if too_many else value.items()
+                for k, v in items:
+                    new_v, s = self._guard(v, depth + 1, f'{path}.{k}', truncated)
+                    if new_v is not v:
+                        changed[k] = new_v
+                    size += s + len(str(k)) + 4
+                if not too_many and not changed:
+                    return value, size
+                items = itertools.islice(value.items(), self.max_collection_items) if too_many else value.items()
+                return {k: changed.get(k, v) for k, v in items}, size
+
+            items = itertools.islice(value, self.max_collection_items) if too_many else value
+            for i, v in enumerate(items):
+                new_v, s = self._guard(v, depth + 1, f'{path}.{i}', truncated)
+                if new_v is not v:
+                    changed[i] = new_v
+                size += s + 1
+            if not too_many and not changed:
+                return value, size
+            items = itertools.islice(value, self.max_collection_items) if too_many else value
+            new_list = list(itertools.starmap(changed.get, enumerate(items)))
+            return (tuple(new_list) if isinstance(value, tuple) else new_list), size
+
+        # Numbers, booleans, None and other objects (which get rendered with repr later on).
+        return value, 8
+
+
+# Values which never contain anything to redact.
+_SCALAR_TYPES = frozenset({int, float, bool})
+
+# Value patterns which can be passed by name to the Redactor.
+REDACTION_VALUE_PATTERNS = {'email': r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+', 'card_number': r'\b(?:\d[ -]?){12,18}\d\b'}
+
+
+class Redactor:
+    """Replace the values of secret fields, and secrets within string values, before the event gets rendered.
+
+    The key rules are regular expressions, searched for (case-insensitive) in the field names; they are compiled into a
+    single pattern, and the decision per field name is cached. Nested dicts, lists and tuples are walked as well, up to
+    max_depth; deeper values are replaced as a whole. Value patterns (regular expressions, or the names of the
+    REDACTION_VALUE_PATTERNS) are replaced within all string values, including the message. Containers in which
+    nothing was redacted are passed on as-is; the others are copied, the values logged are never modified.
+
+    Pre-serialized StaticFields attached to the event are replaced by redacted ones, made once per StaticFields.
+
+    setup() runs it right before the renderer (only the FieldSizeGuard comes after it), so that also the fields added
+    by the other processors (like a formatted exception) and the 'extra' of stdlib log records are scrubbed.
+    """
+
+    default_keys = (
+        'password',
+        'passwd',
+        'secret',
+        'token',
+        'api[-_]?key',
+        'authorization',
+        'cookie',
+        'session[-_]?id',
+        'card[-_]?number',
+        'cvv',
+    )
+
+    def __init__(
+        self,
+        keys: Iterable[str] | None = None,
+        value_patterns: Iterable[str] = (),
+        replacement: str = '[REDACTED]',
+        max_depth: int = 10,
+        max_cached_keys: int = 10_000,
+    ):
+        """Compile the rules; keys defaults to default_keys."""
+        keys = list(self.default_keys if keys is None else keys)
+        value_patterns = [REDACTION_VALUE_PATTERNS.get(pattern, pattern) for pattern in value_patterns]
+        self.key_matcher = re.compile('|'.join(f'(?:{key})' for key in keys), re.IGNORECASE) if keys else None
+        self.value_matcher = re.compile('|'.join(f'(?:{p})' for p in value_patterns)) if value_patterns else None
+        self.replacement = replacement
+        self.max_depth = max_depth
+        self.max_cached_keys = max_cached_keys
+        self._secret_keys: dict[object, bool] = {}
+        # Per id of a StaticFields: the StaticFields, the data it was redacted for, and the redacted StaticFields.
+        self._redacted_static_fields: dict[int, tuple[StaticFields, dict, StaticFields]] = {}
+
+    def __call__(self, logger: logging.Logger, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102,ARG002
+        attached = event_dict.pop(STATIC_FIELDS_KEY, None)
+        if changed := self._redact_mapping(event_dict, 1):
+            event_dict.update(changed)
+        if attached is not None:
+            event_dict[STATIC_FIELDS_KEY] = tuple(
+                self._redact_static_fields(static_fields) for static_fields in attached
+            )
+        return event_dict
+
+    def _redact_static_fields(self, static_fields: StaticFields) -> StaticFields:
+        """Return the StaticFields with its secrets replaced; the same object when there were none."""
+        cached = self._redacted_static_fields.get(id(static_fields))
+        # The data of a StaticFields can be replaced, which gives a new data dict.
+        if cached is None or cached[0] is not static_fields or cached[1] is not static_fields.data:
+            if len(self._redacted_static_fields) >= self.max_cached_keys:
+                self._redacted_static_fields.clear()
+            changed = self._redact_mapping(static_fields.data, 1)
+            redacted = (
+                StaticFields({**static_fields.data, **changed}, override=static_fields.override)
+                if changed
+                else static_fields
+            )
+            cached = self._redacted_static_fields[id(static_fields)] = (static_fields, static_fields.data, redacted)
+        return cached[2]
+
+    def is_secret_key(self, key: object) -> bool:
+        """Return whether the values of this field name are replaced."""
+        secret = self._secret_keys.get(key)
+        if secret is None:
+            if len(self._secret_keys) >= self.max_cached_keys:
+                self._secret_keys.clear()
+            secret = self._secret_keys[key] = self.key_matcher is not None and bool(self.key_matcher.search(str(key)))
+        return secret
+
+    def _redact_mapping(self, mapping: Mapping, depth: int) -> dict | None:
+        """Return the redacted values of the mapping, by key; None when nothing was redacted."""
+        secret_keys = self._secret_keys
+        no_value_matcher = self.value_matcher is None
+        changed = None
+        for key, value in mapping.items():
+            secret = secret_keys.get(key)
+            if secret is None:
+                secret = self.is_secret_key(key)
+            if secret:
+                new_value = self.replacement
+            elif value is None or value.__class__ in _SCALAR_TYPES or (value.__class__ is str and no_value_matcher):
+                continue
+            else:
+                new_value = self._redact_value(value, depth)
+                if new_value is value:
+                    continue
+            if changed is None:
+                changed = {}
+            changed[key] = new_value
+        return changed
+
+    def _redact_value(self, value: object, depth: int) -> object:  # noqa: C901, PLR0911, PLR0912
+        """Return the value with its secrets replaced; the same object when there were none."""
+        if isinstance(value, str):
+            if self.value_matcher is not None:
+                redacted, count = self.value_matcher.subn(self.replacement, value)
+                if count:
+                    return redacted
+            return value
+
+        if value is None or value.__class__ in _SCALAR_TYPES:
+            return value
+
+        if isinstance(value, (list, tuple)):
+            if depth >= self.max_depth:
+                return self.replacement
+            new_items = None
+            for i, item in enumerate(value):
+                if item is None or item.__class__ in _SCALAR_TYPES:
+                    continue
+                new_item = self._redact_value(item, depth + 1)
+                if new_item is not item:
+                    if new_items is None:
+                        new_items = list(value)
+                    new_items[i] = new_item
+            if new_items is None:
+                return value
+            return tuple(new_items) if isinstance(value, tuple) else new_items
+
+        # The dict check first, the check for other mappings is a lot slower.
+        if isinstance(value, dict) or isinstance(value, Mapping):  # noqa: SIM101
+            if depth >= self.max_depth:
+                return self.replacement
+            changed = self._redact_mapping(value, depth + 1)
+            return {**value, **changed} if changed else value
+
+        return value
+
+
+class RequestLogSummary:
+    """Collects the events logged during a request, to be emitted as fields of a single summary event.
+
+    Events below WARNING are aggregated: their fields are merged (later values win) and their messages are kept, up to
+    max_messages. Events at WARNING and above are only counted (and the first error is recorded); they are still
+    emitted on their own.
+    """
+
+    # Fields which describe a single event, and are not merged into the summary.
+    event_keys = frozenset(
+        {'event', 'message', 'level', 'logger', 'timestamp', 'exception', 'exc_info', 'stack', STATIC_FIELDS_KEY}
+    )
+
+    def __init__(self, max_messages: int = 20):  # noqa: D107
+        self.max_messages = max_messages
+        self.counts: dict[str, int] = {}
+        self.first_error: dict | None = None
+        self.fields: dict = {}
+        self.messages: list[str] = []
+
+    def add(self, method_name: str, event_dict: EventDict) -> bool:
+        """Account for an event; return whether it was aggregated (and should not be emitted on its own)."""
+        level = event_dict.get('level') or method_name
+        self.counts[level] = self.counts.get(level, 0) + 1
+        levelno = logging._nameToLevel.get(level.upper(), logging.INFO)  # noqa: SLF001
+
+        if levelno >= logging.WARNING:
+            if levelno >= logging.ERROR and self.first_error is None:
+                self.first_error = {'message': str(event_dict.get('event')), 'logger': event_dict.get('logger')}
+            return False
+
+        for key, value in event_dict.items():
+            if key not in self.event_keys:
+                self.fields[key] = value
+        if len(self.messages) < self.max_messages:
+            self.messages.append(str(event_dict.get('event')))
+        return True
+
+    def summary_fields(self) -> dict:
+        """The fields to add to the summary event: the merged fields, the counts per level and the first error."""
+        fields = {**self.fields, 'log_counts': self.counts, 'log_messages': self.messages}
+        if self.first_error is not None:
+            fields['first_error'] = self.first_error
+        return fields
+
+
+_request_log_summary: contextvars.ContextVar[RequestLogSummary | None] = contextvars.ContextVar(
+    'mh_structlog_request_log_summary', default=None
+)
+
+
+def start_request_log_summary(summary: RequestLogSummary) -> contextvars.Token:
+    """Aggregate the events logged in the current context into the summary, until end_request_log_summary()."""
+    return _request_log_summary.set(summary)
+
+
+def end_request_log_summary(token: contextvars.Token) -> None:
+    """Stop aggregating events into the summary started with start_request_log_summary()."""
+    _request_log_summary.reset(token)
+
+
+def aggregate_into_request_log_summary(logger: structlog.BoundLogger, name: str, event_dict: EventDict) -> EventDict:  # noqa: ARG001
+    """Hand the event to the active RequestLogSummary (if any), dropping it when it was aggregated."""
+    summary = _request_log_summary.get()
+    if summary is not None and summary.add(name, event_dict):
+        raise structlog.DropEvent
+    return event_dict
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import atexit
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, TextIO
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from structlog.typing import EventDict
+
+
+_profiler: ProcessorProfiler | None = None
+_atexit_registered = False
+
+
+def _processor_name(processor: Callable) -> str:
+    """Return a readable name for a processor, which can be a function, a method or a callable instance."""
+    name = getattr(processor, '__qualname__', None)
+    if name is None:
+        name = type(processor).__qualname__
+    return name
+
+
+class ProcessorStats:
+    """Timing statistics of a single processor, with a power-of-two histogram of the durations."""
+
+    def __init__(self, chain: str, position: int, name: str):  # noqa: D107
+        self.chain = chain
+        self.position = position
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        # Bucket i counts the durations d with 2**(i-1) <= d < 2**i nanoseconds.
+        self.buckets = [0] * 64
+        self._lock = threading.Lock()
+
+    def record(self, duration_ns: int) -> None:
+        """Add a single measured duration."""
+        with self._lock:
+            self.count += 1
+            self.total_ns += duration_ns
+            self.max_ns = max(duration_ns, self.max_ns)
+            self.buckets[min(duration_ns.bit_length(), 63)] += 1
+
+    @property
+    def mean_ns(self) -> float:
+        """Average duration of a call."""
+        return self.total_ns / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> int:
+        """Return an upper bound (the histogram bucket boundary) for the q-th percentile, with q between 0 and 100."""
+        if not self.count:
+            return 0
+        threshold = self.count * q / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= threshold:
+                return min(2**i, self.max_ns)
+        return self.max_ns
+
+
+class TimedProcessor:
+    """Wrap a processor and record the duration of every call to it."""
+
+    def __init__(self, processor: Callable, stats: ProcessorStats):  # noqa: D107
+        self.processor = processor
+        self.stats = stats
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> object:  # noqa: D102
+        start = time.perf_counter_ns()
+        try:
+            return self.processor(logger, name, event_dict)
+        finally:
+            # Also record processors which raise, e.g. DropEvent from filter_by_level.
+            self.stats.record(time.perf_counter_ns() - start)
+
+    def __repr__(self) -> str:
+        return f"TimedProcessor({self.processor!r})"
+
+
+class ProcessorProfiler:
+    """Collect per-processor timings for the processor chains configured by setup()."""
+
+    def __init__(self):  # noqa: D107
+        self.stats: dict[tuple[str, int], ProcessorStats] = {}
+
+    def wrap_chain(self, chain: str, processors: Iterable[Callable]) -> list[Callable]:
+        """Return a copy of the processor chain in which every processor is timed."""
+        wrapped = []
+        for position, processor in enumerate(processors):
+            name = _processor_name(processor)
+            stats = self.stats.get((chain, position))
+            # A chain rebuilt for another log format can have other processors at the same positions.
+            if stats is None or stats.name != name:
+                stats = self.stats[chain, position] = ProcessorStats(chain, position, name)
+            wrapped.append(TimedProcessor(processor, stats))
+        return wrapped
+
+    def reset(self) -> None:
+        """Forget all timings collected so far."""
+        for stats in self.stats.values():
+            with stats._lock:  # noqa: SLF001
+                stats.count = stats.total_ns = stats.max_ns = 0
+                stats.buckets = [0] * 64
+
+    def report(self) -> str:
+        """Return a table of all processors, ranked by the total time spent in them."""
+        ranked = sorted(self.stats.values(), key=lambda s: s.total_ns, reverse=True)
+        grand_total_ns = sum(s.total_ns for s in ranked) or 1
+
+        lines = [
+            f"{'chain':<24} {'processor':<48} {'calls':>9} {'total ms':>10} {'share':>6} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"
+        ]
+        for s in ranked:
+            if not s.count:
+                continue
+            lines.append(
+                f"{s.chain:<24} {f'{s.position:02d} {s.name}':<48.48} {s.count:>9} {s.total_ns / 1e6:>10.2f} "
+                f"{100 * s.total_ns / grand_total_ns:>5.1f}% {s.mean_ns / 1e3:>9.2f} {s.percentile(50) / 1e3:>9.2f} "
+                f"{s.percentile(99) / 1e3:>9.2f} {s.max_ns / 1e3:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def print_report(self, file: TextIO | None = None) -> None:
+        """Print the report, to stderr by default so it does not get mixed with the log output on stdout."""
+        print(self.report(), file=file or sys.stderr)  # noqa: T201
+
+
+def enable_profiling(report_at_exit: bool = True) -> ProcessorProfiler:
+    """Start a new profiler, which setup() uses to wrap the processor chains it configures."""
+    global _profiler, _atexit_registered  # noqa: PLW0603
+
+    _profiler = ProcessorProfiler()
+
+    if report_at_exit and not _atexit_registered:
+        atexit.register(print_report)
+        _atexit_registered = True
+
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """Drop the active profiler, so nothing is reported for it; setup() does this when called without profiling."""
+    global _profiler  # noqa: PLW0603
+
+    _profiler = None
+
+
+def get_profiler() -> ProcessorProfiler | None:
+    """Return the active profiler, or None when profiling was not enabled in setup()."""
+    return _profiler
+
+
+def print_report(file: TextIO | None = None) -> None:
+    """Print the ranked timing report of the active profiler, if any."""
+    if _profiler is not None:
+        _profiler.print_report(file=file)
@@ -0,0 +1,308 @@
+"""Query json log files (as written with log_file_format='json'), using a sparse side index.
+
+The index of a log file `<name>` is stored next to it as `<name>.idx`. It divides the log file into blocks of whole
+lines, and stores per block its byte range, the lowest and highest timestamp and a bitmask of the levels it contains.
+Queries on time range or level only read the blocks which can contain matching lines, via a memory map of the log file.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import logging
+import mmap
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, NamedTuple
+
+import orjson
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'MHSI\x01'
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+_ENTRY = struct.Struct('<QQddI')
+
+# Bit in the level mask for lines of which the level could not be determined; such blocks match every level filter.
+UNKNOWN_LEVEL_BIT = 1
+
+
+class IndexEntry(NamedTuple):
+    """A block of whole lines in the log file."""
+
+    start: int
+    end: int
+    min_ts: float
+    max_ts: float
+    level_mask: int
+
+
+def index_path(log_file: str | Path) -> Path:
+    """Return the path of the index file belonging to a log file."""
+    log_file = Path(log_file)
+    return log_file.with_name(log_file.name + INDEX_SUFFIX)
+
+
+def level_number(level: object) -> int | None:
+    """Return the number of a level name (in any case), or None when it is not a known level."""
+    return logging._nameToLevel.get(str(level).upper())  # noqa: SLF001
+
+
+def level_bit(level: str | int | None) -> int:
+    """Return the bit in the level mask for a level name (in any case) or number."""
+    if isinstance(level, str):
+        level = level_number(level)
+    if not isinstance(level, int) or level <= 0:
+        return UNKNOWN_LEVEL_BIT
+    return 1 << min(level // 10, 31)
+
+
+def parse_timestamp(value: str) -> float | None:
+    """Parse an ISO timestamp, as added to the events by setup(), to seconds since the epoch."""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _scan_line(line: bytes) -> tuple[float | None, int]:
+    """Return the timestamp and the level bit of a json log line, from its top-level keys."""
+    # Parsed, since nested values (e.g. a logged dict) can have a timestamp or level key of their own.
+    try:
+        event_dict = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None, UNKNOWN_LEVEL_BIT
+    if not isinstance(event_dict, dict):
+        return None, UNKNOWN_LEVEL_BIT
+    timestamp = event_dict.get('timestamp')
+    level = event_dict.get('level') or event_dict.get('severity')
+    ts = parse_timestamp(timestamp) if isinstance(timestamp, str) else None
+    return ts, level_bit(str(level)) if level else UNKNOWN_LEVEL_BIT
+
+
+class BlockBuilder:
+    """Accumulate lines into index blocks."""
+
+    def __init__(self, start: int, block_size: int = DEFAULT_BLOCK_SIZE):  # noqa: D107
+        self.block_size = block_size
+        self._reset(start)
+
+    def _reset(self, start: int) -> None:
+        self.start = self.end = start
+        self.min_ts = float('inf')
+        self.max_ts = float('-inf')
+        self.level_mask = 0
+
+    def add(self, length: int, ts: float | None, bit: int) -> IndexEntry | None:
+        """Add a line of length bytes (including the newline); returns the block when it is full."""
+        self.end += length
+        if ts is not None:
+            self.min_ts = min(self.min_ts, ts)
+            self.max_ts = max(self.max_ts, ts)
+        else:
+            # Lines without a timestamp must not be excluded by a time range.
+            self.min_ts, self.max_ts = float('-inf'), float('inf')
+        self.level_mask |= bit
+
+        if self.end - self.start >= self.block_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> IndexEntry | None:
+        """Return the current (partial) block, if it contains any lines, and start a new one."""
+        if self.end == self.start:
+            return None
+        entry = IndexEntry(self.start, self.end, self.min_ts, self.max_ts, self.level_mask)
+        self._reset(self.end)
+        return entry
+
+
+def scan(data: bytes | mmap.mmap, start: int, end: int, block_size: int = DEFAULT_BLOCK_SIZE) -> list[IndexEntry]:
+    """Index the complete lines in data[start:end]; an incomplete last line (still being written) is left out."""
+    builder = BlockBuilder(start, block_size)
+    entries = []
+    pos = start
+    while pos < end:
+        newline = data.find(b'\n', pos, end)
+        if newline < 0:
+            break
+        entry = builder.add(newline + 1 - pos, *_scan_line(data[pos:newline]))
+        if entry is not None:
+            entries.append(entry)
+        pos = newline + 1
+    if (entry := builder.flush()) is not None:
+        entries.append(entry)
+    return entries
+
+
+def load_index(log_file: str | Path) -> list[IndexEntry]:
+    """Read the index of a log file, as far as it is consistent with the log file. Returns [] without an index."""
+    path = index_path(log_file)
+    try:
+        data = path.read_bytes()
+        size = Path(log_file).stat().st_size
+    except FileNotFoundError:
+        return []
+    if not data.startswith(INDEX_MAGIC):
+        return []
+
+    entries = []
+    previous_end = 0
+    body = data[len(INDEX_MAGIC) :]
+    for fields in _ENTRY.iter_unpack(body[: len(body) - len(body) % _ENTRY.size]):
+        entry = IndexEntry(*fields)
+        if entry.end > size:
+            # The log file was truncated or rotated; the rest of the index is stale.
+            break
+        if entry.start < previous_end:
+            # Overlapping entries, e.g. written both by the log handler and by an on demand update.
+            continue
+        if entry.start > previous_end:
+            # A gap which was not indexed; it matches every query.
+            entries.append(IndexEntry(previous_end, entry.start, float('-inf'), float('inf'), -1))
+        entries.append(entry)
+        previous_end = entry.end
+    return entries
+
+
+def append_index_entries(log_file: str | Path, entries: list[IndexEntry]) -> None:
+    """Append entries to the index of a log file, creating it when needed."""
+    path = index_path(log_file)
+    with path.open('ab') as f:
+        if f.tell() == 0:
+            f.write(INDEX_MAGIC)
+        f.write(b''.join(itertools.starmap(_ENTRY.pack, entries)))
+
+
+def build_index(log_file: str | Path, block_size: int = DEFAULT_BLOCK_SIZE) -> list[IndexEntry]:
+    """(Re)build the index of a log file from scratch."""
+    index_path(log_file).unlink(missing_ok=True)
+    entries = _index_tail(log_file, [], block_size)
+    append_index_entries(log_file, entries)
+    return entries
+
+
+def update_index(log_file: str | Path, block_size: int = DEFAULT_BLOCK_SIZE, store: bool = True) -> list[IndexEntry]:
+    """Return the index of a log file, after indexing the part which was not indexed yet (and storing it with store)."""
+    entries = load_index(log_file)
+    tail = _index_tail(log_file, entries, block_size)
+    if tail and store:
+        append_index_entries(log_file, tail)
+    return entries + tail
+
+
+def _index_tail(log_file: str | Path, entries: list[IndexEntry], block_size: int) -> list[IndexEntry]:
+    """Return the entries for the part of the log file after the last indexed block."""
+    indexed = entries[-1].end if entries else 0
+    with Path(log_file).open('rb') as f, _mmap(f) as data:
+        return scan(data, indexed, len(data), block_size) if data is not None else []
+
+
+@contextlib.contextmanager
+def _mmap(f: BinaryIO) -> Iterator[mmap.mmap | None]:
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty file
+        yield None
+        return
+    try:
+        yield data
+    finally:
+        data.close()
+
+
+def _matches_logger(event_logger: object, logger: str) -> bool:
+    return isinstance(event_logger, str) and (event_logger == logger or event_logger.startswith(logger + '.'))
+
+
+def _matches_where(event_dict: dict, where: dict[str, str]) -> bool:
+    for key, expected in where.items():
+        if key not in event_dict:
+            return False
+        value = event_dict[key]
+        if (value if isinstance(value, str) else orjson.dumps(value).decode()) != expected:
+            return False
+    return True
+
+
+def query(  # noqa: C901, PLR0912
+    log_file: str | Path,
+    since: str | None = None,
+    until: str | None = None,
+    level: str | None = None,
+    logger: str | None = None,
+    where: dict[str, str] | None = None,
+    store_index: bool = True,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[bytes]:
+    """Return the lines of a json log file matching all given filters.
+
+    Args:
+        log_file: The json log file.
+        since: Only lines with a timestamp at or after this ISO timestamp.
+        until: Only lines with a timestamp before this ISO timestamp.
+        level: Only lines with at least this level (e.g. 'warning').
+        logger: Only lines of this logger or its children.
+        where: Only lines where these fields have these values (compared as strings, non-strings as json).
+        store_index: Store the index entries for the part of the log file which was not indexed yet.
+        block_size: Size of the index blocks when indexing.
+
+    Yields:
+        The matching lines, without the newline.
+    """
+    since_ts = parse_timestamp(since) if since else None
+    until_ts = parse_timestamp(until) if until else None
+    if (since and since_ts is None) or (until and until_ts is None):
+        raise ValueError('since and until must be ISO timestamps.')
+
+    level_mask = -1
+    min_level = 0
+    if level:
+        min_level = level_number(level)
+        if min_level is None:
+            raise ValueError(f'Unknown level {level}.')
+        level_mask = UNKNOWN_LEVEL_BIT | sum(1 << i for i in range(min(min_level // 10, 31), 32))
+
+    entries = update_index(log_file, block_size, store=store_index)
+
+    with Path(log_file).open('rb') as f, _mmap(f) as data:
+        if data is None:
+            return
+        for entry in entries:
+            if since_ts is not None and entry.max_ts < since_ts:
+                continue
+            if until_ts is not None and entry.min_ts >= until_ts:
+                continue
+            if not entry.level_mask & level_mask:
+                continue
+
+            for line in data[entry.start : entry.end].splitlines():
+                try:
+                    event_dict = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                if since_ts is not None or until_ts is not None:
+                    ts = parse_timestamp(event_dict.get('timestamp') or '')
+                    if (
+                        ts is None
+                        or (since_ts is not None and ts < since_ts)
+                        or (until_ts is not None and ts >= until_ts)
+                    ):
+                        continue
+                if min_level:
+                    # Lines without a (known) level don't have at least the level asked for.
+                    event_level = level_number(event_dict.get('level') or event_dict.get('severity'))
+                    if event_level is None or event_level < min_level:
+                        continue
+                if logger and not _matches_logger(event_dict.get('logger'), logger):
+                    continue
+                if where and not _matches_where(event_dict, where):
+                    continue
+                yield line
@@ -0,0 +1,184 @@
+"""Change or restore the logging configuration, without rebuilding it with setup().
+
+setup() runs dictConfig, which closes and recreates every handler and formatter. The functions in this module change
+the active configuration in place instead: snapshot_config() captures it (and restores it with restore(), or as a
+context manager), and the others make a single change to it.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+import structlog
+
+from . import config
+
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+
+class _LoggerState:
+    """The configurable attributes of a stdlib logger."""
+
+    __slots__ = ('disabled', 'filters', 'handlers', 'level', 'propagate')
+
+    def __init__(self, logger: logging.Logger):  # noqa: D107
+        self.level = logger.level
+        self.handlers = list(logger.handlers)
+        self.propagate = logger.propagate
+        self.disabled = logger.disabled
+        self.filters = list(logger.filters)
+
+    def apply(self, logger: logging.Logger) -> None:
+        logger.setLevel(self.level)
+        logger.handlers = list(self.handlers)
+        logger.propagate = self.propagate
+        logger.disabled = self.disabled
+        logger.filters = list(self.filters)
+
+
+def _loggers() -> dict[str, logging.Logger]:
+    """Return the root logger (under the name '') and all other existing loggers."""
+    return {
+        '': logging.getLogger(),
+        **{
+            name: logger
+            for name, logger in list(logging.Logger.manager.loggerDict.items())
+            if isinstance(logger, logging.Logger)
+        },
+    }
+
+
+class ConfigSnapshot:
+    """The active configuration of structlog and the stdlib loggers and handlers, as taken by snapshot_config()."""
+
+    def __init__(self):  # noqa: D107
+        self.structlog_configured = structlog.is_configured()
+        self.structlog_config = structlog.get_config()
+        self.structlog_config['processors'] = list(self.structlog_config['processors'])
+        self.loggers = {name: _LoggerState(logger) for name, logger in _loggers().items()}
+        handlers = {handler for state in self.loggers.values() for handler in state.handlers}
+        self.handlers = {handler: (handler.formatter, handler.level, list(handler.filters)) for handler in handlers}
+        self.open_handlers = [handler for handler in handlers if not getattr(handler, '_closed', False)]
+        self.selected_log_format = config.SELECTED_LOG_FORMAT
+        self.setup_arguments = config.LAST_SETUP_ARGUMENTS
+
+    def restore(self) -> None:
+        """Make the snapshotted configuration the active one again.
+
+        The snapshotted handlers are reattached as they are. When some of them were closed in the meantime (e.g.
+        because setup() was called again), the configuration is rebuilt with the snapshotted setup() arguments instead.
+        """
+        if self.setup_arguments is not None and any(
+            getattr(handler, '_closed', False) for handler in self.open_handlers
+        ):
+            structlog.reset_defaults()
+            config.setup(**self.setup_arguments)
+            return
+
+        if self.structlog_configured:
+            structlog.configure(**{**self.structlog_config, 'processors': list(self.structlog_config['processors'])})
+        else:
+            structlog.reset_defaults()
+
+        for name, logger in _loggers().items():
+            # Loggers created after the snapshot get the defaults of a new logger.
+            state = self.loggers.get(name)
+            if state is None:
+                logger.setLevel(logging.NOTSET)
+                logger.handlers = []
+                logger.propagate = True
+                logger.disabled = False
+                logger.filters = []
+            else:
+                state.apply(logger)
+
+        for handler, (formatter, level, filters) in self.handlers.items():
+            handler.setFormatter(formatter)
+            handler.setLevel(level)
+            handler.filters = list(filters)
+
+        config.SELECTED_LOG_FORMAT = self.selected_log_format
+        config.LAST_SETUP_ARGUMENTS = self.setup_arguments
+
+    def __enter__(self) -> ConfigSnapshot:  # noqa: PYI034
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.restore()
+
+
+def snapshot_config() -> ConfigSnapshot:
+    """Capture the active logging configuration, to restore it later.
+
+    Use it as a context manager to restore the configuration at the end of the block:
+
+        with snapshot_config():
+            set_logger_level('myapp', DEBUG)
+            ...
+    """
+    return ConfigSnapshot()
+
+
+def _handler_by_name(name: str) -> logging.Handler:
+    handler = logging._handlers.get(name)  # noqa: SLF001
+    if handler is None:
+        raise config.StructlogLoggingConfigExceptionError(f"There is no handler with the name {name}.")
+    return handler
+
+
+def add_handler(handler: logging.Handler, logger_name: str = '', name: str | None = None) -> logging.Handler:
+    """Attach a handler to a logger (the root logger by default).
+
+    A handler without a formatter gets the formatter of the stdout output. With a name, the handler can be removed
+    (or replaced) by name later on.
+    """
+    if handler.formatter is None:
+        stdout = logging._handlers.get('mh_structlog_stdout')  # noqa: SLF001
+        if stdout is not None:
+            handler.setFormatter(stdout.formatter)
+    if name is not None:
+        handler.set_name(name)
+    logging.getLogger(logger_name or None).addHandler(handler)
+    return handler
+
+
+def remove_handler(handler: logging.Handler | str, logger_name: str | None = None, close: bool = True) -> None:
+    """Detach a handler (or the handler with this name, e.g. 'mh_structlog_file') and close it.
+
+    It is detached from all loggers, or only from the logger with logger_name ('' for the root logger).
+    """
+    if isinstance(handler, str):
+        handler = _handler_by_name(handler)
+    loggers = _loggers().values() if logger_name is None else [logging.getLogger(logger_name or None)]
+    for logger in loggers:
+        logger.removeHandler(handler)
+    if close:
+        handler.close()
+
+
+def set_logger_level(logger_name: str, level: int | str) -> None:
+    """Change the level of a single logger (the root logger for '')."""
+    logging.getLogger(logger_name or None).setLevel(level)
+
+
+def set_log_format(log_format: str) -> None:
+    """Switch the stdout output to another log format, keeping the existing handlers.
+
+    The structlog processors and the formatters are rebuilt as setup() would with this log format, but the handlers
+    are not recreated: they only get their new formatters.
+    """
+    if config.LAST_SETUP_ARGUMENTS is None:
+        raise config.StructlogLoggingConfigExceptionError(
+            "setup() has to be called before the log format can be changed."
+        )
+
+    token = config._replace_formatters_only.set(True)  # noqa: SLF001
+    try:
+        config.setup(**{**config.LAST_SETUP_ARGUMENTS, 'log_format': log_format})
+    finally:
+        config._replace_formatters_only.reset(token)  # noqa: SLF001
@@ -0,0 +1,72 @@
+"""Route log events to outputs based on their level and logger name, as configured with setup(routes=[...]).
+
+Every route gets its own handler, with a RouteFilter which lets through only the events routed to it. The routes are
+evaluated in order: an event goes to the first route it matches, unless that route is marked to 'continue', in which
+case the following routes are tried as well. Which routes an event of a logger and level goes to is cached, so the
+filters of all routes together cost a few dict lookups per event. Events which match no route are not formatted by any
+of the route handlers.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+from typing import NamedTuple
+
+
+class Route(NamedTuple):
+    """The matching rules of a route."""
+
+    name: str
+    level: int = logging.NOTSET
+    max_level: int | None = None
+    loggers: tuple[str, ...] = ()
+    continue_: bool = False
+
+    def matches(self, logger_name: str, levelno: int) -> bool:
+        """Return whether events of this logger and level match the route."""
+        if levelno < self.level or (self.max_level is not None and levelno > self.max_level):
+            return False
+        return not self.loggers or any(
+            logger_name == prefix or logger_name.startswith(prefix + '.') for prefix in self.loggers
+        )
+
+
+class Router:
+    """Decides which routes an event goes to, cached per logger name and level."""
+
+    def __init__(self, routes: list[Route], max_cache_size: int = 10_000):  # noqa: D107
+        self.routes = routes
+        self.max_cache_size = max_cache_size
+        self._cache: dict[tuple[str, int], frozenset[str]] = {}
+
+    def routes_for(self, logger_name: str, levelno: int) -> frozenset[str]:
+        """Return the names of the routes events of this logger and level go to."""
+        key = (logger_name, levelno)
+        names = self._cache.get(key)
+        if names is None:
+            matched = []
+            for route in self.routes:
+                if route.matches(logger_name, levelno):
+                    matched.append(route.name)
+                    if not route.continue_:
+                        break
+            if len(self._cache) >= self.max_cache_size:
+                self._cache.clear()
+            names = self._cache[key] = frozenset(matched)
+        return names
+
+
+class RouteFilter(logging.Filter):
+    """Let through the records routed to a route, of which a fraction sample_rate is kept."""
+
+    def __init__(self, router: Router, route_name: str, sample_rate: float = 1.0):  # noqa: D107
+        super().__init__()
+        self.router = router
+        self.route_name = route_name
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: D102
+        if self.route_name not in self.router.routes_for(record.name, record.levelno):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate  # noqa: S311
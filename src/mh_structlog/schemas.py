@@ -0,0 +1,163 @@
+"""Declare event types with typed fields, for high-volume events with a fixed set of fields.
+
+    ACCESS_LOG = declare_event('request', method=str, status=int, latency_ms=float, user_id=int | None)
+
+    logger.info('request', method='GET', status=200, latency_ms=1.2, user_id=None)
+
+An event is of a declared type when its message is the name of the type. The fields of declared events of which the
+type is a plain scalar (str, int, float, bool or None) skip the generic processing of the values of the event dict. With
+setup(validate_event_schemas=True) (the default in testing mode), declared events are checked against their type and
+an EventSchemaError is raised on a missing field or a value of the wrong type; otherwise they are not checked at all.
+
+With slots=True, the type also gets a record class with __slots__, to keep events in memory without a dict per event
+and to log them as the event itself:
+
+    record = ACCESS_LOG.record(method='GET', status=200, latency_ms=1.2, user_id=None)
+    logger.info(record)
+
+Events which are not declared are processed as before.
+"""
+
+from __future__ import annotations
+
+import types
+import typing
+from typing import TYPE_CHECKING, Any, ClassVar
+
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from structlog.typing import EventDict
+
+
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+# Fields every event has when the schemas are applied, and which are always strings.
+_STANDARD_FIELDS = frozenset({'event', 'level', 'logger', 'timestamp'})
+
+_schemas: dict[str, EventSchema] = {}
+
+
+class EventSchemaError(TypeError):
+    """A declared event does not match its type."""
+
+
+def _allowed_types(field_type: Any) -> tuple[type, ...]:
+    """Return the types a field may have, for isinstance()."""
+    if field_type is None:
+        return (type(None),)
+    if isinstance(field_type, tuple):
+        return tuple(t for member in field_type for t in _allowed_types(member))
+    if isinstance(field_type, types.UnionType) or typing.get_origin(field_type) is typing.Union:
+        return _allowed_types(typing.get_args(field_type))
+    if isinstance(field_type, type):
+        return (field_type,)
+    raise EventSchemaError(f"{field_type!r} is not a type.")
+
+
+class EventRecord:
+    """Base class of the record classes of event types declared with slots=True."""
+
+    __slots__ = ()
+    schema: ClassVar[EventSchema]
+
+    def __init__(self, **fields: Any):  # noqa: D107
+        for name in self.__slots__:
+            if name not in fields:
+                raise TypeError(f"Missing field {name} for event {self.schema.name}.")
+            object.__setattr__(self, name, fields.pop(name))
+        if fields:
+            raise TypeError(f"Unknown fields for event {self.schema.name}: {', '.join(sorted(fields))}.")
+
+    def fields(self) -> dict[str, Any]:
+        """Return the fields of the record, in declared order."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.fields().items())
+        return f'{type(self).__name__}({fields})'
+
+
+class EventSchema:
+    """A declared event type: its name and the types of its fields."""
+
+    def __init__(self, name: str, fields: Mapping[str, Any], slots: bool = False):  # noqa: FBT001, FBT002, D107
+        self.name = name
+        self.fields = dict(fields)
+        self._allowed = {field: _allowed_types(field_type) for field, field_type in self.fields.items()}
+        # The fields which never need to be converted before rendering.
+        self.scalar_fields = _STANDARD_FIELDS | {
+            field for field, allowed in self._allowed.items() if _SCALAR_TYPES.issuperset(allowed)
+        }
+        self.record_type: type[EventRecord] | None = None
+        if slots:
+            self.record_type = type(
+                ''.join(part.capitalize() for part in name.replace('.', '_').split('_')) + 'Record',
+                (EventRecord,),
+                {'__slots__': tuple(self.fields), 'schema': self},
+            )
+
+    def validate(self, event_dict: EventDict) -> None:
+        """Raise an EventSchemaError when a field is missing or has a value of the wrong type."""
+        problems = []
+        for field, allowed in self._allowed.items():
+            value = event_dict.get(field)
+            if field not in event_dict and type(None) not in allowed:
+                problems.append(f"missing field {field}")
+            # bool is an int, but never meant as one.
+            elif not isinstance(value, allowed) or (type(value) is bool and bool not in allowed):
+                problems.append(f"field {field} should be {self.fields[field]!r}, not {type(value).__name__}")
+        if problems:
+            raise EventSchemaError(f"Event {self.name} does not match its declaration: {'; '.join(problems)}.")
+
+    def record(self, **fields: Any) -> EventRecord:
+        """Return a record of this event type; only for types declared with slots=True."""
+        if self.record_type is None:
+            raise TypeError(f"Event {self.name} was not declared with slots=True.")
+        return self.record_type(**fields)
+
+    def __repr__(self) -> str:
+        return f'EventSchema({self.name!r}, {self.fields!r})'
+
+
+def declare_event(name: str, *, slots: bool = False, **fields: Any) -> EventSchema:
+    """Declare (or redeclare) the event type with this name and these field types, and return it.
+
+    A field type is a class, a union (e.g. `int | None`) or a tuple of them.
+    """
+    schema = _schemas[name] = EventSchema(name, fields, slots=slots)
+    return schema
+
+
+def get_event_schema(name: object) -> EventSchema | None:
+    """Return the declared event type with this name, if any."""
+    return _schemas.get(name) if type(name) is str else None
+
+
+def clear_event_schemas() -> None:
+    """Forget all declared event types."""
+    _schemas.clear()
+
+
+class EventSchemaProcessor:
+    """Expand logged event records into the event dict, and validate declared events when asked to."""
+
+    def __init__(self, validate: bool = False):  # noqa: FBT001, FBT002, D107
+        self.validate = validate
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> EventDict:  # noqa: D102, ARG002
+        if not _schemas:
+            return event_dict
+        event = event_dict.get('event')
+        if isinstance(event, EventRecord):
+            schema = event.schema
+            event_dict['event'] = schema.name
+            event_dict.update(event.fields())
+        elif self.validate:
+            schema = get_event_schema(event)
+        else:
+            return event_dict
+
+        if self.validate and schema is not None:
+            schema.validate(event_dict)
+        return event_dict
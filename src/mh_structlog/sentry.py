@@ -1,20 +1,177 @@
-from structlog.typing import EventDict
+import contextlib
+import contextvars
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import sentry_sdk
+from sentry_sdk.consts import DEFAULT_MAX_BREADCRUMBS
+from sentry_sdk.scope import add_global_event_processor
+from sentry_sdk.utils import capture_internal_exceptions, datetime_from_isoformat
+from structlog.typing import EventDict, WrappedLogger
 from structlog_sentry import SentryProcessor as _SentryProcessor
 
+from .processors import Redactor
+
+
+class _RecordedBreadcrumbs:
+    """The breadcrumbs recorded in a context, as references to the event dicts they are made of."""
+
+    __slots__ = ('entries', 'scope')
+
+    def __init__(self, scope: sentry_sdk.Scope, max_size: int):
+        # The Sentry isolation scope (e.g. of a request) the breadcrumbs belong to.
+        self.scope = scope
+        self.entries: deque[tuple[SentryProcessor, EventDict]] = deque(maxlen=max_size)
+
+
+# The breadcrumbs of the most recently used isolation scopes in a context, most recent first; e.g. a thread handling
+# requests one after the other moves on to the scope of every next request, while a nested scope returns to its parent.
+_recorded_breadcrumbs: contextvars.ContextVar[tuple[_RecordedBreadcrumbs, ...]] = contextvars.ContextVar(
+    'mh_structlog_sentry_breadcrumbs', default=()
+)
+MAX_SCOPES_PER_CONTEXT = 4
+_event_processor_added = False
+
+
+def _find_recorded_breadcrumbs(
+    recorded: tuple[_RecordedBreadcrumbs, ...], scope: sentry_sdk.Scope
+) -> _RecordedBreadcrumbs | None:
+    for breadcrumbs in recorded:
+        if breadcrumbs.scope is scope:
+            return breadcrumbs
+    return None
+
+
+def _timestamp(crumb: dict) -> datetime:
+    timestamp = crumb.get('timestamp')
+    return datetime_from_isoformat(timestamp) if isinstance(timestamp, str) else timestamp
+
+
+def _add_recorded_breadcrumbs(event: dict, hint: dict) -> dict:  # noqa: ARG001
+    """Convert the breadcrumbs recorded in the current context into Sentry breadcrumbs, for an event being captured."""
+    if event.get('type') == 'transaction':
+        return event
+    recorded = _find_recorded_breadcrumbs(_recorded_breadcrumbs.get(), sentry_sdk.get_isolation_scope())
+    if recorded is None or not recorded.entries:
+        return event
+
+    with capture_internal_exceptions():
+        options = sentry_sdk.get_client().options
+        before_breadcrumb = options.get('before_breadcrumb')
+        crumbs = []
+        for processor, event_dict in list(recorded.entries):
+            crumb, crumb_hint = processor._get_breadcrumb_and_hint(event_dict)  # noqa: SLF001
+            if crumb.get('timestamp') is None:
+                crumb['timestamp'] = datetime.now(timezone.utc)
+            if before_breadcrumb is not None:
+                crumb = before_breadcrumb(crumb, crumb_hint)
+            if crumb is not None:
+                crumbs.append(crumb)
+
+        breadcrumbs = event.setdefault('breadcrumbs', {})
+        if isinstance(breadcrumbs, dict):
+            values = breadcrumbs.setdefault('values', [])
+            values.extend(crumbs)
+            with contextlib.suppress(TypeError, ValueError):
+                values.sort(key=_timestamp)
+            del values[: -options.get('max_breadcrumbs', DEFAULT_MAX_BREADCRUMBS) or len(values)]
+    return event
+
 
 class SentryProcessor(_SentryProcessor):
-    """The SentryProcessor but with some of our own defaults and slight customization applied."""
+    """The SentryProcessor but with some of our own defaults and slight customization applied.
+
+    Breadcrumbs are recorded as references to the (copied) event dicts, in a ring of at most breadcrumb_buffer_size
+    per context and Sentry isolation scope. They are only converted into Sentry breadcrumbs when an event is captured
+    in the same context, instead of on every log event. Pass lazy_breadcrumbs=False (or a scope) to add them to the
+    scope of Sentry right away instead.
+
+    With a redactor, Sentry only gets the redacted event data (setup() passes the one of its redaction_config).
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        lazy_breadcrumbs: bool = True,  # noqa: FBT001, FBT002
+        breadcrumb_buffer_size: int = DEFAULT_MAX_BREADCRUMBS,
+        redactor: Redactor | None = None,
+        **kwargs,
+    ):
+        global _event_processor_added  # noqa: PLW0603
 
-    def __init__(self, **kwargs):  # noqa: D107
+        # The base class keeps the copy of the event dict of the current call on the instance; per thread, see below.
+        self._local = threading.local()
         # Unless otherwise specified, add all extra attributes from the log to Sentry as tags.
         # Explicitly pass tag_keys=None to avoid this behaviour.
         if 'tag_keys' not in kwargs:
             kwargs['tag_keys'] = '__all__'
         super().__init__(**kwargs)
 
+        # The recorded breadcrumbs are looked up in the isolation scope, so not for an explicitly given scope.
+        self.lazy_breadcrumbs = lazy_breadcrumbs and self._scope is None
+        self.breadcrumb_buffer_size = breadcrumb_buffer_size
+        self.redactor = redactor
+        if self.lazy_breadcrumbs and not _event_processor_added:
+            add_global_event_processor(_add_recorded_breadcrumbs)
+            _event_processor_added = True
+
+    @property
+    def _original_event_dict(self) -> dict:
+        # The base class sets this in __call__ and reads it when building a Sentry event. As an attribute of the
+        # (shared) processor, another thread could replace it in between.
+        return getattr(self._local, 'original_event_dict', {})
+
+    @_original_event_dict.setter
+    def _original_event_dict(self, value: dict) -> None:
+        self._local.original_event_dict = value
+
+    def __call__(self, logger: WrappedLogger, name: str, event_dict: EventDict) -> EventDict:  # noqa: ARG002
+        """Like the base class, but with the copy of the event dict passed on to the breadcrumb explicitly."""
+        original_event_dict = dict(event_dict)
+        if self.redactor is not None:
+            # Redacts the copy in place; also the tags and breadcrumbs are made from it.
+            self.redactor(logger, name, original_event_dict)
+        self._original_event_dict = original_event_dict
+        sentry_skip = event_dict.pop("sentry_skip", False)
+
+        if self.active and not sentry_skip and self._can_record(logger, event_dict):
+            level = self._get_level_value(event_dict["level"].upper())
+
+            if level >= self.event_level:
+                self._handle_event(event_dict)
+
+            if level >= self.level:
+                if self.lazy_breadcrumbs:
+                    self._record_breadcrumb(original_event_dict)
+                else:
+                    self._handle_breadcrumb(event_dict if self.redactor is None else original_event_dict)
+
+        if self.verbose:
+            event_dict.setdefault("sentry", "skipped")
+
+        return event_dict
+
+    def _record_breadcrumb(self, original_event_dict: EventDict) -> None:
+        """Add (a copy of) the event dict to the breadcrumbs of the current context and isolation scope."""
+
+        scope = sentry_sdk.get_isolation_scope()
+        all_recorded = _recorded_breadcrumbs.get()
+        # Nearly always the first one.
+        recorded = all_recorded[0] if all_recorded and all_recorded[0].scope is scope else None
+        if recorded is None:
+            recorded = _find_recorded_breadcrumbs(all_recorded, scope) or _RecordedBreadcrumbs(
+                scope, self.breadcrumb_buffer_size
+            )
+            others = tuple(r for r in all_recorded if r is not recorded)
+            _recorded_breadcrumbs.set((recorded, *others[: MAX_SCOPES_PER_CONTEXT - 1]))
+        # The copy of the event dict which is made anyway, and which is not changed by later processors.
+        recorded.entries.append((self, original_event_dict))
+
     def _get_event_and_hint(self, event_dict: EventDict) -> tuple[dict, dict]:
         """Filter out tag_keys which are not primitive types, because Sentry gives an error otherwise."""
 
+        if self.redactor is not None:
+            event_dict = self.redactor(None, '', dict(event_dict))
         event, hint = super()._get_event_and_hint(event_dict)
 
         if 'tags' in event:
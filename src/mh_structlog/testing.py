@@ -0,0 +1,130 @@
+"""Capture log events in memory, for assertions in test suites.
+
+With setup(capture=CapturedLogs()), the stdout handler is replaced by one which runs the same processors as the
+selected log format, up to (but without) the renderer, and appends the resulting event dicts to the CapturedLogs list.
+Nothing is rendered or written.
+
+For pytest, load this module as a plugin (`pytest_plugins = ['mh_structlog.testing']` in your conftest.py) and use the
+`captured_logs` fixture. Arguments for setup() can be passed with the `mh_structlog_setup` marker:
+
+    @pytest.mark.mh_structlog_setup(log_format='gcp_json')
+    def test_something(captured_logs):
+        ...
+        assert captured_logs.filter(level='error', logger='myapp.payments', order_id=1).messages == ['payment failed']
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import UserList
+from typing import TYPE_CHECKING, Any
+
+from .processors import expand_static_fields
+
+
+try:
+    import pytest
+except ImportError:
+    pytest = None  # ty:ignore[invalid-assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, MutableSequence
+
+    from structlog.typing import EventDict
+
+
+class CapturedLogs(UserList):
+    """A list of captured event dicts, with helpers to select events."""
+
+    def filter(self, level: str | None = None, logger: str | None = None, **fields: Any) -> CapturedLogs:
+        """Return the events with at least this level, of this logger (or its children) and with these field values."""
+        min_level = logging._nameToLevel.get(level.upper()) if level else 0  # noqa: SLF001
+        if min_level is None:
+            raise ValueError(f'Unknown level {level}.')
+        return CapturedLogs(
+            event_dict
+            for event_dict in self
+            if (not min_level or _level(event_dict) >= min_level)
+            and (logger is None or _is_logger_or_child(event_dict.get('logger'), logger))
+            and all(key in event_dict and event_dict[key] == value for key, value in fields.items())
+        )
+
+    def by_level(self, level: str) -> CapturedLogs:
+        """Return the events with exactly this level."""
+        return CapturedLogs(event_dict for event_dict in self if _level_name(event_dict) == level.lower())
+
+    def by_logger(self, logger: str) -> CapturedLogs:
+        """Return the events of this logger or its children."""
+        return self.filter(logger=logger)
+
+    def with_fields(self, **fields: Any) -> CapturedLogs:
+        """Return the events with these field values."""
+        return self.filter(**fields)
+
+    @property
+    def messages(self) -> list[str]:
+        """The messages of the events."""
+        return [event_dict.get('message', event_dict.get('event')) for event_dict in self]
+
+
+def _level_name(event_dict: EventDict) -> str:
+    # gcp_json renames the level to severity, aws_json uppercases it.
+    return str(event_dict.get('level') or event_dict.get('severity') or '').lower()
+
+
+def _level(event_dict: EventDict) -> int:
+    return logging._nameToLevel.get(_level_name(event_dict).upper(), 0)  # noqa: SLF001
+
+
+def _is_logger_or_child(event_logger: object, logger: str) -> bool:
+    return isinstance(event_logger, str) and (event_logger == logger or event_logger.startswith(logger + '.'))
+
+
+class CaptureRenderer:
+    """Replace the renderer of a formatter chain: store the event dict, instead of rendering it."""
+
+    def __init__(self, captured: MutableSequence):  # noqa: D107
+        self.captured = captured
+
+    def __call__(self, logger: object, name: str, event_dict: EventDict) -> str:  # noqa: D102, ARG002
+        self.captured.append(expand_static_fields(None, None, event_dict))
+        return ''
+
+
+class CaptureHandler(logging.Handler):
+    """A handler which only runs its formatter (ending in a CaptureRenderer), without writing anything."""
+
+    def emit(self, record: logging.LogRecord) -> None:  # noqa: D102
+        try:
+            self.format(record)
+        except RecursionError:
+            raise
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+
+if pytest is not None:
+
+    def pytest_configure(config: pytest.Config) -> None:
+        """Register the marker to pass setup() options to the captured_logs fixture."""
+        config.addinivalue_line(
+            'markers', 'mh_structlog_setup(**options): arguments for setup() in the captured_logs fixture'
+        )
+
+    @pytest.fixture
+    def captured_logs(request: pytest.FixtureRequest) -> Iterator[CapturedLogs]:
+        """Configure logging to capture the events of the test in memory (json log format, unless set by the marker).
+
+        Yields:
+            The list of captured event dicts.
+        """
+        from structlog.contextvars import clear_contextvars  # noqa: PLC0415
+
+        from .config import setup  # noqa: PLC0415
+
+        marker = request.node.get_closest_marker('mh_structlog_setup')
+        captured = CapturedLogs()
+        clear_contextvars()
+        setup(**{'log_format': 'json', **(marker.kwargs if marker else {}), 'testing_mode': True, 'capture': captured})
+        yield captured
@@ -0,0 +1,217 @@
+"""Measure how long a block of code or a function takes, and log it as a span.
+
+    with timed('load orders', customer_id=12):
+        ...
+
+    @timed(threshold_ms=100)
+    async def handle(request):
+        ...
+
+Each span gets an id, and the id of the span it runs in (if any) as its parent, so nested spans can be put together.
+One event is logged per span, when it ends, with its duration in duration_ms. When the level of the event is not
+enabled for the logger (or below the global_filter_level of setup()), or the span is sampled out, nothing is measured or
+logged. A Timed object can be shared, e.g. by threads or nested: the state of its spans is kept per context.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import logging
+import random
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import TracebackType
+
+
+# The id of the span the current context (thread / asyncio task) is in.
+_current_span_id: contextvars.ContextVar[str | None] = contextvars.ContextVar('mh_structlog_span_id', default=None)
+# The spans opened with `with` (or `async with`) in the current context and not yet closed, innermost last.
+_open_spans: contextvars.ContextVar[tuple[tuple[Timed, tuple | None], ...]] = contextvars.ContextVar(
+    'mh_structlog_open_spans', default=()
+)
+# Events below this level are dropped by structlog (setup()'s global_filter_level), so their spans are not measured.
+_global_filter_level = logging.NOTSET
+
+
+# logging.getLogger() takes a lock, while the loggers (and their level caches) live as long as the process anyway.
+_stdlib_loggers: dict[str | None, logging.Logger] = {}
+
+
+def get_current_span_id() -> str | None:
+    """Return the id of the span the current code runs in, if any."""
+    return _current_span_id.get()
+
+
+def set_global_filter_level(level: int | None) -> None:
+    """Skip the spans below this level (None for all levels), as done by setup() for its global_filter_level."""
+    global _global_filter_level  # noqa: PLW0603
+    _global_filter_level = logging.NOTSET if level is None else level
+
+
+class Timed:
+    """A context manager and decorator which logs the duration of a span; see timed()."""
+
+    __slots__ = ('_logger', '_stdlib_logger', 'event', 'fields', 'level', 'logger_name', 'sample_rate', 'threshold_ns')
+
+    def __init__(  # noqa: PLR0913
+        self,
+        event: str | None = None,
+        *,
+        logger: str | None = None,
+        level: int = logging.INFO,
+        threshold_ms: float | None = None,
+        sample_rate: float = 1.0,
+        **fields: Any,
+    ):
+        """Configure the span; see timed() for the arguments."""
+        self.event = event
+        self.logger_name = logger
+        self.level = level
+        self.threshold_ns = None if threshold_ms is None else int(threshold_ms * 1_000_000)
+        self.sample_rate = sample_rate
+        self.fields = fields
+        self._stdlib_logger: logging.Logger | None = None
+        self._logger: Any = None
+
+    def _start(self) -> tuple | None:
+        """Start a span; return its state, or None when it is not going to be logged."""
+        if self.level < _global_filter_level:
+            return None
+        stdlib_logger = self._stdlib_logger
+        if stdlib_logger is None:
+            stdlib_logger = _stdlib_loggers.get(self.logger_name)
+            if stdlib_logger is None:
+                stdlib_logger = _stdlib_loggers[self.logger_name] = logging.getLogger(self.logger_name)
+            self._stdlib_logger = stdlib_logger
+        if not stdlib_logger.isEnabledFor(self.level):
+            return None
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:  # noqa: S311
+            return None
+        span_id = f'{random.getrandbits(64):016x}'
+        parent_id = _current_span_id.get()
+        _current_span_id.set(span_id)
+        return span_id, parent_id, time.perf_counter_ns()
+
+    def _stop(self, state: tuple | None, exc_type: type[BaseException] | None) -> None:
+        """End the span, and log it when it took at least the threshold."""
+        if state is None:
+            return
+        duration_ns = time.perf_counter_ns() - state[2]
+        span_id, parent_id, _ = state
+        _current_span_id.set(parent_id)
+        if self.threshold_ns is not None and duration_ns < self.threshold_ns:
+            return
+
+        fields = {'duration_ms': duration_ns / 1_000_000, 'span_id': span_id, **self.fields}
+        if parent_id is not None:
+            fields['parent_span_id'] = parent_id
+        if exc_type is not None:
+            fields['error'] = exc_type.__name__
+        if self._logger is None:
+            self._logger = structlog.get_logger(self.logger_name)
+        self._logger.log(self.level, self.event, **fields)
+
+    def __enter__(self) -> Timed:  # noqa: PYI034
+        if self.event is None:
+            raise TypeError("timed() needs an event (the message to log) when used as a context manager.")
+        _open_spans.set((*_open_spans.get(), (self, self._start())))
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        open_spans = _open_spans.get()
+        # The innermost span of this object; nearly always the last one.
+        for i in range(len(open_spans) - 1, -1, -1):
+            if open_spans[i][0] is self:
+                _open_spans.set(open_spans[:i] + open_spans[i + 1 :])
+                self._stop(open_spans[i][1], exc_type)
+                return
+
+    async def __aenter__(self) -> Timed:  # noqa: PYI034
+        return self.__enter__()
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.__exit__(exc_type, exc, traceback)
+
+    def __call__(self, func: Callable) -> Callable:
+        """Decorate a (sync or async) function, to log a span per call."""
+        # A Timed of its own per function, so one Timed can decorate several functions, each logging under its own name.
+        span = Timed(
+            func.__qualname__ if self.event is None else self.event,
+            logger=func.__module__ if self.logger_name is None else self.logger_name,
+            level=self.level,
+            sample_rate=self.sample_rate,
+            **self.fields,
+        )
+        span.threshold_ns = self.threshold_ns
+
+        # The state of a span is kept per call, so the decorated function can run concurrently.
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                state = span._start()  # noqa: SLF001
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    span._stop(state, type(e))  # noqa: SLF001
+                    raise
+                span._stop(state, None)  # noqa: SLF001
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            state = span._start()  # noqa: SLF001
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                span._stop(state, type(e))  # noqa: SLF001
+                raise
+            span._stop(state, None)  # noqa: SLF001
+            return result
+
+        return wrapper
+
+
+def timed(
+    event: str | Callable | None = None,
+    *,
+    logger: str | None = None,
+    level: int = logging.INFO,
+    threshold_ms: float | None = None,
+    sample_rate: float = 1.0,
+    **fields: Any,
+) -> Any:
+    """Log the duration of a block (as a context manager, also `async with`) or of every call of a function.
+
+    Args:
+        event: The message of the event; required as a context manager, the qualified name of the function by default
+            when decorating.
+        logger: The name of the logger; by default the module of the function, or of the code using timed().
+        level: The level of the event. Spans of which the level is not enabled for the logger are not measured at all.
+        threshold_ms: Only log spans which took at least this many milliseconds.
+        sample_rate: The fraction of the spans which is measured and logged.
+        fields: Additional fields for the event.
+
+    Returns:
+        The Timed context manager / decorator, or the decorated function when used as `@timed` without arguments.
+    """
+    if callable(event):
+        return Timed(logger=logger, level=level, threshold_ms=threshold_ms, sample_rate=sample_rate, **fields)(event)
+    if logger is None and event is not None:
+        logger = sys._getframe(1).f_globals.get('__name__')  # noqa: SLF001
+    return Timed(event, logger=logger, level=level, threshold_ms=threshold_ms, sample_rate=sample_rate, **fields)
@@ -8,6 +8,9 @@ from django.test.utils import setup_test_environment
 from structlog.contextvars import clear_contextvars
 
 
+pytest_plugins = ['mh_structlog.testing']
+
+
 @pytest.fixture(scope='session')
 def lock(tmp_path_factory):
     base_temp = tmp_path_factory.getbasetemp()
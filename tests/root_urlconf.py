@@ -1,9 +1,51 @@
+import structlog
 from django.http import HttpResponse
 from django.urls import path
+from django.utils.functional import SimpleLazyObject
+
+
+# The number of times a user was loaded by lazy_user_middleware, which stands in for the session and user queries.
+user_loads = []
+
+
+class User:
+    id = 42
+
+
+def lazy_user_middleware(get_response):
+    """Set a lazy request.user, like the AuthenticationMiddleware of Django."""
+
+    def load_user():
+        user_loads.append(1)
+        return User()
+
+    def middleware(request):
+        request.user = SimpleLazyObject(load_user)
+        return get_response(request)
+
+    return middleware
 
 
 def my_view(request):
     return HttpResponse("Hello, world!")
 
 
-urlpatterns = [path("", my_view, name="main-view")]
+def logging_view(request):
+    logger = structlog.getLogger("myapp.views")
+    logger.debug("loading order", order_id=1)
+    logger.info("order loaded", order_id=2, customer="acme")
+    logger.warning("stock is low", sku="abc")
+    logger.error("payment failed", provider="bank")
+    logger.error("retry failed")
+    return HttpResponse("Hello, world!")
+
+
+def user_view(request):
+    return HttpResponse(f"Hello, {request.user.id}!")
+
+
+urlpatterns = [
+    path("", my_view, name="main-view"),
+    path("logging", logging_view, name="logging-view"),
+    path("user", user_view, name="user-view"),
+]
@@ -1,9 +1,17 @@
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
 from unittest.mock import Mock
 
+import orjson
+import pytest
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from structlog.contextvars import clear_contextvars, get_contextvars
 
-from mh_structlog.aws import _reset_cold_start_flag, bind_lambda_context
+from mh_structlog import get_logger, setup
+from mh_structlog.aws import _reset_cold_start_flag, bind_lambda_context, buffered_lambda_handler, buffered_output
+
+from .utils import capture_output
 
 
 def test_bind_lambda_context_non_empty():
@@ -58,3 +66,125 @@ def test_bind_lambda_context_cold_start():
 
     bind_lambda_context(mock_lambda_context)
     assert not get_contextvars()['cold_start']
+
+
+def _lambda_context(remaining_ms=60_000):
+    mock_lambda_context = Mock(spec=LambdaContext)
+    mock_lambda_context.function_name = "test_function"
+    mock_lambda_context.memory_limit_in_mb = 128
+    mock_lambda_context.invoked_function_arn = "arn:aws:lambda:region:account-id:function:test_function"
+    mock_lambda_context.aws_request_id = "1234-5678"
+    mock_lambda_context.get_remaining_time_in_millis.return_value = remaining_ms
+    return mock_lambda_context
+
+
+class CountingStream(StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def test_buffered_lambda_handler_writes_once_on_return():
+    stream = CountingStream()
+    written_during_invocation = []
+
+    @buffered_lambda_handler
+    def handler(event, lambda_context):
+        get_logger('test_lambda').info('first', payload=event)
+        get_logger('test_lambda').info('second')
+        written_during_invocation.append(stream.getvalue())
+        return 'done'
+
+    with redirect_stdout(stream):
+        setup(log_format='json', testing_mode=True)
+        stream.writes = 0
+        assert handler('payload', _lambda_context()) == 'done'
+
+    assert written_during_invocation == ['']
+    assert stream.writes == 1
+    lines = [orjson.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['message'] for line in lines] == ['first', 'second']
+    assert lines[0]['function_request_id'] == '1234-5678'
+
+
+def test_buffered_lambda_handler_writes_on_raise():
+    @buffered_lambda_handler()
+    def handler(event, lambda_context):
+        get_logger('test_lambda').info('before the error')
+        raise ValueError('boom')
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True)
+        with pytest.raises(ValueError, match='boom'):
+            handler({}, _lambda_context())
+
+    assert orjson.loads(out.getvalue())['message'] == 'before the error'
+
+
+def test_buffered_lambda_handler_writes_early_on_size():
+    written_during_invocation = []
+
+    @buffered_lambda_handler(max_buffer_size=1)
+    def handler(event, lambda_context):
+        get_logger('test_lambda').info('big enough')
+        written_during_invocation.append(sys.stdout.getvalue())
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True)
+        handler({}, _lambda_context())
+
+    assert orjson.loads(written_during_invocation[0])['message'] == 'big enough'
+    assert orjson.loads(out.getvalue())['message'] == 'big enough'
+
+
+def test_buffered_lambda_handler_stops_buffering_close_to_the_timeout():
+    written_during_invocation = []
+
+    @buffered_lambda_handler(min_remaining_time_ms=1000)
+    def handler(event, lambda_context):
+        get_logger('test_lambda').info('first')
+        get_logger('test_lambda').info('second')
+        written_during_invocation.append(sys.stdout.getvalue())
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True)
+        handler({}, _lambda_context(remaining_ms=500))
+
+    assert [orjson.loads(line)['message'] for line in written_during_invocation[0].splitlines()] == ['first', 'second']
+    assert written_during_invocation[0] == out.getvalue()
+
+
+def test_buffered_output_without_stream_handler():
+    captured = []
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, capture=captured)
+        with buffered_output():
+            get_logger('test_lambda').info('hey')
+
+    assert not out.getvalue()
+    assert [event['message'] for event in captured] == ['hey']
+
+
+def test_buffered_lambda_handler_flushes_metrics():
+    from mh_structlog import metrics  # noqa: PLC0415
+
+    @buffered_lambda_handler
+    def handler(event, lambda_context):
+        get_logger('test_lambda').info('request', status=200)
+
+    with capture_output() as (out, _err):
+        setup(
+            log_format='aws_json', testing_mode=True, metrics_config={'counters': ['status'], 'drop_aggregated': True}
+        )
+        try:
+            handler({}, _lambda_context())
+        finally:
+            metrics._aggregator = None
+
+    (line,) = [orjson.loads(line) for line in out.getvalue().splitlines()]
+    assert line['status'] == 1
+    assert line['_aws']['CloudWatchMetrics'][0]['Metrics'] == [{'Name': 'status', 'Unit': 'Count'}]
@@ -0,0 +1,80 @@
+import io
+import logging
+
+import orjson
+from freezegun import freeze_time
+from structlog import reset_defaults
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog import ERROR, filter_named_logger, get_logger, setup
+from mh_structlog.binary import BinaryRenderer, convert_to_json, iter_records
+from mh_structlog.cli import main
+
+from .utils import capture_output
+
+
+@freeze_time("2025-12-11 12:01:02")
+def test_logging_file_binary(tmp_path):
+    reset_defaults()
+    clear_contextvars()
+
+    log_file = tmp_path / 'logs.bin'
+
+    with capture_output() as (_out, _err):
+        setup(
+            log_format="console",
+            log_file=log_file,
+            log_file_format="binary",
+            testing_mode=True,
+            logging_configs=[filter_named_logger("asyncio", ERROR)],
+            timestamp_ms_precision=False,
+        )
+        logger = get_logger("test_logger_file")
+
+        logger.info("File Info log message", keyA="valueA", keyB=100)
+        logger.error("File Error log message", keyC="valueC", keyD=200)
+        logger.error("File Error log message", keyC="valueC", keyD=300)
+        logging.getLogger("test_logger_stdlib").warning("Stdlib message with ünïcödé")
+
+    output = io.BytesIO()
+    with log_file.open('rb') as f:
+        assert convert_to_json(f, output) == 4
+
+    assert output.getvalue().splitlines() == [
+        b'{"keyA":"valueA","keyB":100,"logger":"test_logger_file","level":"info","timestamp":"2025-12-11T12:01:02Z","message":"File Info log message"}',
+        b'{"keyC":"valueC","keyD":200,"logger":"test_logger_file","level":"error","timestamp":"2025-12-11T12:01:02Z","message":"File Error log message"}',
+        b'{"keyC":"valueC","keyD":300,"logger":"test_logger_file","level":"error","timestamp":"2025-12-11T12:01:02Z","message":"File Error log message"}',
+        '{"logger":"test_logger_stdlib","level":"warning","timestamp":"2025-12-11T12:01:02Z","message":"Stdlib message with ünïcödé"}'.encode(),
+    ]
+
+
+def test_binary_renderer_interns_shapes():
+    renderer = BinaryRenderer()
+
+    first = renderer(None, 'info', {'logger': 'my.logger', 'level': 'info', 'message': 'first', 'n': 1})
+    second = renderer(None, 'info', {'logger': 'my.logger', 'level': 'info', 'message': 'second', 'n': 2})
+
+    # The second record only contains the shape id and the values that are not interned.
+    assert b'my.logger' in first.encode('latin-1')
+    assert b'my.logger' not in second.encode('latin-1')
+    assert len(second) < len(first)
+
+    # A new writer session (e.g. after a restart, appending to the same file) starts a new shape table.
+    third = BinaryRenderer()(None, 'info', {'logger': 'other', 'level': 'info', 'message': 'third'})
+
+    records = list(iter_records(io.BytesIO((first + second + third).encode('latin-1'))))
+    assert records == [
+        {'logger': 'my.logger', 'level': 'info', 'message': 'first', 'n': 1},
+        {'logger': 'my.logger', 'level': 'info', 'message': 'second', 'n': 2},
+        {'logger': 'other', 'level': 'info', 'message': 'third'},
+    ]
+
+
+def test_cli_convert(tmp_path):
+    renderer = BinaryRenderer()
+    log_file = tmp_path / 'logs.bin'
+    log_file.write_bytes(renderer(None, 'info', {'message': 'hey', 'level': 'info'}).encode('latin-1'))
+
+    assert main(['convert', str(log_file), '-o', str(tmp_path / 'logs.json')]) == 0
+
+    assert orjson.loads((tmp_path / 'logs.json').read_bytes()) == {'message': 'hey', 'level': 'info'}
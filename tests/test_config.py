@@ -1,7 +1,12 @@
+import logging
+import re
+import subprocess  # noqa: S404
+import sys
+
 import orjson
 from freezegun import freeze_time
 from structlog import reset_defaults
-from structlog.contextvars import clear_contextvars
+from structlog.contextvars import bind_contextvars, clear_contextvars
 from structlog.testing import capture_logs
 
 import mh_structlog
@@ -100,3 +105,178 @@ def test_setup_with_source_location():
         'timestamp': '2025-12-11T12:01:02Z',
         'func_name': 'test_setup_with_source_location',
     }
+
+
+@freeze_time("2025-12-11 12:01:02")
+def test_setup_with_compact_source_location():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', include_source_location='location')
+        mh_structlog.get_logger().info("Test log message")
+        logging.getLogger('stdlib').warning("Stdlib message")
+
+    structlog_data, stdlib_data = (orjson.loads(line) for line in out.getvalue().splitlines())
+
+    assert re.fullmatch(
+        r'.*/tests/test_config\.py:\d+\(test_setup_with_compact_source_location\)', structlog_data['location']
+    )
+    assert re.fullmatch(
+        r'.*/tests/test_config\.py:\d+\(test_setup_with_compact_source_location\)', stdlib_data['location']
+    )
+    assert 'pathname' not in structlog_data
+
+
+def test_setup_with_redaction_config():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', redaction_config={'value_patterns': ['email']})
+        mh_structlog.get_logger().info("mail for bob@example.com", token='abc', user={'password': 'x', 'id': 1})  # noqa: S106
+        logging.getLogger('stdlib').info("stdlib", extra={'api_key': 'abc'})
+
+    structlog_data, stdlib_data = (orjson.loads(line) for line in out.getvalue().splitlines())
+
+    assert structlog_data['message'] == 'mail for [REDACTED]'
+    assert structlog_data['token'] == '[REDACTED]'
+    assert structlog_data['user'] == {'password': '[REDACTED]', 'id': 1}
+    assert stdlib_data['api_key'] == '[REDACTED]'
+
+
+def test_setup_with_field_size_limits():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', field_size_limits={'max_string_length': 50})
+        mh_structlog.get_logger().info("Test log message", body="a" * 100)
+
+    data = orjson.loads(out.getvalue())
+
+    assert data['body'] == 'a' * 50 + '...'
+    assert data['truncated_fields'] == ['body']
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', field_size_limits={'active': False, 'max_string_length': 50})
+        mh_structlog.get_logger().info("Test log message", body="a" * 100)
+
+    assert orjson.loads(out.getvalue())['body'] == 'a' * 100
+
+
+def test_setup_with_field_size_limits_and_pre_serialized_fields():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(
+            testing_mode=True,
+            log_format='json',
+            additional_processors=[FieldsAdder({'service': 's' * 80}, pre_serialize=True)],
+            field_size_limits={'max_event_bytes': 100},
+        )
+        mh_structlog.get_logger().info("Test log message", body="a" * 40)
+
+    data = orjson.loads(out.getvalue())
+
+    # The static fields are kept, and count towards the size of the event.
+    assert data['service'] == 's' * 80
+    assert data['body'].startswith('<truncated')
+    assert 'body' in data['truncated_fields']
+
+
+@freeze_time("2025-12-11 12:01:02")
+def test_setup_with_pre_serialized_static_fields():
+    reset_defaults()
+    clear_contextvars()
+
+    for log_format in ['json', 'console']:
+        with capture_output() as (out, _err):
+            setup(
+                testing_mode=True,
+                log_format=log_format,
+                additional_processors=[FieldsAdder(data={"service": "my-service"}, pre_serialize=True)],
+                pre_serialize_contextvars=True,
+            )
+            bind_contextvars(request_id='abc')
+            mh_structlog.get_logger().info("Test log message", key1="value1")
+
+        if log_format == 'json':
+            data = orjson.loads(out.getvalue())
+            assert data['service'] == 'my-service'
+            assert data['request_id'] == 'abc'
+            assert data['key1'] == 'value1'
+        else:
+            data = re.sub(r'\x1b\[(;?[0-9]{1,3})+[mGK]', '', out.getvalue())  # Remove ANSI color codes for testing
+            assert 'service=my-service' in data
+            assert 'request_id=abc' in data
+            assert '_static_fields' not in data
+
+
+def test_setup_does_not_import_optional_modules():
+    code = "import sys, mh_structlog; mh_structlog.setup(log_format='aws_json'); print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    imported = set(result.stdout.split())
+
+    for module in [
+        'pytest',
+        'pydantic',
+        'sentry_sdk',
+        'mh_structlog.binary',
+        'mh_structlog.handlers',
+        'mh_structlog.metrics',
+        'mh_structlog.otlp',
+        'mh_structlog.profiling',
+        'mh_structlog.testing',
+    ]:
+        assert module not in imported
+
+
+def test_setup_builds_only_the_used_formatters(monkeypatch):
+    built = []
+    builtin_formatter = mh_structlog.config._builtin_formatter
+
+    def spy(name, *args):
+        built.append(name)
+        return builtin_formatter(name, *args)
+
+    monkeypatch.setattr(mh_structlog.config, '_builtin_formatter', spy)
+
+    setup(log_format='json', testing_mode=True)
+    assert built == ['mh_structlog_json']
+
+    built.clear()
+    setup(
+        log_format='json',
+        testing_mode=True,
+        logging_configs=[
+            {"handlers": {"my_console": {"class": "logging.StreamHandler", "formatter": "mh_structlog_plain"}}}
+        ],
+    )
+    assert built == ['mh_structlog_json', 'mh_structlog_plain']
+
+
+def test_setup_with_redaction_config_redacts_pre_serialized_fields():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(
+            testing_mode=True,
+            log_format='json',
+            pre_serialize_contextvars=True,
+            additional_processors=[FieldsAdder({'service': 'shop', 'api_key': 's3cr3t'}, pre_serialize=True)],
+            redaction_config={},
+        )
+        bind_contextvars(auth_token='abc123', request_id='r1')  # noqa: S106
+        mh_structlog.get_logger().info("first", password='x')  # noqa: S106
+        mh_structlog.get_logger().info("second")
+        clear_contextvars()
+
+    for data in (orjson.loads(line) for line in out.getvalue().splitlines()):
+        assert data['auth_token'] == '[REDACTED]'
+        assert data['api_key'] == '[REDACTED]'
+        assert (data['request_id'], data['service']) == ('r1', 'shop')
+    assert 's3cr3t' not in out.getvalue()
+    assert 'abc123' not in out.getvalue()
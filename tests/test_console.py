@@ -0,0 +1,76 @@
+import sys
+
+from mh_structlog import get_logger, setup
+from mh_structlog.console import RESET, LightConsoleRenderer
+
+from .utils import capture_output
+
+
+def _event_dict(**fields):
+    return {
+        'timestamp': '2026-01-01T12:00:00.000Z',
+        'level': 'info',
+        'message': 'request handled',
+        'logger': 'myapp.views',
+        **fields,
+    }
+
+
+def test_render_without_colors():
+    renderer = LightConsoleRenderer(colors=False)
+
+    line = renderer(None, 'info', _event_dict(status=200, method='GET', user=None))
+    assert line == "2026-01-01T12:00:00.000Z [info     ] request handled [myapp.views] status=200 method=GET user=None"
+
+    line = LightConsoleRenderer(colors=False, sort_keys=True, pad_event_to=20)(None, 'info', _event_dict(b=1, a=2))
+    assert line.endswith('request handled      [myapp.views] a=2 b=1')
+
+    assert renderer(None, 'info', {'message': 'no fields', 'level': 'custom'}) == '[custom   ] no fields'
+
+
+def test_render_with_colors():
+    line = LightConsoleRenderer()(None, 'info', _event_dict(status=200))
+    assert line.count(RESET) == 6  # noqa: PLR2004
+    assert 'request handled' in line
+
+
+def test_render_exceptions_and_stack():
+    renderer = LightConsoleRenderer(colors=False, max_frames=1)
+    try:
+        1 / 0  # noqa: B018
+    except ZeroDivisionError as e:
+        from_exception = renderer(None, 'error', _event_dict(exc_info=e))
+        from_true = renderer(None, 'error', _event_dict(exc_info=True))
+        from_tuple = renderer(None, 'error', _event_dict(exc_info=sys.exc_info()))
+
+    for line in (from_exception, from_true, from_tuple):
+        first, *traceback = line.splitlines()
+        assert first.endswith('[myapp.views]')
+        assert traceback[0] == 'Traceback (most recent call last):'
+        assert traceback[-1] == 'ZeroDivisionError: division by zero'
+
+    assert renderer(None, 'info', _event_dict(exc_info=True)).count('\n') == 0
+    assert renderer(None, 'info', _event_dict(stack='Stack (most recent call last):')).endswith(
+        '\nStack (most recent call last):'
+    )
+    # Structured exceptions (from the json chain) are rendered as a field.
+    assert 'exception=[' in renderer(None, 'error', _event_dict(exception=[{'exc_type': 'ValueError'}]))
+
+
+def test_setup_with_light_console(tmp_path):
+    log_file = tmp_path / 'out.log'
+    with capture_output() as (out, _err):
+        setup(
+            log_format='console',
+            log_file=log_file,
+            log_file_format='console',
+            testing_mode=True,
+            light_console_config={'pad_event_to': 0},
+        )
+        get_logger('myapp.views').info('request handled', status=200, method='GET')
+
+    assert 'status' in out.getvalue()
+    assert '\033[' in out.getvalue()
+    logged = log_file.read_text()
+    assert '[info     ] request handled [myapp.views] status=200 method=GET' in logged
+    assert '\033[' not in logged
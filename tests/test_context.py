@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import orjson
+import structlog
+
+from mh_structlog.context import (
+    bind_contextvars,
+    clear_contextvars,
+    get_contextvars_snapshot,
+    merge_contextvars,
+    merge_contextvars_pre_serialized,
+    unbind_contextvars,
+)
+from mh_structlog.processors import render_orjson
+
+
+def test_merge_contextvars_matches_structlog():
+    bind_contextvars(request_id='abc', user='alice', tenant='t1')
+
+    event_dict = {'event': 'hey', 'user': 'bob'}
+
+    assert merge_contextvars(None, 'info', dict(event_dict)) == structlog.contextvars.merge_contextvars(
+        None, 'info', dict(event_dict)
+    )
+    # Keys of the log call itself take precedence
+    assert merge_contextvars(None, 'info', dict(event_dict))['user'] == 'bob'
+
+
+def test_snapshot_is_reused_until_the_context_changes():
+    bind_contextvars(request_id='abc')
+
+    snapshot = get_contextvars_snapshot()
+    assert get_contextvars_snapshot() is snapshot
+
+    bind_contextvars(route='/home')
+    assert get_contextvars_snapshot() == {'request_id': 'abc', 'route': '/home'}
+
+    unbind_contextvars('request_id')
+    assert get_contextvars_snapshot() == {'route': '/home'}
+
+    clear_contextvars()
+    assert get_contextvars_snapshot() == {}
+
+
+def test_snapshot_detects_changes_made_through_structlog():
+    bind_contextvars(request_id='abc')
+    assert get_contextvars_snapshot() == {'request_id': 'abc'}
+
+    structlog.contextvars.bind_contextvars(request_id='def')
+    assert get_contextvars_snapshot() == {'request_id': 'def'}
+
+    structlog.contextvars.clear_contextvars()
+    assert get_contextvars_snapshot() == {}
+
+
+def test_snapshot_is_isolated_between_threads():
+    bind_contextvars(thread='main')
+    assert get_contextvars_snapshot() == {'thread': 'main'}
+
+    seen = {}
+
+    def worker(name):
+        bind_contextvars(thread=name)
+        seen[name] = merge_contextvars(None, 'info', {})
+
+    threads = [threading.Thread(target=worker, args=(f'worker-{i}',)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen == {f'worker-{i}': {'thread': f'worker-{i}'} for i in range(4)}
+    assert merge_contextvars(None, 'info', {}) == {'thread': 'main'}
+
+
+def test_snapshot_is_isolated_between_asyncio_tasks():
+    async def task(name):
+        bind_contextvars(task=name)
+        await asyncio.sleep(0)
+        return merge_contextvars(None, 'info', {})
+
+    async def main():
+        bind_contextvars(request_id='abc')
+        get_contextvars_snapshot()
+        return await asyncio.gather(*(task(f'task-{i}') for i in range(4)))
+
+    results = asyncio.run(main())
+
+    assert results == [{'request_id': 'abc', 'task': f'task-{i}'} for i in range(4)]
+
+
+def test_merge_contextvars_pre_serialized():
+    bind_contextvars(request_id='abc', user='alice')
+
+    event_dict = merge_contextvars_pre_serialized(None, 'info', {'event': 'hey', 'user': 'bob'})
+    static_fields = event_dict['_static_fields'][0]
+    assert orjson.loads(render_orjson(None, 'info', event_dict)) == {'event': 'hey', 'request_id': 'abc', 'user': 'bob'}
+
+    # The serialized form is reused until the context changes.
+    assert merge_contextvars_pre_serialized(None, 'info', {})['_static_fields'][0] is static_fields
+
+    bind_contextvars(user='carol')
+    event_dict = merge_contextvars_pre_serialized(None, 'info', {'event': 'hey'})
+    assert orjson.loads(render_orjson(None, 'info', event_dict)) == {
+        'event': 'hey',
+        'request_id': 'abc',
+        'user': 'carol',
+    }
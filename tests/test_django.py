@@ -1,11 +1,16 @@
+import asyncio
+
 import orjson
-from django.http import HttpRequest
+import structlog
+from django.http import HttpRequest, HttpResponse
 from freezegun import freeze_time
 
 import mh_structlog
-from mh_structlog import filter_named_logger, setup
-from mh_structlog.django import get_fields_to_log
+from mh_structlog import config, filter_named_logger, setup
+from mh_structlog.django import StructLogRequestSummaryMiddleware, get_fields_to_log
+from mh_structlog.processors import aggregate_into_request_log_summary
 
+from . import root_urlconf
 from .utils import capture_output
 
 
@@ -139,3 +144,152 @@ def test_middleware_on_notfound(django_settings, settings, serial, client):
         'status': 404,
         'timestamp': '2025-12-11T12:01Z',
     }
+
+
+@freeze_time("2025-12-11 12:01:02")
+def test_summary_middleware_folds_request_logs_into_access_log(django_settings, settings, serial, client):
+    settings.MIDDLEWARE = ["mh_structlog.django.StructLogRequestSummaryMiddleware"]
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', global_filter_level=mh_structlog.DEBUG)
+        response = client.get("/logging")
+        assert response.status_code == 200
+
+    lines = [orjson.loads(line) for line in out.getvalue().splitlines()]
+
+    # Warnings and errors are emitted immediately, the rest only ends up in the access log.
+    assert [line['message'] for line in lines] == ['stock is low', 'payment failed', 'retry failed', '/logging']
+    assert lines[-1] == {
+        'latency_ms': 0,
+        'level': 'info',
+        'logger': 'mh_structlog.django.access',
+        'message': '/logging',
+        'method': 'GET',
+        'referrer': '',
+        'request_user_id': None,
+        'status': 200,
+        'timestamp': '2025-12-11T12:01Z',
+        'order_id': 2,
+        'customer': 'acme',
+        'log_counts': {'debug': 1, 'info': 1, 'warning': 1, 'error': 2},
+        'log_messages': ['loading order', 'order loaded'],
+        'first_error': {'message': 'payment failed', 'logger': 'myapp.views'},
+    }
+
+
+def test_summary_middleware_is_scoped_to_the_request(django_settings, settings, serial, client):
+    settings.MIDDLEWARE = ["mh_structlog.django.StructLogRequestSummaryMiddleware"]
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', global_filter_level=mh_structlog.INFO)
+        client.get("/")
+        mh_structlog.getLogger('myapp').info('after the request')
+
+    lines = [orjson.loads(line) for line in out.getvalue().splitlines()]
+
+    assert [line['message'] for line in lines] == ['/', 'after the request']
+    assert lines[0]['log_counts'] == {}
+    assert 'first_error' not in lines[0]
+
+
+def test_access_middleware_does_not_fold_request_logs(django_settings, settings, serial, client):
+    settings.MIDDLEWARE = ["mh_structlog.django.StructLogAccessLoggingMiddleware"]
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', global_filter_level=mh_structlog.INFO)
+        client.get("/logging")
+
+    lines = [orjson.loads(line) for line in out.getvalue().splitlines()]
+
+    assert [line['message'] for line in lines] == [
+        'order loaded',
+        'stock is low',
+        'payment failed',
+        'retry failed',
+        '/logging',
+    ]
+    assert 'log_counts' not in lines[-1]
+
+
+def test_summary_middleware_async(django_settings, serial):
+    async def get_response(request):
+        await mh_structlog.getLogger('myapp').ainfo('handling', step=1)
+        return HttpResponse("Hello, world!")
+
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = "/async"
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', global_filter_level=mh_structlog.INFO)
+        asyncio.run(StructLogRequestSummaryMiddleware(get_response)(request))
+
+    lines = [orjson.loads(line) for line in out.getvalue().splitlines()]
+
+    assert len(lines) == 1
+    assert lines[0]['message'] == '/async'
+    assert lines[0]['step'] == 1
+    assert lines[0]['log_counts'] == {'info': 1}
+    assert lines[0]['log_messages'] == ['handling']
+
+
+def test_summary_processor_only_when_asked_for(django_settings, serial, monkeypatch):
+    monkeypatch.setattr(config, '_request_log_summary_requested', False)
+
+    setup(testing_mode=True, log_format='json')
+    assert aggregate_into_request_log_summary not in structlog.get_config()['processors']
+    setup(testing_mode=True, log_format='json', request_log_summary=True)
+    assert aggregate_into_request_log_summary in structlog.get_config()['processors']
+
+    setup(testing_mode=True, log_format='json')
+    StructLogRequestSummaryMiddleware(lambda _request: HttpResponse())
+    assert structlog.get_config()['processors'][-2] is aggregate_into_request_log_summary
+    # Also for a later setup().
+    setup(testing_mode=True, log_format='json')
+    assert aggregate_into_request_log_summary in structlog.get_config()['processors']
+
+
+def _access_log_with_lazy_user(settings, client, path):
+    settings.MIDDLEWARE = [
+        "mh_structlog.django.StructLogAccessLoggingMiddleware",
+        "tests.root_urlconf.lazy_user_middleware",
+    ]
+    root_urlconf.user_loads.clear()
+
+    with capture_output() as (out, _err):
+        setup(testing_mode=True, log_format='json', global_filter_level=mh_structlog.INFO)
+        assert client.get(path).status_code == 200
+
+    return orjson.loads(out.getvalue())
+
+
+def test_middleware_does_not_load_the_user(django_settings, settings, serial, client):
+    data = _access_log_with_lazy_user(settings, client, "/")
+
+    assert data['request_user_id'] is None
+    assert root_urlconf.user_loads == []
+
+
+def test_middleware_logs_the_user_loaded_by_the_view(django_settings, settings, serial, client):
+    data = _access_log_with_lazy_user(settings, client, "/user")
+
+    assert data['request_user_id'] == 42
+    assert root_urlconf.user_loads == [1]
+
+
+def test_middleware_loads_the_user_when_opted_in(django_settings, settings, serial, client):
+    settings.MH_STRUCTLOG_ACCESS_LOG_RESOLVE_USER = True
+
+    data = _access_log_with_lazy_user(settings, client, "/")
+
+    assert data['request_user_id'] == 42
+    assert root_urlconf.user_loads == [1]
+
+
+def test_middleware_logs_the_configured_fields(django_settings, settings, serial, client):
+    settings.MH_STRUCTLOG_ACCESS_LOG_FIELDS = ['status', 'latency_ms']
+
+    data = _access_log_with_lazy_user(settings, client, "/")
+
+    assert set(data) == {'level', 'logger', 'message', 'timestamp', 'status', 'latency_ms'}
+    assert root_urlconf.user_loads == []
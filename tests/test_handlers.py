@@ -0,0 +1,158 @@
+import io
+import logging
+import random
+import threading
+import time
+
+import orjson
+from structlog import reset_defaults
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog import get_logger, setup
+from mh_structlog.handlers import SpillingStreamHandler, ThreadBufferedStreamHandler
+
+from .utils import capture_output
+
+
+class StallingStream(io.StringIO):
+    """A stream whose writes block until it is released, like a pipe with a stalled reader."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, s):
+        self.released.wait()
+        return super().write(s)
+
+
+def _make_record(msg, created=None):
+    record = logging.LogRecord('test', logging.INFO, __file__, 0, msg, (), None)
+    if created is not None:
+        record.created = created
+    return record
+
+
+def test_spilling_handler_does_not_block_and_keeps_order(tmp_path):
+    stream = StallingStream()
+    handler = SpillingStreamHandler(stream, spill_file=tmp_path / 'spill.log', queue_size=2)
+
+    start = time.monotonic()
+    for i in range(50):
+        handler.emit(_make_record(f'line {i}'))
+    assert time.monotonic() - start < 1
+
+    # The writer thread is stuck on the first line, the queue is full and the rest went to the spill file.
+    assert (tmp_path / 'spill.log').stat().st_size > 0
+
+    stream.released.set()
+    handler.flush()
+
+    assert stream.getvalue().splitlines() == [f'line {i}' for i in range(50)]
+    assert (tmp_path / 'spill.log').stat().st_size == 0
+
+    handler.close()
+
+
+def test_spilling_handler_reports_overflow(tmp_path):
+    stream = StallingStream()
+    handler = SpillingStreamHandler(stream, spill_file=tmp_path / 'spill.log', queue_size=1, max_spill_bytes=20)
+
+    for i in range(10):
+        handler.emit(_make_record(f'line {i}'))
+
+    assert handler.dropped_events > 0
+
+    stream.released.set()
+    handler.close()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[-1] == 'log spill file overflowed, events were dropped'
+    assert len(lines) == 10 - handler.dropped_events + 1
+
+
+def test_spilling_handler_replays_leftover_spill_file(tmp_path):
+    spill_file = tmp_path / 'spill.log'
+    spill_file.write_text('left behind\n')
+
+    stream = io.StringIO()
+    handler = SpillingStreamHandler(stream, spill_file=spill_file)
+    handler.emit(_make_record('new line'))
+    handler.close()
+
+    assert stream.getvalue().splitlines() == ['left behind', 'new line']
+
+
+def test_setup_with_stdout_spill_config(tmp_path):
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, stdout_spill_config={'spill_file': tmp_path / 'spill.log'})
+        get_logger('test_spill').info('hey')
+
+        (handler,) = logging.getLogger().handlers
+        assert isinstance(handler, SpillingStreamHandler)
+        handler.flush()
+
+    assert orjson.loads(out.getvalue())['message'] == 'hey'
+
+
+def test_thread_buffered_handler_merges_threads_in_order():
+    stream = io.StringIO()
+    handler = ThreadBufferedStreamHandler(stream, flush_interval=0.01, max_delay=0.01, buffer_size=10)
+    handler.setFormatter(logging.Formatter('%(created).6f %(message)s'))
+    start = time.time()
+
+    def worker(name):
+        created = sorted(start + random.random() for _ in range(100))
+        for i, ts in enumerate(created):
+            handler.handle(_make_record(f'{name} {i}', created=ts))
+
+    threads = [threading.Thread(target=worker, args=(f'thread-{n}',)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    handler.flush()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 800
+    timestamps = [float(line.split()[0]) for line in lines]
+    assert timestamps == sorted(timestamps)
+    for n in range(8):
+        assert [line.split(' ', 1)[1] for line in lines if f'thread-{n} ' in line] == [
+            f'thread-{n} {i}' for i in range(100)
+        ]
+
+    handler.close()
+
+
+def test_thread_buffered_handler_writes_within_bounded_delay():
+    stream = io.StringIO()
+    handler = ThreadBufferedStreamHandler(stream, flush_interval=0.01, max_delay=0.02)
+    handler.emit(_make_record('hey'))
+
+    deadline = time.monotonic() + 2
+    while not stream.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert stream.getvalue() == 'hey\n'
+
+    handler.emit(_make_record('bye'))
+    handler.close()
+    assert stream.getvalue() == 'hey\nbye\n'
+
+
+def test_setup_with_stdout_buffer_config():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, stdout_buffer_config={'max_delay': 0.01})
+        get_logger('test_buffer').info('hey')
+
+        (handler,) = logging.getLogger().handlers
+        assert isinstance(handler, ThreadBufferedStreamHandler)
+        handler.flush()
+
+    assert orjson.loads(out.getvalue())['message'] == 'hey'
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog.cli import main
+from mh_structlog.loadtest import run_loadtest
+
+
+@pytest.mark.parametrize(('mode', 'sink'), [('threads', 'null'), ('asyncio', 'pipe')])
+def test_run_loadtest(mode, sink):
+    result = run_loadtest(
+        {'log_format': 'json', 'global_filter_level': 20}, events=400, concurrency=2, mode=mode, sink=sink, warmup=10
+    )
+    clear_contextvars()
+
+    assert result.events == 400
+    assert result.events_per_second > 0
+    assert result.bytes_written > 0
+    assert list(result.latencies_ns) == ['p50', 'p90', 'p99', 'p99.9', 'max']
+    assert result.latencies_ns['p50'] <= result.latencies_ns['max']
+    assert 'events/s' in result.format()
+
+
+def test_run_loadtest_processes():
+    result = run_loadtest({'log_format': 'json'}, events=200, concurrency=2, mode='processes', warmup=10)
+
+    assert result.events == 200
+    assert result.bytes_written > 0
+
+
+def test_cli_loadtest_passes_setup_options(tmp_path, capsys):
+    log_file = tmp_path / 'logs.json'
+
+    assert (
+        main(
+            [
+                'loadtest',
+                '--events',
+                '100',
+                '--warmup',
+                '0',
+                '--json',
+                '--log-format',
+                'json',
+                '--log-file',
+                str(log_file),
+                '--log-file-format',
+                'json',
+                '--field-size-limits',
+                '{"max_string_length": 100}',
+            ]
+        )
+        == 0
+    )
+    clear_contextvars()
+
+    result = json.loads(capsys.readouterr().out)
+    assert result['events'] == 100
+    # The setup() options were applied: the events went to the log file as well.
+    assert len(log_file.read_text().splitlines()) == 100
+    assert result['bytes_written'] >= log_file.stat().st_size
@@ -1,3 +1,4 @@
+import logging
 import pathlib
 import re
 import tempfile
@@ -163,3 +164,33 @@ def test_logging_file_json():
         b'{"keyA":"valueA","keyB":100,"logger":"test_logger_file","level":"info","timestamp":"2025-12-11T12:01:02Z","message":"File Info log message"}\n',
         b'{"keyC":"valueC","keyD":200,"logger":"test_logger_file","level":"error","timestamp":"2025-12-11T12:01:02Z","message":"File Error log message"}\n',
     ]
+
+
+@freeze_time("2025-12-11 12:01:02")
+def test_logging_stdout_and_file_json_render_once():
+    reset_defaults()
+    clear_contextvars()
+
+    calls = []
+
+    def count_calls(_, __, event_dict):
+        calls.append(event_dict['event'])
+        return event_dict
+
+    with tempfile.NamedTemporaryFile() as fp, capture_output() as (out, _err):
+        setup(
+            log_format="json",
+            log_file=fp.name,
+            log_file_format="json",
+            testing_mode=True,
+            additional_processors=[count_calls],
+            timestamp_ms_precision=False,
+        )
+        logging.getLogger("test_logger_stdlib").info("stdlib message")
+
+        file_data = pathlib.Path(fp.name).read_bytes()
+
+    # The foreign_pre_chain only ran once for both handlers, and both got the same output.
+    assert calls == ["stdlib message"]
+    assert file_data.decode() == out.getvalue()
+    assert orjson.loads(file_data)['message'] == "stdlib message"
@@ -0,0 +1,172 @@
+import orjson
+import pytest
+import structlog
+
+from mh_structlog import get_logger, metrics, setup
+from mh_structlog.metrics import Histogram, MetricsAggregator
+
+from .utils import capture_output
+
+
+@pytest.fixture(autouse=True)
+def _no_active_aggregator():
+    yield
+    metrics._aggregator = None
+
+
+def _events(out):
+    return [orjson.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_histogram():
+    histogram = Histogram()
+    for value in range(1, 201):
+        histogram.record(value)
+
+    assert (histogram.count, histogram.sum, histogram.min, histogram.max) == (200, 20100, 1, 200)
+    # The buckets are at most 12.5% wide.
+    assert 100 <= histogram.percentile(50) <= 112.5
+    assert 180 <= histogram.percentile(90) <= 202.5
+    assert histogram.percentile(100) == 200
+
+    samples = histogram.samples()
+    assert len(samples) == 100
+    assert samples == sorted(samples)
+    assert 90 <= samples[49] <= 112.5
+
+
+def test_aggregator_counts_and_measures_per_dimensions():
+    aggregator = MetricsAggregator(
+        counters={'requests': None, 'errors': 'error'},
+        histograms=['latency_ms'],
+        dimensions=['status'],
+        loggers=['myapp.access'],
+    )
+    for status, latency in [(200, 10), (200, 30), (500, 100)]:
+        event_dict = {'logger': 'myapp.access.view', 'status': status, 'latency_ms': latency}
+        if status == 500:  # noqa: PLR2004
+            event_dict['error'] = 'boom'
+        assert aggregator(None, 'info', event_dict) is event_dict
+    aggregator(None, 'info', {'logger': 'other', 'status': 200, 'latency_ms': 1})
+    aggregator(None, 'info', {'logger': 'myapp.access', 'status': 200, 'latency_ms': 'not a number'})
+
+    series = aggregator._series
+    assert set(series) == {(200,), (500,)}
+    assert series[200,].counters == {'requests': 3, 'errors': 0}
+    assert series[200,].histograms['latency_ms'].count == 2  # noqa: PLR2004
+    assert series[500,].counters == {'requests': 1, 'errors': 1}
+
+
+def test_aggregator_drops_aggregated_events_and_caps_the_series():
+    aggregator = MetricsAggregator(counters=['status'], dimensions=['path'], drop_aggregated=True, max_series=2)
+
+    for path in ['/a', '/b', '/c', '/d']:
+        with pytest.raises(structlog.DropEvent):
+            aggregator(None, 'info', {'logger': 'x', 'status': 200, 'path': path})
+    not_aggregated = {'logger': 'x', 'path': '/a'}
+    assert aggregator(None, 'info', not_aggregated) is not_aggregated
+
+    assert {key: s.counters['status'] for key, s in aggregator._series.items()} == {
+        ('/a',): 1,
+        ('/b',): 1,
+        (metrics.OVERFLOW_DIMENSION_VALUE,): 2,
+    }
+
+
+@pytest.mark.parametrize(
+    ('options', 'clashing'),
+    [
+        ({'counters': ['status'], 'dimensions': ['status']}, 'status'),
+        ({'counters': ['latency_ms'], 'histograms': ['latency_ms']}, 'latency_ms'),
+        ({'counters': {'interval_s': None}}, 'interval_s'),
+        ({'counters': ['latency_ms_count'], 'histograms': ['latency_ms'], 'emf': True}, 'latency_ms_count'),
+    ],
+)
+def test_aggregator_rejects_clashing_names(options, clashing):
+    with pytest.raises(ValueError, match=f'same fields: {clashing};'):
+        MetricsAggregator(**options)
+
+    # Without EMF, the histogram is logged as a single field.
+    MetricsAggregator(counters=['latency_ms_count'], histograms=['latency_ms'])
+
+
+def test_setup_without_metrics_drops_the_earlier_aggregator():
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, metrics_config={'counters': {'requests': None}})
+        get_logger('myapp').info('counted')
+        assert metrics.get_metrics_aggregator() is not None
+
+        setup(log_format='json', testing_mode=True)
+        assert metrics.get_metrics_aggregator() is None
+        metrics.flush_metrics()
+
+    assert [orjson.loads(line)['message'] for line in out.getvalue().splitlines()] == ['counted']
+
+
+def test_setup_with_metrics_flushes_summary_events():
+    with capture_output() as (out, _err):
+        setup(
+            log_format='json',
+            testing_mode=True,
+            metrics_config={
+                'counters': {'requests': None},
+                'histograms': {'latency_ms': 'latency_ms'},
+                'dimensions': ['method'],
+                'loggers': ['myapp.access'],
+                'drop_aggregated': True,
+            },
+        )
+        get_logger('myapp.access').info('request', method='GET', latency_ms=12)
+        get_logger('myapp.access').info('request', method='GET', latency_ms=20)
+        get_logger('myapp').info('not aggregated', latency_ms=20)
+        metrics.flush_metrics()
+        metrics.flush_metrics()  # nothing new to flush
+
+    first, summary = _events(out)
+    assert first['message'] == 'not aggregated'
+    assert summary['logger'] == metrics.METRICS_LOGGER_NAME
+    assert summary['method'] == 'GET'
+    assert summary['requests'] == 2  # noqa: PLR2004
+    assert summary['latency_ms']['count'] == 2  # noqa: PLR2004
+    assert summary['latency_ms']['max'] == 20  # noqa: PLR2004
+
+
+def test_setup_with_metrics_flushes_on_interval():
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, metrics_config={'counters': ['status'], 'flush_interval_s': 0})
+        get_logger('myapp').info('request', status=200)
+
+    summary, event = _events(out)
+    assert summary['status'] == 1
+    assert event['message'] == 'request'
+
+
+def test_setup_with_metrics_emits_emf_for_aws_json():
+    with capture_output() as (out, _err):
+        setup(
+            log_format='aws_json',
+            testing_mode=True,
+            metrics_config={
+                'counters': {'requests': None},
+                'histograms': ['latency_ms'],
+                'dimensions': ['status'],
+                'namespace': 'myapp',
+                'units': {'latency_ms': 'Milliseconds'},
+                'drop_aggregated': True,
+            },
+        )
+        for latency in range(150):
+            get_logger('myapp').info('request', status=200, latency_ms=latency)
+        metrics.flush_metrics()
+
+    (event,) = _events(out)
+    (directive,) = event['_aws']['CloudWatchMetrics']
+    assert directive['Namespace'] == 'myapp'
+    assert directive['Dimensions'] == [['status']]
+    assert {'Name': 'latency_ms', 'Unit': 'Milliseconds'} in directive['Metrics']
+    assert {'Name': 'requests', 'Unit': 'Count'} in directive['Metrics']
+    assert event['status'] == '200'
+    assert event['requests'] == 150  # noqa: PLR2004
+    assert len(event['latency_ms']) == metrics.EMF_MAX_VALUES
+    assert event['latency_ms_count'] == 150  # noqa: PLR2004
+    assert event['latency_ms_max'] == 149  # noqa: PLR2004
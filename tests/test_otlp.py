@@ -0,0 +1,187 @@
+import gzip
+import http.server
+import logging
+import threading
+import time
+
+import orjson
+import pytest
+from structlog import reset_defaults
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog import get_logger, setup
+from mh_structlog.handlers import OTLPHandler
+from mh_structlog.otlp import OTLPRenderer
+
+from .utils import capture_output
+
+
+class Collector(http.server.ThreadingHTTPServer):
+    """A local stand-in for an OpenTelemetry collector, which records the export requests it receives."""
+
+    def __init__(self, statuses=()):
+        super().__init__(('127.0.0.1', 0), CollectorRequestHandler)
+        self.requests = []
+        self.statuses = list(statuses)
+        self.endpoint = f'http://127.0.0.1:{self.server_address[1]}/v1/logs'
+        threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+    @property
+    def records(self):
+        return [
+            record
+            for request in self.requests
+            for resource_logs in request['resourceLogs']
+            for scope_logs in resource_logs['scopeLogs']
+            for record in scope_logs['logRecords']
+        ]
+
+
+class CollectorRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status == 200:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            self.server.requests.append(orjson.loads(body))
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def collector():
+    server = Collector()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _attributes(record):
+    return {a['key']: next(iter(a['value'].values()), None) for a in record['attributes']}
+
+
+def test_otlp_renderer():
+    record = orjson.loads(
+        OTLPRenderer()(
+            None,
+            'warning',
+            {
+                'message': 'payment failed',
+                'level': 'warning',
+                'timestamp': '2025-12-11T12:01:02.345Z',
+                'logger': 'payments',
+                'trace_id': '5b8efff798038103d269b633813fc60c',
+                'span_id': 'eee19b7ec3c1b174',
+                'amount': 12.5,
+                'count': 3,
+                'ok': False,
+                'order': {'id': 1, 'tags': ['a', 'b']},
+            },
+        )
+    )
+
+    assert record['timeUnixNano'] == '1765454462345000000'
+    assert record['severityNumber'] == 13
+    assert record['severityText'] == 'WARNING'
+    assert record['body'] == {'stringValue': 'payment failed'}
+    assert record['traceId'] == '5b8efff798038103d269b633813fc60c'
+    assert record['spanId'] == 'eee19b7ec3c1b174'
+    assert record['attributes'] == [
+        {'key': 'logger', 'value': {'stringValue': 'payments'}},
+        {'key': 'amount', 'value': {'doubleValue': 12.5}},
+        {'key': 'count', 'value': {'intValue': '3'}},
+        {'key': 'ok', 'value': {'boolValue': False}},
+        {
+            'key': 'order',
+            'value': {
+                'kvlistValue': {
+                    'values': [
+                        {'key': 'id', 'value': {'intValue': '1'}},
+                        {
+                            'key': 'tags',
+                            'value': {'arrayValue': {'values': [{'stringValue': 'a'}, {'stringValue': 'b'}]}},
+                        },
+                    ]
+                }
+            },
+        },
+    ]
+
+
+def test_otlp_handler_batches(collector):
+    handler = OTLPHandler(endpoint=collector.endpoint, max_batch_size=10, flush_interval=60)
+    handler.setFormatter(logging.Formatter('{"body":{"stringValue":"%(message)s"}}'))
+    logger = logging.getLogger('test_otlp_handler_batches')
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    try:
+        for i in range(25):
+            logger.info('message %s', i)
+        handler.flush()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    # Two full batches, and the rest on flush.
+    assert [len(r['resourceLogs'][0]['scopeLogs'][0]['logRecords']) for r in collector.requests] == [10, 10, 5]
+    assert [r['body']['stringValue'] for r in collector.records] == [f'message {i}' for i in range(25)]
+    assert handler.exported_events == 25
+
+
+def test_otlp_handler_retries(collector):
+    collector.statuses = [503, 429]
+    handler = OTLPHandler(endpoint=collector.endpoint, retry_backoff=0.01, compression=None)
+    handler.setFormatter(logging.Formatter('{"body":{"stringValue":"%(message)s"}}'))
+    handler.handle(logging.makeLogRecord({'msg': 'hey'}))
+    handler.close()
+
+    assert [r['body']['stringValue'] for r in collector.records] == ['hey']
+    assert handler.failed_requests == 0
+
+
+def test_otlp_handler_bounded_queue():
+    # Nothing listens on this port; the exporter keeps retrying while the queue fills up.
+    handler = OTLPHandler(
+        endpoint='http://127.0.0.1:9/v1/logs', queue_size=5, max_batch_size=1, retry_backoff=10, flush_timeout=0.1
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    for _ in range(20):
+        handler.handle(logging.makeLogRecord({'msg': 'hey'}))
+    time.sleep(0.05)
+    handler.close()
+
+    assert handler.dropped_events >= 20 - 5 - 1
+    assert handler._queue.qsize() <= 5
+
+
+def test_setup_otlp(collector):
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output():
+        setup(
+            log_format='json', testing_mode=True, otlp_config={'endpoint': collector.endpoint, 'flush_interval': 0.05}
+        )
+        get_logger('test_otlp').info('hey', user='alice')
+        logging.getLogger('test_otlp_stdlib').error('stdlib message', extra={'job': 'sync'})
+        try:
+            1 / 0  # noqa: B018
+        except ZeroDivisionError:
+            get_logger('test_otlp').exception('failed')
+
+    handler = next(h for h in logging.getLogger().handlers if isinstance(h, OTLPHandler))
+    handler.flush()
+
+    records = collector.records
+    assert [r['body']['stringValue'] for r in records] == ['hey', 'stdlib message', 'failed']
+    assert [r['severityText'] for r in records] == ['INFO', 'ERROR', 'ERROR']
+    assert _attributes(records[0]) == {'user': 'alice', 'logger': 'test_otlp'}
+    assert _attributes(records[1]) == {'job': 'sync', 'logger': 'test_otlp_stdlib'}
+    assert _attributes(records[2])['exception.type'] == 'ZeroDivisionError'
+    assert collector.requests[0]['resourceLogs'][0]['resource']['attributes'][0]['key'] == 'service.name'
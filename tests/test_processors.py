@@ -1,17 +1,27 @@
+import asyncio
 import logging
 from collections.abc import Mapping
 from dataclasses import dataclass
 
+import orjson
+import structlog
 from pydantic import BaseModel
 
 from mh_structlog.processors import (
+    CallsiteLocationAdder,
     FieldDropper,
     FieldRenamer,
     FieldsAdder,
+    FieldSizeGuard,
     FieldTransformer,
     ObjectToDictTransformer,
+    Redactor,
+    StaticFields,
     add_flattened_extra,
+    attach_static_fields,
     cap_timestamp_to_ms_precision,
+    expand_static_fields,
+    render_orjson,
 )
 
 
@@ -117,3 +127,207 @@ def test_object_to_dict_transformer_dataclass():
     event_dict = {"event": "user data", "obj": obj}
     result = transformer(test_logger, '', event_dict)
     assert result == {"event": "user data", "obj": {"id": 123, "name": "alice"}}
+
+
+def test_field_size_guard_passes_values_within_limits_as_is():
+    guard = FieldSizeGuard(max_string_length=10, max_collection_items=3, max_depth=3, max_event_bytes=1000)
+    nested = {"a": [1, 2, 3], "b": {"c": "short"}}
+    event_dict = {"event": "data", "nested": nested}
+
+    result = guard(test_logger, '', event_dict)
+
+    assert result == {"event": "data", "nested": nested}
+    assert result["nested"] is nested
+    assert result["nested"]["a"] is nested["a"]
+
+
+def test_field_size_guard_truncates_strings_collections_and_depth():
+    guard = FieldSizeGuard(max_string_length=5, max_collection_items=2, max_depth=1, max_event_bytes=None)
+    untouched = "short"
+    event_dict = {
+        "event": "data",
+        "body": "abcdefghij",
+        "items": [1, 2, 3, 4],
+        "nested": {"deeper": {"deepest": 1}, "ok": 1},
+        "as_tuple": ("abcdefghij",),
+        "untouched": untouched,
+    }
+
+    result = guard(test_logger, '', event_dict)
+
+    assert result["body"] == "abcde..."
+    assert result["items"] == [1, 2]
+    assert result["nested"] == {"deeper": "<truncated: dict with 1 items>", "ok": 1}
+    assert result["untouched"] is untouched
+    assert result["as_tuple"] == ("abcde...",)
+    assert result["truncated_fields"] == ["body", "items", "nested.deeper", "as_tuple.0"]
+
+
+def test_field_size_guard_caps_total_event_size():
+    guard = FieldSizeGuard(max_string_length=None, max_event_bytes=160)
+    event_dict = {"event": "x" * 80, "small": 1, "big": "y" * 200, "medium": "z" * 50}
+
+    result = guard(test_logger, '', event_dict)
+
+    assert result["event"] == "x" * 80
+    assert result["small"] == 1
+    assert result["big"].startswith("<truncated: ")
+    assert result["medium"].startswith("<truncated: ")
+    assert result["truncated_fields"] == ["big", "medium"]
+
+
+def test_field_adder_pre_serialized_is_spliced_by_render_orjson():
+    adder = FieldsAdder(data={"service": "my-service", "env": "production"}, pre_serialize=True)
+
+    event_dict = adder(test_logger, '', {"event": "startup"})
+    assert "service" not in event_dict
+
+    assert render_orjson(test_logger, '', event_dict) == '{"event":"startup","service":"my-service","env":"production"}'
+
+
+def test_field_adder_pre_serialized_update_invalidates():
+    adder = FieldsAdder(data={"service": "my-service"}, pre_serialize=True)
+    adder.data = {"service": "other-service"}
+
+    rendered = render_orjson(test_logger, '', adder(test_logger, '', {"event": "startup"}))
+
+    assert orjson.loads(rendered) == {"event": "startup", "service": "other-service"}
+
+
+def test_render_orjson_static_fields_overlap():
+    overriding = StaticFields({"service": "static", "env": "production"}, override=True)
+    defaulting = StaticFields({"request_id": "from-context", "user": "alice"}, override=False)
+
+    event_dict = {"event": "hey", "service": "from-call", "user": "bob"}
+    attach_static_fields(event_dict, overriding)
+    attach_static_fields(event_dict, defaulting)
+    rendered = render_orjson(test_logger, '', event_dict)
+
+    assert orjson.loads(rendered) == {
+        "event": "hey",
+        "service": "static",
+        "env": "production",
+        "request_id": "from-context",
+        "user": "bob",
+    }
+
+
+def test_expand_static_fields():
+    event_dict = {"event": "hey"}
+    attach_static_fields(event_dict, StaticFields({"service": "my-service"}))
+
+    assert expand_static_fields(test_logger, '', event_dict) == {"event": "hey", "service": "my-service"}
+
+
+def _log_with_callsite_adder(adder, log):
+    captured = []
+
+    def capture(_, __, event_dict):
+        captured.append(event_dict)
+        return ''
+
+    log(structlog.wrap_logger(structlog.ReturnLogger(), processors=[adder, capture]))
+    return captured
+
+
+def test_callsite_location_adder_compact():
+    adder = CallsiteLocationAdder()
+
+    def log(logger):
+        for _ in range(2):
+            logger.info('hey')
+
+    first, second = _log_with_callsite_adder(adder, log)
+
+    lineno = log.__code__.co_firstlineno + 2
+    assert first == {'event': 'hey', 'location': f'{__file__}:{lineno}(log)'}
+    assert second == first
+
+
+def test_callsite_location_adder_fields():
+    (event_dict,) = _log_with_callsite_adder(CallsiteLocationAdder(compact=False), lambda logger: logger.info('hey'))
+
+    assert event_dict['pathname'] == __file__
+    assert event_dict['func_name'] == '<lambda>'
+    assert isinstance(event_dict['lineno'], int)
+
+
+def test_callsite_location_adder_async():
+    async def log_async(logger):
+        await logger.ainfo('hey')
+
+    (event_dict,) = _log_with_callsite_adder(CallsiteLocationAdder(), lambda logger: asyncio.run(log_async(logger)))
+
+    assert event_dict['location'] == f'{__file__}:{log_async.__code__.co_firstlineno + 1}(log_async)'
+
+
+def test_callsite_location_adder_caches_are_bounded():
+    adder = CallsiteLocationAdder(max_cached_keys=5)
+    for i in range(20):
+        # Code compiled at runtime gets new code objects every time.
+        log = eval(compile(f'lambda logger: logger.info("hey {i}")', f'<generated {i}>', 'eval'))  # noqa: S307
+        (event_dict,) = _log_with_callsite_adder(adder, log)
+        assert event_dict['location'] == f'<generated {i}>:1(<lambda>)'
+
+    assert len(adder._fields) <= 5  # noqa: PLR2004
+    assert len(adder._ignored_codes) <= 5  # noqa: PLR2004
+
+
+def test_callsite_location_adder_stdlib_record():
+    record = logging.LogRecord('test', logging.INFO, '/app/module.py', 12, 'hey', (), None, func='handler')
+
+    event_dict = CallsiteLocationAdder()(None, None, {'_record': record, 'event': 'hey'})
+
+    assert event_dict['location'] == '/app/module.py:12(handler)'
+
+
+def test_redactor_replaces_secret_keys_in_nested_values():
+    nested = {'user': 'alice', 'password': 'hunter2'}
+    items = [{'api_key': 'abc'}, 'plain']
+    event_dict = {'event': 'login', 'Authorization': 'Bearer xyz', 'data': nested, 'items': items, 'ok': True}
+
+    result = Redactor()(None, None, event_dict)
+
+    assert result == {
+        'event': 'login',
+        'Authorization': '[REDACTED]',
+        'data': {'user': 'alice', 'password': '[REDACTED]'},
+        'items': [{'api_key': '[REDACTED]'}, 'plain'],
+        'ok': True,
+    }
+    # The logged values themselves are not modified.
+    assert nested == {'user': 'alice', 'password': 'hunter2'}
+    assert items == [{'api_key': 'abc'}, 'plain']
+
+
+def test_redactor_passes_clean_values_as_is():
+    data = {'user': 'alice', 'tags': ('a', 'b')}
+
+    result = Redactor()(None, None, {'event': 'hey', 'data': data})
+
+    assert result['data'] is data
+
+
+def test_redactor_value_patterns():
+    redactor = Redactor(keys=[], value_patterns=['email', 'card_number', r'sk_live_\w+'])
+
+    result = redactor(
+        None, None, {'event': 'mail sent to bob@example.com', 'card': '4111 1111 1111 1111', 'k': 'sk_live_123'}
+    )
+
+    assert result == {'event': 'mail sent to [REDACTED]', 'card': '[REDACTED]', 'k': '[REDACTED]'}
+
+
+def test_redactor_depth_limit():
+    result = Redactor(max_depth=2)(None, None, {'a': {'b': {'c': 1}}, 'l': [[1]]})
+
+    assert result == {'a': {'b': '[REDACTED]'}, 'l': ['[REDACTED]']}
+
+
+def test_redactor_caches_key_decisions():
+    redactor = Redactor(keys=['secret'], max_cached_keys=2)
+
+    assert redactor.is_secret_key('my_secret')
+    assert not redactor.is_secret_key('user')
+    assert not redactor.is_secret_key('other')
+    assert len(redactor._secret_keys) == 1
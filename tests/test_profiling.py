@@ -0,0 +1,101 @@
+import io
+import logging
+
+import pytest
+import structlog
+from structlog import reset_defaults
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog import get_logger, profiling, setup
+from mh_structlog.profiling import ProcessorProfiler, ProcessorStats, TimedProcessor
+
+from .utils import capture_output
+
+
+@pytest.fixture(autouse=True)
+def _no_profiler():
+    yield
+    profiling._profiler = None
+
+
+def test_setup_with_profiling_times_every_chain():
+    reset_defaults()
+    clear_contextvars()
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, profile_processors=True)
+        get_logger('test_profiling').info('structlog message')
+        logging.getLogger('test_profiling_stdlib').info('stdlib message')
+
+    # The output itself is unaffected by the timing wrappers.
+    assert out.getvalue().count('\n') == 2
+
+    profiler = profiling.get_profiler()
+    assert profiler is not None
+
+    timed = {(s.chain, s.name): s.count for s in profiler.stats.values() if s.count}
+    assert timed['structlog', 'merge_contextvars'] == 1
+    assert timed['foreign_pre_chain', 'merge_contextvars'] == 1
+    assert timed['mh_structlog_json', 'render_orjson'] == 2
+
+    report = io.StringIO()
+    profiling.print_report(file=report)
+    assert 'render_orjson' in report.getvalue()
+    assert 'ObjectToDictTransformer' in report.getvalue()
+
+
+def test_setup_without_profiling_does_not_wrap():
+    reset_defaults()
+
+    setup(log_format='json', testing_mode=True)
+
+    assert not any(isinstance(p, TimedProcessor) for p in structlog.get_config()['processors'])
+    for handler in logging.getLogger().handlers:
+        assert not any(isinstance(p, TimedProcessor) for p in handler.formatter.processors)
+
+
+def test_setup_without_profiling_drops_the_earlier_profiler(monkeypatch):
+    registered = []
+    monkeypatch.setattr(profiling, '_atexit_registered', False)
+    monkeypatch.setattr(profiling.atexit, 'register', registered.append)
+
+    setup(log_format='json', testing_mode=True, profile_processors={'report_at_exit': False})
+    assert profiling.get_profiler() is not None
+    assert not registered
+
+    setup(log_format='json', testing_mode=True, profile_processors={'active': False})
+    assert profiling.get_profiler() is None
+
+    setup(log_format='json', testing_mode=True, profile_processors=True)
+    assert registered == [profiling.print_report]
+    setup(log_format='json', testing_mode=True)
+    assert profiling.get_profiler() is None
+
+
+def test_processor_stats_percentiles():
+    stats = ProcessorStats('chain', 0, 'name')
+    for duration in [100] * 98 + [5000, 100_000]:
+        stats.record(duration)
+
+    assert stats.count == 100
+    assert stats.max_ns == 100_000
+    assert stats.percentile(50) == 128
+    assert stats.percentile(99) == 8192
+    assert stats.percentile(100) == 100_000
+
+
+def test_timed_processor_records_raising_processors():
+    profiler = ProcessorProfiler()
+
+    def dropper(_, __, event_dict):
+        raise structlog.DropEvent
+
+    (wrapped,) = profiler.wrap_chain('structlog', [dropper])
+
+    with pytest.raises(structlog.DropEvent):
+        wrapped(None, 'info', {})
+
+    assert profiler.stats['structlog', 0].count == 1
+
+    profiler.reset()
+    assert profiler.stats['structlog', 0].count == 0
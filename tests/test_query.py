@@ -0,0 +1,171 @@
+import itertools
+import logging
+
+import orjson
+import pytest
+from structlog import reset_defaults
+from structlog.contextvars import clear_contextvars
+
+from mh_structlog import ERROR, filter_named_logger, get_logger, setup
+from mh_structlog.cli import main
+from mh_structlog.handlers import IndexedFileHandler
+from mh_structlog.query import build_index, index_path, level_bit, load_index, parse_timestamp, query
+
+from .utils import capture_output
+
+
+def _write_log_file(path, count=100):
+    levels = ['debug', 'info', 'info', 'warning', 'error']
+    with path.open('wb') as f:
+        for i in range(count):
+            event = {
+                'request_id': f'r{i % 3}',
+                'n': i,
+                'logger': 'app.db' if i % 2 else 'app.web',
+                'level': levels[i % len(levels)],
+                'timestamp': f'2025-12-11T12:{i // 60:02d}:{i % 60:02d}.000Z',
+                'message': f'event {i}',
+            }
+            f.write(orjson.dumps(event) + b'\n')
+
+
+def _numbers(lines):
+    return [orjson.loads(line)['n'] for line in lines]
+
+
+def test_query_filters(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    _write_log_file(log_file)
+
+    assert _numbers(query(log_file, block_size=512)) == list(range(100))
+    assert _numbers(query(log_file, since='2025-12-11T12:01:30Z', until='2025-12-11T12:01:33Z')) == [90, 91, 92]
+    assert _numbers(query(log_file, level='error')) == list(range(4, 100, 5))
+    assert _numbers(query(log_file, logger='app.db', until='2025-12-11T12:00:10Z')) == [1, 3, 5, 7, 9]
+    assert _numbers(query(log_file, logger='app')) == list(range(100))
+    assert _numbers(query(log_file, logger='app.d')) == []
+    assert _numbers(query(log_file, where={'request_id': 'r1', 'n': '4'})) == [4]
+
+
+def test_query_level_of_lines_without_a_known_level(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    with log_file.open('wb') as f:
+        f.writelines(
+            orjson.dumps(event) + b'\n'
+            for event in [{'n': 0}, {'n': 1, 'level': 'verbose'}, {'n': 2, 'level': 'error'}, {'n': 3, 'level': 7}]
+        )
+
+    assert _numbers(query(log_file, level='warning')) == [2]
+    assert _numbers(query(log_file)) == [0, 1, 2, 3]
+    with pytest.raises(ValueError, match='Unknown level verbose'):
+        list(query(log_file, level='verbose'))
+    with pytest.raises(SystemExit, match='Unknown level verbose'):
+        main(['query', str(log_file), '--level', 'verbose'])
+
+
+def test_index_blocks(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    _write_log_file(log_file)
+
+    entries = build_index(log_file, block_size=1024)
+    assert len(entries) > 1
+    assert load_index(log_file) == entries
+    assert entries[0].start == 0
+    assert entries[-1].end == log_file.stat().st_size
+    assert all(a.end == b.start for a, b in itertools.pairwise(entries))
+    assert all(a.max_ts <= b.min_ts for a, b in itertools.pairwise(entries))
+
+    # Blocks that can't contain matches are not read: corrupt the first one, which is before the queried range.
+    data = bytearray(log_file.read_bytes())
+    data[: entries[0].end - 1] = b'x' * (entries[0].end - 1)
+    log_file.write_bytes(bytes(data))
+    assert _numbers(query(log_file, since='2025-12-11T12:01:30Z')) == list(range(90, 100))
+
+
+def test_index_uses_top_level_keys(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    with log_file.open('wb') as f:
+        for i in range(10):
+            event = {
+                'payload': {'timestamp': '2000-01-01T00:00:00.000Z', 'level': 'debug'},
+                'n': i,
+                'timestamp': f'2025-12-11T12:00:{i:02d}.000Z',
+                'level': 'error',
+            }
+            f.write(orjson.dumps(event) + b'\n')
+
+    (entry,) = build_index(log_file)
+    assert (entry.min_ts, entry.max_ts) == (
+        parse_timestamp('2025-12-11T12:00:00Z'),
+        parse_timestamp('2025-12-11T12:00:09Z'),
+    )
+    assert entry.level_mask == level_bit('error')
+    assert _numbers(query(log_file, level='error', since='2025-12-11T12:00:05Z')) == [5, 6, 7, 8, 9]
+
+
+def test_index_is_updated_incrementally(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    _write_log_file(log_file, count=10)
+    build_index(log_file)
+
+    with log_file.open('ab') as f:
+        f.write(b'{"n":10,"level":"critical","timestamp":"2025-12-11T13:00:00Z"}\n')
+        # An incomplete line (still being written) is not indexed yet.
+        f.write(b'{"n":11,"level":"crit')
+
+    assert _numbers(query(log_file, level='critical')) == [10]
+    assert load_index(log_file)[-1].end == log_file.stat().st_size - len(b'{"n":11,"level":"crit')
+
+    # When the log file was truncated, the stale part of the index is not used.
+    _write_log_file(log_file, count=5)
+    assert load_index(log_file) == []
+    assert _numbers(query(log_file)) == list(range(5))
+
+
+def test_indexed_file_handler(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    handler = IndexedFileHandler(log_file, block_size=256)
+    handler.setFormatter(logging.Formatter('{"level":"%(levelname)s","message":"%(message)s"}'))
+
+    logger = logging.getLogger('test_indexed_file_handler')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for i in range(20):
+            logger.log(logging.ERROR if i == 7 else logging.WARNING, 'message %s ünïcödé', i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    entries = load_index(log_file)
+    assert len(entries) > 1
+    assert entries[-1].end == log_file.stat().st_size
+    assert sum(1 for entry in entries if entry.level_mask & (1 << 4)) == 1
+    assert [orjson.loads(line)['message'] for line in query(log_file, level='error')] == ['message 7 ünïcödé']
+
+
+def test_setup_log_file_index(tmp_path, capsysbinary):
+    reset_defaults()
+    clear_contextvars()
+
+    log_file = tmp_path / 'logs.json'
+
+    with capture_output():
+        setup(
+            log_format="console",
+            log_file=log_file,
+            log_file_format="json",
+            log_file_index=True,
+            testing_mode=True,
+            logging_configs=[filter_named_logger("asyncio", ERROR)],
+        )
+        logger = get_logger("test_logger_file")
+        logger.info("File Info log message", keyA="valueA")
+        logger.error("File Error log message", keyA="valueB")
+
+    handler = next(h for h in logging.getLogger().handlers if isinstance(h, IndexedFileHandler))
+    handler.close()
+    assert index_path(log_file).exists()
+
+    assert main(['query', str(log_file), '--level', 'error', '--where', 'keyA=valueB']) == 0
+    lines = capsysbinary.readouterr().out.splitlines()
+    assert [orjson.loads(line)['message'] for line in lines] == ['File Error log message']
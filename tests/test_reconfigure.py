@@ -0,0 +1,132 @@
+import io
+import logging
+
+import orjson
+import pytest
+import structlog
+from structlog import reset_defaults
+
+from mh_structlog import (
+    DEBUG,
+    INFO,
+    add_handler,
+    get_logger,
+    metrics,
+    profiling,
+    remove_handler,
+    set_log_format,
+    set_logger_level,
+    setup,
+    snapshot_config,
+)
+from mh_structlog.config import StructlogLoggingConfigExceptionError
+
+from .utils import capture_output
+
+
+def _setup(**kwargs):
+    reset_defaults()
+    setup(testing_mode=True, **kwargs)
+
+
+def test_snapshot_restores_levels_and_handlers():
+    with capture_output() as (out, _err):
+        _setup(log_format='json', global_filter_level=INFO)
+        root_handlers = list(logging.getLogger().handlers)
+        structlog_processors = structlog.get_config()['processors']
+
+        with snapshot_config():
+            stream = io.StringIO()
+            add_handler(logging.StreamHandler(stream), name='extra')
+            set_logger_level('', DEBUG)
+            set_logger_level('test_reconfigure', logging.ERROR)
+            get_logger('test_reconfigure').warning('filtered out')
+            get_logger('other').info('to both')
+
+        assert logging.getLogger().handlers == root_handlers
+        assert logging.getLogger().level == INFO
+        assert logging.getLogger('test_reconfigure').level == logging.NOTSET
+        assert structlog.get_config()['processors'] == structlog_processors
+
+        get_logger('test_reconfigure').warning('not filtered anymore')
+
+    # The added handler got the json formatter of stdout.
+    assert orjson.loads(stream.getvalue())['message'] == 'to both'
+    assert [orjson.loads(line)['message'] for line in out.getvalue().splitlines()] == [
+        'to both',
+        'not filtered anymore',
+    ]
+
+
+def test_remove_handler_by_name(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    with capture_output():
+        _setup(log_format='json', log_file=log_file, log_file_format='json')
+        remove_handler('mh_structlog_file')
+        get_logger('test_reconfigure').info('stdout only')
+
+    assert not log_file.exists() or not log_file.read_text()
+
+
+def test_set_log_format_keeps_handlers():
+    with capture_output() as (out, _err):
+        _setup(log_format='json')
+        (handler,) = logging.getLogger().handlers
+        get_logger('test_reconfigure').info('as json')
+
+        set_log_format('console')
+        assert logging.getLogger().handlers == [handler]
+        get_logger('test_reconfigure').info('as console')
+
+        set_log_format('gcp_json')
+        get_logger('test_reconfigure').info('as gcp json')
+
+    lines = out.getvalue().splitlines()
+    assert orjson.loads(lines[0])['level'] == 'info'
+    assert 'as console' in lines[1]
+    assert not lines[1].startswith('{')
+    assert orjson.loads(lines[2])['severity'] == 'info'
+
+
+def test_set_log_format_keeps_metrics_and_profiler(monkeypatch):
+    monkeypatch.setattr(metrics, '_aggregator', None)
+    monkeypatch.setattr(profiling, '_profiler', None)
+
+    with capture_output() as (out, _err):
+        _setup(
+            log_format='json',
+            metrics_config={'counters': {'requests': None}, 'loggers': ['test_reconfigure'], 'flush_interval_s': 3600},
+            profile_processors={'report_at_exit': False},
+        )
+        aggregator, profiler = metrics.get_metrics_aggregator(), profiling.get_profiler()
+        get_logger('test_reconfigure').info('counted')
+
+        set_log_format('aws_json')
+        assert metrics.get_metrics_aggregator() is aggregator
+        assert profiling.get_profiler() is profiler
+        get_logger('test_reconfigure').info('counted')
+        metrics.flush_metrics()
+
+    summary = orjson.loads(out.getvalue().splitlines()[-1])
+    assert summary['requests'] == 2  # noqa: PLR2004
+    assert '_aws' in summary
+    assert sum(s.count for s in profiler.stats.values() if s.chain == 'structlog' and s.position == 0) == 3  # noqa: PLR2004
+
+
+def test_restore_after_setup_rebuilds():
+    with capture_output() as (out, _err):
+        _setup(log_format='json')
+        snapshot = snapshot_config()
+
+        # A new setup() closes the snapshotted handlers, so the restore rebuilds the configuration.
+        _setup(log_format='console')
+        snapshot.restore()
+        get_logger('test_reconfigure').info('json again')
+
+    assert orjson.loads(out.getvalue().splitlines()[-1])['message'] == 'json again'
+
+
+def test_set_log_format_requires_setup(monkeypatch):
+    monkeypatch.setattr('mh_structlog.config.LAST_SETUP_ARGUMENTS', None)
+    with pytest.raises(StructlogLoggingConfigExceptionError):
+        set_log_format('json')
@@ -0,0 +1,144 @@
+import logging
+
+import orjson
+import pytest
+from freezegun import freeze_time
+from structlog.contextvars import bind_contextvars, clear_contextvars
+
+from mh_structlog import ERROR, INFO, WARNING, get_logger, setup
+from mh_structlog.config import StructlogLoggingConfigExceptionError
+from mh_structlog.handlers import AsyncHandler
+from mh_structlog.routing import Route, Router
+
+from .utils import capture_output
+
+
+def test_router_first_match_and_continue():
+    router = Router(
+        [
+            Route('errors', level=ERROR, continue_=True),
+            Route('chatty', max_level=INFO, loggers=('urllib3', 'botocore')),
+            Route('default'),
+        ]
+    )
+
+    assert router.routes_for('myapp', ERROR) == {'errors', 'default'}
+    assert router.routes_for('urllib3.connectionpool', INFO) == {'chatty'}
+    assert router.routes_for('urllib3', WARNING) == {'default'}
+    assert router.routes_for('urllib3x', INFO) == {'default'}
+
+
+def test_setup_routes(tmp_path):
+    chatty = []
+
+    def collect_chatty(_, __, event_dict):
+        chatty.append(event_dict['message'])
+        return event_dict
+
+    with capture_output() as (out, _err):
+        setup(
+            log_format='json',
+            testing_mode=True,
+            routes=[
+                {
+                    'name': 'errors',
+                    'level': 'ERROR',
+                    'continue': True,
+                    'handler': {'class': 'logging.FileHandler', 'filename': str(tmp_path / 'errors.log')},
+                },
+                {
+                    'name': 'chatty',
+                    'loggers': ['chatty'],
+                    'max_level': INFO,
+                    'processors': [collect_chatty],
+                    'async': True,
+                },
+                {'name': 'default', 'level': INFO, 'log_format': 'gcp_json'},
+            ],
+        )
+        try:
+            1 / 0  # noqa: B018
+        except ZeroDivisionError:
+            get_logger('myapp').exception('boom')
+        get_logger('myapp').info('hey')
+        get_logger('myapp').debug('not routed')
+        get_logger('chatty.module').info('chatter')
+
+        async_handler = next(h for h in logging.getLogger().handlers if isinstance(h, AsyncHandler))
+        async_handler.flush()
+
+    errors = [orjson.loads(line) for line in (tmp_path / 'errors.log').read_text().splitlines()]
+    assert [e['message'] for e in errors] == ['boom']
+    assert errors[0]['exception'][0]['exc_type'] == 'ZeroDivisionError'
+
+    lines = [orjson.loads(line) for line in out.getvalue().splitlines()]
+    by_message = {line['message']: line for line in lines}
+    assert set(by_message) == {'boom', 'hey', 'chatter'}
+    assert by_message['hey']['severity'] == 'info'
+    assert by_message['chatter']['level'] == 'info'
+    assert chatty == ['chatter']
+
+
+def test_setup_routes_async_stdlib_records_keep_their_context_and_time():
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, routes=[{'name': 'default', 'async': True}])
+        async_handler = next(h for h in logging.getLogger().handlers if isinstance(h, AsyncHandler))
+
+        # Keep the background thread from formatting the record until the context and the time have changed.
+        with async_handler.target.lock:
+            with freeze_time('2026-01-01 12:00:00.123'):
+                bind_contextvars(request_id='r1')
+                logging.getLogger('myapp').warning('stdlib')
+                clear_contextvars()
+            bind_contextvars(request_id='r2')
+        clear_contextvars()
+        async_handler.flush()
+
+    line = orjson.loads(out.getvalue())
+    assert line['message'] == 'stdlib'
+    assert line['request_id'] == 'r1'
+    assert line['timestamp'] == '2026-01-01T12:00:00.123Z'
+
+
+def test_setup_routes_does_not_render_unrouted_events():
+    rendered = []
+
+    def spy(_, __, event_dict):
+        rendered.append(event_dict['message'])
+        return event_dict
+
+    with capture_output() as (out, _err):
+        setup(
+            log_format='json',
+            testing_mode=True,
+            routes=[{'name': 'errors', 'level': ERROR, 'processors': [spy]}],
+            logging_configs=[{'loggers': {'named': {'level': INFO, 'propagate': False}}}],
+        )
+        get_logger('myapp').warning('dropped early')
+        get_logger('named').info('dropped by the filter')
+        get_logger('named').error('routed')
+
+    assert rendered == ['routed']
+    assert [orjson.loads(line)['message'] for line in out.getvalue().splitlines()] == ['routed']
+
+
+def test_setup_routes_sampling():
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True, routes=[{'name': 'sampled', 'sample_rate': 0.0}])
+        get_logger('myapp').info('hey')
+
+    assert not out.getvalue()
+
+
+def test_setup_routes_with_capture_is_invalid():
+    with pytest.raises(StructlogLoggingConfigExceptionError, match='capture can not be combined with routes'):
+        setup(log_format='json', testing_mode=True, capture=[], routes=[{'name': 'default'}])
+
+
+@pytest.mark.parametrize(
+    'route',
+    [{'level': INFO}, {'name': 'x', 'levle': INFO}, {'name': 'x', 'level': 'LOUD'}, {'name': 'x', 'log_format': 'xml'}],
+)
+def test_setup_routes_invalid(route):
+    with pytest.raises(StructlogLoggingConfigExceptionError):
+        setup(log_format='json', testing_mode=True, routes=[route])
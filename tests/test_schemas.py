@@ -0,0 +1,78 @@
+from collections import UserDict
+
+import orjson
+import pytest
+
+from mh_structlog import declare_event, get_logger, setup
+from mh_structlog.processors import ObjectToDictTransformer
+from mh_structlog.schemas import EventSchemaError, EventSchemaProcessor, clear_event_schemas, get_event_schema
+
+from .utils import capture_output
+
+
+@pytest.fixture(autouse=True)
+def _no_declared_events():
+    yield
+    clear_event_schemas()
+
+
+def test_validate():
+    schema = declare_event('request', method=str, status=int, latency_ms=(int, float), user_id=int | None)
+    assert get_event_schema('request') is schema
+    assert get_event_schema('other') is None
+
+    schema.validate({'method': 'GET', 'status': 200, 'latency_ms': 1.5})
+    schema.validate({'method': 'GET', 'status': 200, 'latency_ms': 1, 'user_id': 5})
+
+    with pytest.raises(EventSchemaError, match='missing field method; field status should be'):
+        schema.validate({'status': '200', 'latency_ms': 1})
+    with pytest.raises(EventSchemaError, match='field status'):
+        schema.validate({'method': 'GET', 'status': True, 'latency_ms': 1})
+
+
+def test_scalar_fields_skip_the_object_transformation():
+    schema = declare_event('request', status=int, user=dict, user_id=int | None)
+    assert schema.scalar_fields >= {'status', 'user_id', 'event'}
+    assert 'user' not in schema.scalar_fields
+
+    event_dict = ObjectToDictTransformer()(None, 'info', {'event': 'request', 'status': 200, 'user': UserDict(id=1)})
+    assert type(event_dict['user']) is dict
+
+
+def test_records():
+    schema = declare_event('queue.consume', slots=True, queue=str, messages=int)
+    record = schema.record(queue='orders', messages=3)
+    assert type(record).__name__ == 'QueueConsumeRecord'
+    assert not hasattr(record, '__dict__')
+    assert record.fields() == {'queue': 'orders', 'messages': 3}
+    assert repr(record) == "QueueConsumeRecord(queue='orders', messages=3)"
+
+    with pytest.raises(TypeError, match='Missing field messages'):
+        schema.record(queue='orders')
+    with pytest.raises(TypeError, match=r'Unknown fields for event queue\.consume: other'):
+        schema.record(queue='orders', messages=3, other=1)
+    with pytest.raises(TypeError, match='not declared with slots=True'):
+        declare_event('request', status=int).record(status=200)
+
+    event_dict = EventSchemaProcessor()(None, 'info', {'event': record, 'logger': 'x'})
+    assert event_dict == {'event': 'queue.consume', 'logger': 'x', 'queue': 'orders', 'messages': 3}
+
+
+def test_setup_validates_declared_events_in_testing_mode():
+    queue_consume = declare_event('queue.consume', slots=True, queue=str, messages=int)
+    declare_event('request', status=int)
+
+    with capture_output() as (out, _err):
+        setup(log_format='json', testing_mode=True)
+        get_logger('myapp').info(queue_consume.record(queue='orders', messages=3))
+        get_logger('myapp').info('undeclared', status='whatever')
+        with pytest.raises(EventSchemaError, match='field status'):
+            get_logger('myapp').info('request', status='200')
+
+        setup(log_format='json', testing_mode=True, validate_event_schemas=False)
+        get_logger('myapp').info('request', status='200')
+
+    consumed, undeclared, unvalidated = [orjson.loads(line) for line in out.getvalue().splitlines()]
+    assert (consumed['message'], consumed['queue'], consumed['messages']) == ('queue.consume', 'orders', 3)
+    assert undeclared['status'] == 'whatever'
+    assert unvalidated['status'] == '200'
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+import sentry_sdk
+from sentry_sdk.transport import Transport
+
+from mh_structlog import get_logger, setup
+from mh_structlog.sentry import SentryProcessor
+
+from .utils import capture_output
+
+
+class CollectingTransport(Transport):
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.events = []
+
+    def capture_envelope(self, envelope):
+        self.events.extend(item.payload.json for item in envelope.items if item.type == 'event')
+
+
+@pytest.fixture
+def sentry_events():
+    transport = CollectingTransport()
+    sentry_sdk.init(dsn='https://public@sentry.example.com/1', transport=transport, default_integrations=False)
+    with sentry_sdk.isolation_scope():
+        yield transport.events
+    sentry_sdk.init()
+
+
+def _messages(event):
+    # Sentry itself may add breadcrumbs as well, e.g. for running git to detect the release.
+    return [crumb['message'] for crumb in event['breadcrumbs']['values'] if crumb['category'] == 'myapp']
+
+
+@pytest.mark.parametrize('lazy_breadcrumbs', [True, False])
+def test_breadcrumbs_are_added_to_captured_events(sentry_events, lazy_breadcrumbs):
+    with capture_output():
+        setup(
+            log_format='json',
+            testing_mode=True,
+            sentry_config={'lazy_breadcrumbs': lazy_breadcrumbs, 'breadcrumb_buffer_size': 3},
+        )
+        for i in range(5):
+            get_logger('myapp').info(f'step {i}', step=i)
+        get_logger('myapp').error('failed')
+
+    (event,) = sentry_events
+    assert event['message'] == 'failed'
+    assert _messages(event)[-3:] == ['step 2', 'step 3', 'step 4']
+    crumb = event['breadcrumbs']['values'][-1]
+    assert crumb['category'] == 'myapp'
+    assert crumb['level'] == 'info'
+    assert crumb['data'] == {'step': 4}
+
+
+@pytest.mark.parametrize('lazy_breadcrumbs', [True, False])
+def test_events_sent_to_sentry_are_redacted(sentry_events, lazy_breadcrumbs):
+    with capture_output():
+        setup(
+            log_format='json',
+            testing_mode=True,
+            sentry_config={'lazy_breadcrumbs': lazy_breadcrumbs},
+            redaction_config={'keys': ['iban', 'api_key'], 'value_patterns': ['email']},
+        )
+        get_logger('myapp').info('login', iban='NL00BANK0123', user='alice@example.com')
+        get_logger('myapp').error('failed for alice@example.com', api_key='abc')
+
+    (event,) = sentry_events
+    assert event['message'] == 'failed for [REDACTED]'
+    assert event['tags']['api_key'] == '[REDACTED]'
+    crumb = next(crumb for crumb in event['breadcrumbs']['values'] if crumb['category'] == 'myapp')
+    assert crumb['data'] == {'iban': '[REDACTED]', 'user': '[REDACTED]'}
+    assert 'NL00BANK0123' not in str(event)
+    assert 'alice@example.com' not in str(event)
+
+
+def test_lazy_breadcrumbs_are_kept_per_isolation_scope(sentry_events):
+    with capture_output():
+        setup(log_format='json', testing_mode=True, sentry_config={'active': True})
+        get_logger('myapp').info('before the request')
+        with sentry_sdk.isolation_scope():
+            get_logger('myapp').info('in the request')
+            get_logger('myapp').error('request failed')
+        get_logger('myapp').error('outside the request')
+
+    request_event, other_event = sentry_events
+    assert _messages(request_event) == ['in the request']
+    assert _messages(other_event) == ['before the request']
+
+
+def test_lazy_breadcrumbs_go_through_before_breadcrumb():
+    transport = CollectingTransport()
+
+    def before_breadcrumb(crumb, hint):
+        return None if crumb['message'] == 'secret' else {**crumb, 'message': crumb['message'].upper()}
+
+    sentry_sdk.init(
+        dsn='https://public@sentry.example.com/1',
+        transport=transport,
+        default_integrations=False,
+        before_breadcrumb=before_breadcrumb,
+    )
+    try:
+        with sentry_sdk.isolation_scope(), capture_output():
+            setup(log_format='json', testing_mode=True, sentry_config={'active': True})
+            get_logger('myapp').info('secret')
+            get_logger('myapp').info('visible')
+            get_logger('myapp').error('failed')
+    finally:
+        sentry_sdk.init()
+
+    (event,) = transport.events
+    assert _messages(event) == ['VISIBLE']
+
+
+def test_explicit_scope_adds_breadcrumbs_right_away():
+    scope = sentry_sdk.Scope()
+    assert not SentryProcessor(scope=scope).lazy_breadcrumbs
+    assert SentryProcessor().lazy_breadcrumbs
+
+
+def test_lazy_breadcrumbs_of_concurrent_threads_stay_apart():
+    from mh_structlog.sentry import _recorded_breadcrumbs  # noqa: PLC0415
+
+    processor = SentryProcessor(breadcrumb_buffer_size=20_000)
+    foreign = {}
+    barrier = threading.Barrier(4)
+
+    def log(thread):
+        with sentry_sdk.isolation_scope():
+            barrier.wait()
+            for i in range(5_000):
+                processor(None, 'info', {'event': f'step {i}', 'level': 'info', 'logger': 'myapp', 'thread': thread})
+            (recorded,) = _recorded_breadcrumbs.get()
+            foreign[thread] = [e for _, e in recorded.entries if e['thread'] != thread]
+            assert len(recorded.entries) == 5_000  # noqa: PLR2004
+
+    threads = [threading.Thread(target=log, args=(thread,)) for thread in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert foreign == {0: [], 1: [], 2: [], 3: []}
@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+
+from mh_structlog import bind_contextvars, get_logger, setup
+from mh_structlog.testing import CapturedLogs
+
+from .utils import capture_output
+
+
+def test_captured_logs_fixture(captured_logs):
+    bind_contextvars(request_id='abc')
+    get_logger('myapp.payments').info('payment started', order_id=1)
+    get_logger('myapp.payments.stripe').error('payment failed', order_id=1)
+    logging.getLogger('myapp.jobs').warning('job %s retried', 'sync', extra={'attempt': 2})
+
+    assert captured_logs.messages == ['payment started', 'payment failed', 'job sync retried']
+    # The same processors as the json output ran, up to the renderer.
+    assert captured_logs[0] == {
+        'order_id': 1,
+        'request_id': 'abc',
+        'logger': 'myapp.payments',
+        'level': 'info',
+        'timestamp': captured_logs[0]['timestamp'],
+        'message': 'payment started',
+    }
+    assert captured_logs.filter(level='warning').messages == ['payment failed', 'job sync retried']
+    assert captured_logs.by_level('warning').messages == ['job sync retried']
+    assert captured_logs.by_logger('myapp.payments').messages == ['payment started', 'payment failed']
+    assert captured_logs.with_fields(attempt=2).messages == ['job sync retried']
+    assert captured_logs.filter(level='error', logger='myapp', order_id=1).messages == ['payment failed']
+
+
+@pytest.mark.mh_structlog_setup(log_format='gcp_json', pre_serialize_contextvars=True)
+def test_captured_logs_fixture_setup_options(captured_logs):
+    bind_contextvars(request_id='abc')
+    get_logger('myapp').warning('hey')
+
+    (event_dict,) = captured_logs
+    assert event_dict['severity'] == 'warning'
+    assert event_dict['request_id'] == 'abc'
+    assert captured_logs.filter(level='warning').messages == ['hey']
+
+
+def test_setup_capture_does_not_write():
+    captured = CapturedLogs()
+    with capture_output() as (out, _err):
+        setup(log_format='console', testing_mode=True, capture=captured)
+        get_logger('myapp').info('hey', key='value')
+
+    assert not out.getvalue()
+    assert captured.messages == ['hey']
+    assert captured[0]['key'] == 'value'
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+import pytest
+
+from mh_structlog import INFO, WARNING, filter_named_logger, timed
+from mh_structlog.timing import get_current_span_id
+
+
+@timed
+def decorated(value):
+    return value * 2
+
+
+@timed('async work', threshold_ms=0)
+async def decorated_async():
+    await asyncio.sleep(0)
+    return get_current_span_id()
+
+
+def test_timed_context_manager_nested(captured_logs):
+    with timed('outer', job='sync'):
+        outer_id = get_current_span_id()
+        with timed('inner'):
+            inner_id = get_current_span_id()
+
+    assert get_current_span_id() is None
+    inner, outer = captured_logs
+    assert inner['message'] == 'inner'
+    assert inner['span_id'] == inner_id
+    assert inner['parent_span_id'] == outer_id
+    assert inner['logger'] == 'tests.test_timing'
+    assert outer['message'] == 'outer'
+    assert outer['span_id'] == outer_id
+    assert outer['job'] == 'sync'
+    assert 'parent_span_id' not in outer
+    assert outer['duration_ms'] >= inner['duration_ms'] >= 0
+
+
+def test_timed_decorator(captured_logs):
+    assert decorated(2) == 4
+
+    (event,) = captured_logs
+    assert event['message'] == 'decorated'
+    assert event['logger'] == 'tests.test_timing'
+    assert isinstance(event['duration_ms'], float)
+
+
+def test_timed_async(captured_logs):
+    async def main():
+        async with timed('outer'):
+            outer_id = get_current_span_id()
+            inner_parent = await decorated_async()
+        return outer_id, inner_parent
+
+    outer_id, inner_id = asyncio.run(main())
+
+    # The first asyncio.run() of the process logs the selector it uses.
+    inner, outer = captured_logs.by_logger('tests.test_timing')
+    assert inner['message'] == 'async work'
+    assert inner['span_id'] == inner_id
+    assert inner['parent_span_id'] == outer_id == outer['span_id']
+
+
+def test_timed_records_errors(captured_logs):
+    with pytest.raises(ValueError, match='boom'), timed('failing'):
+        raise ValueError('boom')
+
+    assert captured_logs[0]['error'] == 'ValueError'
+
+
+def test_timed_threshold_and_sampling(captured_logs):
+    with timed('fast', threshold_ms=60_000):
+        pass
+    with timed('sampled out', sample_rate=0):
+        pass
+
+    assert not captured_logs
+
+
+@pytest.mark.mh_structlog_setup(logging_configs=[filter_named_logger('tests.test_timing', WARNING)])
+def test_timed_filtered_out(captured_logs):
+    with timed('filtered', level=INFO):
+        assert get_current_span_id() is None
+
+    with timed('kept', level=WARNING):
+        assert get_current_span_id() is not None
+
+    assert captured_logs.messages == ['kept']
+
+
+def test_timed_shared_instance(captured_logs):
+    # Not the logger of this module, of which test_timed_filtered_out raises the level.
+    shared = timed('shared', logger='tests.timing.shared')
+
+    with shared:
+        outer_id = get_current_span_id()
+        with shared:
+            inner_id = get_current_span_id()
+        assert get_current_span_id() == outer_id
+
+    barrier = threading.Barrier(4)
+
+    def work():
+        with shared:
+            barrier.wait(timeout=5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def task(name):
+        async with shared:
+            span_id = get_current_span_id()
+            await asyncio.sleep(0)
+            return name, span_id, get_current_span_id()
+
+    async def main():
+        return await asyncio.gather(task('a'), task('b'))
+
+    for _name, before, after in asyncio.run(main()):
+        assert before == after
+
+    inner, outer, *others = captured_logs.by_logger('tests.timing.shared')
+    assert (inner['span_id'], inner['parent_span_id']) == (inner_id, outer_id)
+    assert outer['span_id'] == outer_id
+    assert 'parent_span_id' not in outer
+    assert len(others) == 6
+    assert len({event['span_id'] for event in others}) == 6
+    assert get_current_span_id() is None
+
+
+@pytest.mark.mh_structlog_setup(global_filter_level=WARNING)
+def test_timed_below_global_filter_level(captured_logs):
+    with timed('filtered', logger='tests.timing.global', level=INFO):
+        assert get_current_span_id() is None
+
+    with timed('kept', logger='tests.timing.global', level=WARNING):
+        assert get_current_span_id() is not None
+
+    assert captured_logs.messages == ['kept']
+
+
+def test_timed_without_event():
+    with pytest.raises(TypeError, match='needs an event'), timed():
+        pass
+
+
+def test_timed_instance_decorating_several_functions(captured_logs):
+    span = timed(logger='tests.timing.several')
+
+    @span
+    def first():
+        pass
+
+    @span
+    def second():
+        pass
+
+    first()
+    second()
+
+    assert captured_logs.by_logger('tests.timing.several').messages == [
+        'test_timed_instance_decorating_several_functions.<locals>.first',
+        'test_timed_instance_decorating_several_functions.<locals>.second',
+    ]